@@ -0,0 +1,183 @@
+import json
+import math
+import platform
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from booking_arena.models import Arena, Booking
+from events.models import Event
+from forum.models import Post
+from rental_gear.models import Gear
+from the_rink.middleware import QueryStats
+
+# (url name, kwargs dari sample object, query string). Tambahin di sini kalau ada endpoint baca baru.
+ENDPOINTS = [
+    ('main', None, {}),
+    ('forum:show_forum', None, {}),
+    ('forum:show_json', None, {}),
+    ('forum:show_feed_json', None, {}),
+    ('forum:get_replies', 'post', {}),
+    ('forum:get_replies_feed', 'post', {}),
+    ('forum:get_top_posts_json', None, {}),
+    ('forum:get_post_detail', 'post', {}),
+    ('forum:get_top_posts_json_flutter', None, {}),
+    ('forum:get_post_detail_flutter', 'post', {}),
+    ('booking_arena:show_arena', None, {}),
+    ('booking_arena:arena_detail', 'arena', {}),
+    ('booking_arena:get_available_slots', 'arena', {'date': 'today'}),
+    ('booking_arena:user_booking_list', None, {}),
+    ('booking_arena:get_arenas_flutter', None, {}),
+    ('booking_arena:get_availability_flutter', None, {}),
+    ('booking_arena:my_history_flutter', None, {}),
+    ('booking_arena:admin_booking_list', None, {}),
+    ('events:list', None, {}),
+    ('events:detail', 'event_slug', {}),
+    ('events:my_events', None, {}),
+    ('events:get_events_json', None, {}),
+    ('rental_gear:catalog', None, {}),
+    ('rental_gear:filter_gear', None, {'category': 'hockey'}),
+    ('rental_gear:view_cart', None, {}),
+    ('rental_gear:flutter_gears_json', None, {}),
+    ('rental_gear:flutter_gear_detail_json', 'gear', {}),
+    ('rental_gear:flutter_cart_json', None, {}),
+    ('rental_gear:flutter_rentals_json', None, {}),
+    ('auth_mob:get_admin_stats', None, {}),
+    ('auth_mob:get_users_list', None, {}),
+    ('auth_mob:get_arenas_admin', None, {}),
+    ('auth_mob:get_bookings_admin', None, {}),
+    ('auth_mob:get_events_admin', None, {}),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Hit semua endpoint baca lewat test client, laporkan p50/p95, jumlah query & peak memory (JSON)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--user', help='Username yang dipakai login (default: superuser pertama)')
+        parser.add_argument('--only', help='Cuma endpoint yang namanya mengandung teks ini')
+        parser.add_argument('--output', help='Tulis report JSON ke file ini')
+        parser.add_argument('--compare', help='Report JSON sebelumnya buat dibandingkan')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        samples = self.samples()
+        client = Client()
+        client.force_login(user)
+
+        results = {}
+        for url_name, sample, params in ENDPOINTS:
+            if options['only'] and options['only'] not in url_name:
+                continue
+            if sample and samples.get(sample) is None:
+                self.stderr.write(f'skip {url_name}: no {sample} in the database')
+                continue
+            url = reverse(url_name, kwargs=samples[sample] if sample else None)
+            params = {k: str(timezone.localdate()) if v == 'today' else v for k, v in params.items()}
+            results[url_name] = self.measure(client, url, params, options['iterations'])
+
+        report = {
+            'meta': {
+                'generated_at': timezone.now().isoformat(),
+                'iterations': options['iterations'],
+                'user': user.username,
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'rows': {
+                    'users': User.objects.count(),
+                    'bookings': Booking.objects.count(),
+                    'posts': Post.objects.count(),
+                    'gears': Gear.objects.count(),
+                    'events': Event.objects.count(),
+                },
+            },
+            'endpoints': results,
+        }
+        baseline = self.load(options['compare']) if options['compare'] else None
+        self.print_table(results, baseline)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+
+    def get_user(self, username):
+        users = User.objects.filter(username=username) if username else User.objects.filter(is_superuser=True)
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError('No user to log in with; run generate_synthetic_data or pass --user.')
+        return user
+
+    def samples(self):
+        post = Post.objects.order_by('-id').first()
+        arena = Arena.objects.order_by('id').first()
+        event = Event.objects.filter(is_active=True).order_by('id').first()
+        gear = Gear.objects.order_by('id').first()
+        return {
+            'post': {'post_id': post.pk} if post else None,
+            'arena': {'arena_id': arena.pk} if arena else None,
+            'event_slug': {'slug': event.slug} if event else None,
+            'gear': {'id': gear.pk} if gear else None,
+        }
+
+    def fetch(self, client, url, params):
+        response = client.get(url, params)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def measure(self, client, url, params, iterations):
+        # Pemanasan (cache, koneksi), lalu satu run buat query & memori, baru sisanya buat latency
+        self.fetch(client, url, params)
+
+        queries = QueryStats()
+        with connection.execute_wrapper(queries):
+            tracemalloc.start()
+            response = self.fetch(client, url, params)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            self.fetch(client, url, params)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'queries': queries.count,
+            'duplicate_queries': sum(queries.duplicates().values()),
+            'db_ms': round(queries.duration * 1000, 2),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'max_ms': round(max(timings), 2),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def load(self, path):
+        with open(path) as f:
+            return json.load(f)['endpoints']
+
+    def print_table(self, results, baseline):
+        self.stdout.write(f'{"endpoint":45} {"status":>6} {"queries":>8} {"p50 ms":>9} {"p95 ms":>9} {"peak KB":>9}')
+        for name, row in results.items():
+            line = (f'{name:45} {row["status"]:>6} {row["queries"]:>8} {row["p50_ms"]:>9} '
+                    f'{row["p95_ms"]:>9} {row["peak_memory_kb"]:>9}')
+            before = (baseline or {}).get(name)
+            if before:
+                line += (f'  (p95 {row["p95_ms"] - before["p95_ms"]:+.1f} ms, '
+                         f'queries {row["queries"] - before["queries"]:+d})')
+            self.stdout.write(line)
@@ -0,0 +1,249 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.models import UserProfile, UserType
+from booking_arena.availability import rebuild_occupancy
+from booking_arena.models import Arena, ArenaOpeningHours, Booking
+from events.models import Event, EventRegistration
+from forum.models import Post, Reply, UpVote
+from rental_gear.api import bump_catalog_version
+from the_rink import cache as view_cache
+from rental_gear.models import CartItem, Gear
+
+# Volume default ~ ukuran production; --scale 0.01 buat coba-coba lokal (jumlah arena gak ikut di-scale)
+DEFAULTS = {
+    'users': 100_000,
+    'arenas': 50,
+    'bookings': 1_000_000,
+    'posts': 250_000,
+    'replies': 250_000,
+    'votes': 5_000_000,
+    'gears': 50_000,
+    'cart_items': 20_000,
+    'events': 10_000,
+    'registrations': 100_000,
+}
+OPEN_HOUR, CLOSE_HOUR = 8, 22
+PASSWORD = 'synthetic'
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Generate data sintetis besar (offline, deterministik dari --seed) buat benchmark'
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULTS.items():
+            parser.add_argument(f'--{name.replace("_", "-")}', type=int, dest=name, default=None,
+                                help=f'default {default:,} x --scale')
+        parser.add_argument('--scale', type=float, default=1.0)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='synth', help='Prefix username/slug/nama arena')
+        parser.add_argument('--anchor-date', type=datetime.date.fromisoformat, default=None,
+                            help='Tanggal "hari ini" buat booking/event (default: hari ini)')
+        parser.add_argument('--clear', action='store_true', help='Hapus data sintetis dengan prefix yang sama dulu')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.chunk = options['chunk_size']
+        self.prefix = options['prefix']
+        self.today = options['anchor_date'] or timezone.localdate()
+        volumes = {
+            name: options[name] if options[name] is not None
+            else default if name == 'arenas' else max(1, int(default * options['scale']))
+            for name, default in DEFAULTS.items()
+        }
+
+        if options['clear']:
+            self.clear()
+
+        started = time.perf_counter()
+        users = self.step('users', self.create_users, volumes['users'])
+        arenas = self.step('arenas', self.create_arenas, volumes['arenas'])
+        self.step('bookings', self.create_bookings, volumes['bookings'], users, arenas)
+        posts = self.step('posts', self.create_posts, volumes['posts'], users)
+        replies = self.step('replies', self.create_replies, volumes['replies'], users, posts)
+        self.step('votes', self.create_votes, volumes['votes'], users, posts, replies)
+        gears = self.step('gears', self.create_gears, volumes['gears'], users)
+        self.step('cart_items', self.create_cart_items, volumes['cart_items'], users, gears)
+        events = self.step('events', self.create_events, volumes['events'])
+        self.step('registrations', self.create_registrations, volumes['registrations'], users, events)
+
+        # Counter, bitmask & index search gak ke-update lewat bulk_create
+        rebuild_occupancy()
+        call_command('rebuild_vote_counts', stdout=self.stdout)
+        call_command('rebuild_gear_search', stdout=self.stdout)
+        bump_catalog_version()
+        view_cache.bump(*view_cache.NAMESPACES)
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.perf_counter() - started:.1f}s.'))
+
+    def step(self, name, func, count, *args):
+        started = time.perf_counter()
+        result = func(count, *args)
+        self.stdout.write(f'{name}: {count:,} rows in {time.perf_counter() - started:.1f}s')
+        return result
+
+    def bulk(self, model, rows, keep_ids=True):
+        # keep_ids=False buat tabel besar yang pk-nya gak dipakai lagi (hemat memori)
+        created = []
+        for chunk in chunked(rows, self.chunk):
+            with transaction.atomic():
+                objs = model.objects.bulk_create(chunk)
+            if keep_ids:
+                created.extend(obj.pk for obj in objs)
+        return created
+
+    def clear(self):
+        with transaction.atomic():
+            # User cascade ke profile, booking, post, reply, vote, gear, cart, registrasi
+            User.objects.filter(username__startswith=f'{self.prefix}_').delete()
+            Arena.objects.filter(name__startswith=f'{self.prefix} ').delete()
+            Event.objects.filter(slug__startswith=f'{self.prefix}-').delete()
+
+    def create_users(self, count):
+        # Hash sekali saja, PBKDF2 per user bakal makan waktu berjam-jam
+        password = make_password(PASSWORD)
+        joined = timezone.now()
+        ids = self.bulk(User, (
+            User(
+                username=f'{self.prefix}_{i:07d}', email=f'{self.prefix}_{i}@example.com',
+                password=password, date_joined=joined, is_superuser=i == 0, is_staff=i == 0,
+            )
+            for i in range(count)
+        ))
+        self.bulk(UserType, (
+            UserType(user_id=pk, user_type='seller' if i % 10 == 0 else 'customer')
+            for i, pk in enumerate(ids)
+        ), keep_ids=False)
+        self.bulk(UserProfile, (
+            UserProfile(user_id=pk, full_name=f'Synthetic User {i}', phone_number=f'08{i:09d}')
+            for i, pk in enumerate(ids)
+        ), keep_ids=False)
+        return ids
+
+    def create_arenas(self, count):
+        ids = self.bulk(Arena, (
+            Arena(name=f'{self.prefix} Arena {i}', description='Synthetic arena', capacity=50 + i % 200,
+                  location=f'Zone {i % 10}')
+            for i in range(count)
+        ))
+        self.bulk(ArenaOpeningHours, (
+            ArenaOpeningHours(arena_id=pk, day=day, open_time=datetime.time(OPEN_HOUR),
+                              close_time=datetime.time(CLOSE_HOUR))
+            for pk in ids for day in range(7)
+        ), keep_ids=False)
+        return ids
+
+    def create_bookings(self, count, users, arenas):
+        # Slot unik (arena, date, jam) dienumerasi berurutan; 80% masa lalu, 20% ke depan
+        hours = CLOSE_HOUR - OPEN_HOUR
+        per_day = len(arenas) * hours
+        start = self.today - datetime.timedelta(days=int(count / per_day * 0.8))
+        activities = [key for key, _ in Booking.ACTIVITY_CHOICES]
+
+        def rows():
+            for k in range(count):
+                day = start + datetime.timedelta(days=k // per_day)
+                past = day < self.today
+                roll = self.rng.random()
+                status = 'Cancelled' if roll < 0.1 else ('Completed' if past else 'Booked')
+                yield Booking(
+                    arena_id=arenas[k % len(arenas)], user_id=self.rng.choice(users), date=day,
+                    start_hour=OPEN_HOUR + (k // len(arenas)) % hours, status=status,
+                    activity=activities[k % len(activities)],
+                )
+
+        self.bulk(Booking, rows(), keep_ids=False)
+
+    def create_posts(self, count, users):
+        return self.bulk(Post, (
+            Post(author_id=self.rng.choice(users), title=f'Synthetic post {i}',
+                 content=f'Synthetic content {i} ' * 5)
+            for i in range(count)
+        ))
+
+    def create_replies(self, count, users, posts):
+        if not posts:
+            return []
+        return self.bulk(Reply, (
+            Reply(post_id=self.rng.choice(posts), author_id=self.rng.choice(users), content=f'Reply {i}')
+            for i in range(count)
+        ))
+
+    def create_votes(self, count, users, posts, replies):
+        # User per target dibuat beda-beda (stride) supaya unique constraint (user, target) aman
+        targets = [('post_id', pk) for pk in posts] + [('reply_id', pk) for pk in replies]
+        if not targets:
+            return
+        count = min(count, len(targets) * len(users))
+
+        def rows():
+            for k in range(count):
+                field, target = targets[k % len(targets)]
+                round_ = k // len(targets)
+                user = users[(target * 7919 + round_) % len(users)]
+                yield UpVote(user_id=user, is_upvote=self.rng.random() < 0.75, **{field: target})
+
+        self.bulk(UpVote, rows(), keep_ids=False)
+
+    def create_gears(self, count, users):
+        sellers = users[::10] or users
+        categories = [key for key, _ in Gear.CATEGORY_CHOICES]
+        return self.bulk(Gear, (
+            Gear(name=f'Synthetic gear {i}', category=categories[i % len(categories)],
+                 price_per_day=Decimal(self.rng.randint(10, 500)) * 1000, description='Synthetic gear',
+                 stock=self.rng.randint(0, 20), seller_id=self.rng.choice(sellers), is_featured=i % 50 == 0)
+            for i in range(count)
+        ))
+
+    def create_cart_items(self, count, users, gears):
+        if not gears:
+            return
+        self.bulk(CartItem, (
+            CartItem(user_id=users[k % len(users)], gear_id=gears[(k * 31) % len(gears)],
+                     quantity=self.rng.randint(1, 3), days=self.rng.randint(1, 7))
+            for k in range(count)
+        ), keep_ids=False)
+
+    def create_events(self, count):
+        categories = [key for key, _ in Event.CATEGORY_CHOICES]
+        levels = [key for key, _ in Event.LEVEL_CHOICES]
+        return self.bulk(Event, (
+            Event(
+                name=f'Synthetic event {i}', slug=f'{self.prefix}-event-{i}', description='Synthetic event',
+                category=categories[i % len(categories)], level=levels[(i // 4) % len(levels)],
+                date=self.today + datetime.timedelta(days=i % 365 - 180),
+                start_time=datetime.time(8 + i % 12), end_time=datetime.time(10 + i % 12),
+                max_participants=self.rng.randint(10, 200), is_active=i % 20 != 0,
+            )
+            for i in range(count)
+        ))
+
+    def create_registrations(self, count, users, events):
+        if not events:
+            return
+        count = min(count, len(events) * len(users))
+        self.bulk(EventRegistration, (
+            EventRegistration(event_id=events[k % len(events)],
+                              user_id=users[(events[k % len(events)] * 7919 + k // len(events)) % len(users)])
+            for k in range(count)
+        ), keep_ids=False)
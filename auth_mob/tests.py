@@ -1,3 +1,137 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from booking_arena.models import ArenaDayOccupancy, Booking
+from events.models import Event, EventRegistration
+from forum.models import Post, UpVote
+from the_rink import admin_lists
 
 # Create your tests here.
+
+SMALL = ['--users', '30', '--arenas', '2', '--bookings', '100', '--posts', '20', '--replies', '20',
+         '--votes', '200', '--gears', '10', '--cart-items', '10', '--events', '8', '--registrations', '40']
+
+
+class SyntheticDataTests(TestCase):
+
+    def test_generates_requested_volumes(self):
+        call_command('generate_synthetic_data', *SMALL, stdout=StringIO())
+        self.assertEqual(User.objects.filter(username__startswith='synth_').count(), 30)
+        self.assertEqual(Booking.objects.count(), 100)
+        self.assertEqual(UpVote.objects.count(), 200)
+        self.assertEqual(EventRegistration.objects.count(), 40)
+        # Counter denormalized & bitmask ikut dibangun ulang
+        self.assertEqual(sum(Post.objects.values_list('upvote_count', flat=True))
+                         + sum(Post.objects.values_list('downvote_count', flat=True)),
+                         UpVote.objects.filter(post__isnull=False).count())
+        self.assertTrue(ArenaDayOccupancy.objects.exists())
+
+    def test_same_seed_same_data(self):
+        call_command('generate_synthetic_data', *SMALL, stdout=StringIO())
+        first = list(Booking.objects.order_by('date', 'start_hour', 'arena__name')
+                     .values_list('user__username', 'status'))
+        call_command('generate_synthetic_data', *SMALL, '--clear', stdout=StringIO())
+        second = list(Booking.objects.order_by('date', 'start_hour', 'arena__name')
+                      .values_list('user__username', 'status'))
+        self.assertEqual(first, second)
+        self.assertEqual(Event.objects.count(), 8)
+
+
+class BenchmarkTests(TestCase):
+
+    def test_report(self):
+        call_command('generate_synthetic_data', *SMALL, stdout=StringIO())
+        path = os.path.join(tempfile.mkdtemp(), 'report.json')
+        call_command('benchmark_endpoints', '--iterations', '2', '--only', 'forum', '--output', path, stdout=StringIO())
+        with open(path) as f:
+            report = json.load(f)
+        self.assertEqual(report['meta']['rows']['posts'], 20)
+        feed = report['endpoints']['forum:show_feed_json']
+        self.assertEqual(feed['status'], 200)
+        self.assertGreaterEqual(feed['queries'], 1)
+        self.assertLessEqual(feed['p50_ms'], feed['p95_ms'])
+
+
+class AdminListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_synthetic_data', *SMALL, stdout=StringIO())
+        cls.admin = User.objects.create_superuser(username='listadmin', password='pw')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_pages_cover_every_booking_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': 30, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(reverse('auth_mob:get_bookings_admin'), params).json()
+            seen += [row['id'] for row in data['bookings']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        expected = [str(pk) for pk in Booking.objects.order_by('-booked_at', '-pk').values_list('pk', flat=True)]
+        self.assertEqual(seen, expected)
+
+    def test_sort_and_filter(self):
+        data = self.client.get(reverse('auth_mob:get_bookings_admin'),
+                               {'status': 'Booked', 'sort': 'date', 'page_size': 200}).json()
+        self.assertEqual(len(data['bookings']), Booking.objects.filter(status='Booked').count())
+        self.assertEqual([row['date'] for row in data['bookings']],
+                         sorted(row['date'] for row in data['bookings']))
+        for params in ({'status': 'Nope'}, {'sort': 'user'}, {'cursor': 'xx'}, {'date_from': 'kemarin'}):
+            with self.subTest(params):
+                response = self.client.get(reverse('auth_mob:get_bookings_admin'), params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_cursor_tied_to_sort(self):
+        url = reverse('auth_mob:get_bookings_admin')
+        cursor = self.client.get(url, {'page_size': 10}).json()['next_cursor']
+        self.assertEqual(self.client.get(url, {'sort': 'date', 'cursor': cursor}).status_code, 400)
+
+    def test_post_list_is_one_query(self):
+        self.client.get(reverse('auth_mob:get_posts_admin'))  # session warm
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('auth_mob:get_posts_admin'), {'page_size': 200}).json()
+        # session + user + satu query list
+        self.assertLessEqual(len(queries), 3)
+        counts = {row['id']: row['replies_count'] for row in data['posts']}
+        post = Post.objects.order_by('?').first()
+        self.assertEqual(counts[post.pk], post.replies.count())
+
+    def test_export_streams_csv_and_jsonl(self):
+        url = reverse('auth_mob:export_admin', args=['bookings'])
+        with mock.patch.object(admin_lists, 'EXPORT_CHUNK_SIZE', 7):
+            response = self.client.get(url, {'format': 'csv', 'status': 'Cancelled'})
+            self.assertTrue(response.streaming)
+            chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(len(rows), Booking.objects.filter(status='Cancelled').count())
+        self.assertEqual(set(rows[0]), set(admin_lists.BOOKINGS.columns))
+        self.assertIn('attachment;', response['Content-Disposition'])
+
+        response = self.client.get(url, {'format': 'jsonl'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), Booking.objects.count())
+        self.assertEqual(json.loads(lines[0])['id'], str(Booking.objects.order_by('-booked_at', '-pk')[0].pk))
+
+    def test_export_rejects_bad_requests(self):
+        self.assertEqual(self.client.get(reverse('auth_mob:export_admin', args=['users'])).status_code, 404)
+        url = reverse('auth_mob:export_admin', args=['gears'])
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.client.force_login(User.objects.filter(is_superuser=False).first())
+        self.assertEqual(self.client.get(url).status_code, 403)
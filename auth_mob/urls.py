@@ -1,5 +1,5 @@
 from django.urls import path
-from auth_mob.views import login, register, logout, get_user_data, update_profile, get_user_type, get_seller_profile, update_seller_profile, get_admin_stats, get_users_list, update_user, delete_user, get_arenas_admin, create_arena_admin, update_arena_admin, delete_arena_admin, get_bookings_admin, update_booking_admin, get_events_admin, create_event_admin, update_event_admin, delete_event_admin, get_posts_admin, delete_post_admin, get_replies_admin, delete_reply_admin, get_gears_admin, delete_gear_admin
+from auth_mob.views import login, register, logout, get_user_data, update_profile, get_user_type, get_seller_profile, update_seller_profile, get_admin_stats, get_users_list, update_user, delete_user, get_arenas_admin, create_arena_admin, update_arena_admin, delete_arena_admin, get_bookings_admin, update_booking_admin, get_events_admin, create_event_admin, update_event_admin, delete_event_admin, get_posts_admin, delete_post_admin, get_replies_admin, delete_reply_admin, get_gears_admin, delete_gear_admin, export_admin
 
 app_name = 'auth_mob'
 
@@ -32,4 +32,5 @@ urlpatterns = [
     path('admin/replies/<int:reply_id>/delete/', delete_reply_admin, name='delete_reply_admin'),
     path('admin/gears/', get_gears_admin, name='get_gears_admin'),
     path('admin/gears/<int:gear_id>/delete/', delete_gear_admin, name='delete_gear_admin'),
+    path('admin/export/<str:resource>/', export_admin, name='export_admin'),
 ]
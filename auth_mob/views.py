@@ -9,11 +9,13 @@ from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from authentication.models import UserProfile, SellerProfile, UserType
+from authentication import admin_users, user_context
 from rental_gear.models import Gear, Rental
 from events.models import Event, EventRegistration
 from forum.models import Post, Reply
 from booking_arena.models import Arena, Booking
 from django.utils import timezone
+from the_rink import admin_lists, stats
 
 @ensure_csrf_cookie
 @csrf_exempt
@@ -118,60 +120,45 @@ def logout(request):
 @csrf_exempt
 def get_user_data(request):
     if request.user.is_authenticated:
-        try:
-            # Get user type
-            user_type_obj = UserType.objects.get(user=request.user)
-            user_type = user_type_obj.user_type
-
-            # Get user profile (customer data)
+        # Tipe & profil sudah ikut query user (authentication.user_context)
+        context = user_context.for_request(request)
+        user_type = context.user_type
+        profile = context.profile
+        if profile is None:
             profile, created = UserProfile.objects.get_or_create(user=request.user, defaults={'email': request.user.email})
 
-            # Base response data
-            response_data = {
-                "username": request.user.username,
-                "user_type": user_type,
-                "email": profile.email or request.user.email,
-                "full_name": profile.full_name,
-                "phone_number": profile.phone_number,
-                "date_of_birth": profile.date_of_birth.isoformat() if profile.date_of_birth else None,
-                "address": profile.address,
-                "is_superuser": request.user.is_superuser,
-                "status": True,
-                "message": "User data retrieved successfully!"
-            }
-
-            # Add seller-specific data if user is a seller
-            if user_type == 'seller':
-                try:
+        # Base response data
+        response_data = {
+            "username": request.user.username,
+            "user_type": user_type,
+            "email": profile.email or request.user.email,
+            "full_name": profile.full_name,
+            "phone_number": profile.phone_number,
+            "date_of_birth": profile.date_of_birth.isoformat() if profile.date_of_birth else None,
+            "address": profile.address,
+            "is_superuser": request.user.is_superuser,
+            "status": True,
+            "message": "User data retrieved successfully!"
+        }
+
+        # Add seller-specific data if user is a seller
+        if user_type == 'seller':
+            try:
+                seller_profile = context.seller_profile
+                if seller_profile is None:
                     seller_profile, seller_created = SellerProfile.objects.get_or_create(user=request.user)
-                    response_data.update({
-                        "business_name": seller_profile.business_name,
-                        "business_address": seller_profile.business_address,
-                    })
-                except Exception as e:
-                    # If seller profile fails, still return basic data
-                    response_data.update({
-                        "business_name": "",
-                        "business_address": "",
-                    })
-
-            return JsonResponse(response_data, status=200)
-
-        except UserType.DoesNotExist:
-            # Default to customer if no type is set
-            profile, created = UserProfile.objects.get_or_create(user=request.user, defaults={'email': request.user.email})
-            return JsonResponse({
-                "username": request.user.username,
-                "user_type": "customer",
-                "email": profile.email or request.user.email,
-                "full_name": profile.full_name,
-                "phone_number": profile.phone_number,
-                "date_of_birth": profile.date_of_birth.isoformat() if profile.date_of_birth else None,
-                "address": profile.address,
-                "is_superuser": request.user.is_superuser,
-                "status": True,
-                "message": "User data retrieved successfully!"
-            }, status=200)
+                response_data.update({
+                    "business_name": seller_profile.business_name,
+                    "business_address": seller_profile.business_address,
+                })
+            except Exception as e:
+                # If seller profile fails, still return basic data
+                response_data.update({
+                    "business_name": "",
+                    "business_address": "",
+                })
+
+        return JsonResponse(response_data, status=200)
     else:
         return JsonResponse({
             "status": False,
@@ -220,20 +207,9 @@ def get_admin_stats(request):
             "message": "Access denied. Admin privileges required."
         }, status=403)
 
-    gear_count = Gear.objects.count()
-    event_count = Event.objects.filter(date__gte=timezone.now().date()).count()
-    post_count = Post.objects.count()
-    user_count = User.objects.count()
-    arena_count = Arena.objects.count()
-    booking_count = Booking.objects.count()
-
     return JsonResponse({
-        "gear_count": gear_count,
-        "event_count": event_count,
-        "post_count": post_count,
-        "user_count": user_count,
-        "arena_count": arena_count,
-        "booking_count": booking_count,
+        **stats.counters(),
+        "rollups": stats.rollups(),
         "status": True,
         "message": "Admin stats retrieved successfully!"
     }, status=200)
@@ -241,50 +217,24 @@ def get_admin_stats(request):
 @login_required
 @csrf_exempt
 def get_users_list(request):
-    """Get list of all users for admin"""
+    """Get one page of users for admin (?q=, ?user_type=, ?cursor=, ?page_size=)"""
     if not request.user.is_superuser:
         return JsonResponse({
             "status": False,
             "message": "Access denied. Admin privileges required."
         }, status=403)
 
-    users = User.objects.all().order_by('-date_joined')
-    user_data = []
-
-    for user in users:
-        try:
-            user_type_obj = UserType.objects.get(user=user)
-            user_type = user_type_obj.user_type
-        except UserType.DoesNotExist:
-            user_type = "customer"
-
-        try:
-            profile = UserProfile.objects.get(user=user)
-            full_name = profile.full_name
-            phone = profile.phone_number
-            address = profile.address
-        except UserProfile.DoesNotExist:
-            full_name = ""
-            phone = ""
-            address = ""
-
-        user_data.append({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "is_active": user.is_active,
-            "is_superuser": user.is_superuser,
-            "date_joined": user.date_joined.isoformat(),
-            "user_type": user_type,
-            "full_name": full_name,
-            "phone_number": phone,
-            "address": address,
-        })
+    try:
+        users, next_cursor = admin_users.page(
+            request.GET.get('q'), request.GET.get('user_type'), request.GET.get('cursor'),
+            admin_users.parse_page_size(request.GET.get('page_size')),
+        )
+    except admin_users.InvalidParameter as e:
+        return JsonResponse({"status": False, "message": str(e)}, status=400)
 
     return JsonResponse({
-        "users": user_data,
+        "users": [admin_users.user_json(user) for user in users],
+        "next_cursor": next_cursor,
         "status": True,
         "message": "Users list retrieved successfully!"
     }, status=200)
@@ -420,36 +370,30 @@ def update_arena_admin(request, arena_id):
             "message": "Arena not found."
         }, status=404)
 
+def _admin_list(request, listing, message):
+    try:
+        rows, next_cursor = listing.page(request.GET)
+    except admin_lists.InvalidParameter as e:
+        return JsonResponse({"status": False, "message": str(e)}, status=400)
+
+    return JsonResponse({
+        listing.name: rows,
+        "next_cursor": next_cursor,
+        "status": True,
+        "message": message
+    }, status=200)
+
 @login_required
 @csrf_exempt
 def get_bookings_admin(request):
-    """Get list of all bookings for admin"""
+    """Get one page of bookings for admin (?sort=, ?cursor=, ?status=, ?arena=, ..., see the_rink.admin_lists)"""
     if not request.user.is_superuser:
         return JsonResponse({
             "status": False,
             "message": "Access denied. Admin privileges required."
         }, status=403)
 
-    bookings = Booking.objects.all().select_related('user', 'arena').order_by('-booked_at')
-    data = []
-    for booking in bookings:
-        data.append({
-            "id": str(booking.id),
-            "arena_name": booking.arena.name,
-            "user_username": booking.user.username,
-            "user_full_name": booking.user.userprofile.full_name if hasattr(booking.user, 'userprofile') and booking.user.userprofile.full_name else booking.user.username,
-            "date": str(booking.date),
-            "start_hour": booking.start_hour,
-            "status": booking.status,
-            "activity": booking.activity,
-            "booked_at": booking.booked_at.isoformat(),
-        })
-
-    return JsonResponse({
-        "bookings": data,
-        "status": True,
-        "message": "Bookings list retrieved successfully!"
-    }, status=200)
+    return _admin_list(request, admin_lists.BOOKINGS, "Bookings list retrieved successfully!")
 
 @login_required
 @csrf_exempt
@@ -492,40 +436,14 @@ def update_booking_admin(request, booking_id):
 @login_required
 @csrf_exempt
 def get_events_admin(request):
-    """Get list of all events for admin"""
+    """Get one page of events for admin (?sort=, ?cursor=, ?category=, ?is_active=, ..., see the_rink.admin_lists)"""
     if not request.user.is_superuser:
         return JsonResponse({
             "status": False,
             "message": "Access denied. Admin privileges required."
         }, status=403)
 
-    events = Event.objects.all().order_by('-created_at')
-    data = []
-    for event in events:
-        data.append({
-            "id": event.id,
-            "name": event.name,
-            "category": event.category,
-            "level": event.level,
-            "description": event.description,
-            "date": str(event.date),
-            "start_time": str(event.start_time),
-            "end_time": str(event.end_time),
-            "location": event.location,
-            "price": str(event.price),
-            "max_participants": event.max_participants,
-            "current_participants": event.current_participants,
-            "organizer": event.organizer,
-            "instructor": event.instructor,
-            "is_active": event.is_active,
-            "created_at": event.created_at.isoformat(),
-        })
-
-    return JsonResponse({
-        "events": data,
-        "status": True,
-        "message": "Events list retrieved successfully!"
-    }, status=200)
+    return _admin_list(request, admin_lists.EVENTS, "Events list retrieved successfully!")
 
 @login_required
 @csrf_exempt
@@ -545,10 +463,10 @@ def create_event_admin(request):
 
     try:
         data = json.loads(request.body)
-        from django.utils.text import slugify
+        from events.ingest import unique_slug
         event = Event.objects.create(
             name=data['name'],
-            slug=slugify(data['name']),
+            slug=unique_slug(data['name']),
             category=data.get('category', 'social'),
             level=data.get('level', 'all'),
             description=data['description'],
@@ -623,33 +541,14 @@ def update_event_admin(request, event_id):
 @login_required
 @csrf_exempt
 def get_posts_admin(request):
-    """Get list of all posts for admin"""
+    """Get one page of posts for admin (?cursor=, ?author=, see the_rink.admin_lists)"""
     if not request.user.is_superuser:
         return JsonResponse({
             "status": False,
             "message": "Access denied. Admin privileges required."
         }, status=403)
 
-    posts = Post.objects.all().select_related('author').order_by('-created_at')
-    data = []
-    for post in posts:
-        data.append({
-            "id": post.id,
-            "author_username": post.author.username if post.author else "Anonymous",
-            "title": post.title,
-            "content": post.content[:200] + "..." if len(post.content) > 200 else post.content,
-            "thumbnail_url": post.thumbnail_url,
-            "total_upvotes": post.total_upvotes(),
-            "total_downvotes": post.total_downvotes(),
-            "replies_count": post.replies.count(),
-            "created_at": post.created_at.isoformat(),
-        })
-
-    return JsonResponse({
-        "posts": data,
-        "status": True,
-        "message": "Posts list retrieved successfully!"
-    }, status=200)
+    return _admin_list(request, admin_lists.POSTS, "Posts list retrieved successfully!")
 
 @login_required
 @csrf_exempt
@@ -683,31 +582,14 @@ def delete_post_admin(request, post_id):
 @login_required
 @csrf_exempt
 def get_replies_admin(request):
-    """Get list of all replies for admin"""
+    """Get one page of replies for admin (?cursor=, ?post=, ?author=, see the_rink.admin_lists)"""
     if not request.user.is_superuser:
         return JsonResponse({
             "status": False,
             "message": "Access denied. Admin privileges required."
         }, status=403)
 
-    replies = Reply.objects.all().select_related('author', 'post').order_by('-created_at')
-    data = []
-    for reply in replies:
-        data.append({
-            "id": reply.id,
-            "post_title": reply.post.title,
-            "author_username": reply.author.username,
-            "content": reply.content[:200] + "..." if len(reply.content) > 200 else reply.content,
-            "total_upvotes": reply.total_upvotes(),
-            "total_downvotes": reply.total_downvotes(),
-            "created_at": reply.created_at.isoformat(),
-        })
-
-    return JsonResponse({
-        "replies": data,
-        "status": True,
-        "message": "Replies list retrieved successfully!"
-    }, status=200)
+    return _admin_list(request, admin_lists.REPLIES, "Replies list retrieved successfully!")
 
 @login_required
 @csrf_exempt
@@ -741,33 +623,36 @@ def delete_reply_admin(request, reply_id):
 @login_required
 @csrf_exempt
 def get_gears_admin(request):
-    """Get list of all gears for admin"""
+    """Get one page of gears for admin (?cursor=, ?category=, ?seller=, ..., see the_rink.admin_lists)"""
     if not request.user.is_superuser:
         return JsonResponse({
             "status": False,
             "message": "Access denied. Admin privileges required."
         }, status=403)
 
-    gears = Gear.objects.all().select_related('seller').order_by('-id')
-    data = []
-    for gear in gears:
-        data.append({
-            "id": gear.id,
-            "name": gear.name,
-            "category": gear.category,
-            "price_per_day": str(gear.price_per_day),
-            "image_url": gear.image_url,
-            "description": gear.description,
-            "stock": gear.stock,
-            "seller_username": gear.seller.username,
-            "is_featured": gear.is_featured,
-        })
+    return _admin_list(request, admin_lists.GEARS, "Gears list retrieved successfully!")
 
-    return JsonResponse({
-        "gears": data,
-        "status": True,
-        "message": "Gears list retrieved successfully!"
-    }, status=200)
+@login_required
+@csrf_exempt
+def export_admin(request, resource):
+    """Download every row of an admin list as CSV or JSON lines (?format=csv|jsonl, same filters & sort)"""
+    if not request.user.is_superuser:
+        return JsonResponse({
+            "status": False,
+            "message": "Access denied. Admin privileges required."
+        }, status=403)
+
+    listing = admin_lists.LISTS.get(resource)
+    if listing is None:
+        return JsonResponse({
+            "status": False,
+            "message": "Unknown list."
+        }, status=404)
+
+    try:
+        return listing.export(request.GET, request.GET.get('format', 'csv'))
+    except admin_lists.InvalidParameter as e:
+        return JsonResponse({"status": False, "message": str(e)}, status=400)
 
 @login_required
 @csrf_exempt
@@ -925,32 +810,21 @@ def delete_user(request, user_id):
 @csrf_exempt
 def get_user_type(request):
     """Get user type (customer or seller) for Flutter"""
-    try:
-        user_type_obj = UserType.objects.get(user=request.user)
-        return JsonResponse({
-            "user_type": user_type_obj.user_type,
-            "status": True,
-            "message": "User type retrieved successfully!"
-        }, status=200)
-    except UserType.DoesNotExist:
-        # Default to customer if no type is set
-        return JsonResponse({
-            "user_type": "customer",
-            "status": True,
-            "message": "User type retrieved successfully!"
-        }, status=200)
-    except Exception as e:
-        return JsonResponse({
-            "status": False,
-            "message": f"Failed to retrieve user type: {str(e)}"
-        }, status=400)
+    # Default customer kalau belum ada UserType
+    return JsonResponse({
+        "user_type": user_context.for_request(request).user_type,
+        "status": True,
+        "message": "User type retrieved successfully!"
+    }, status=200)
 
 @login_required
 @csrf_exempt
 def get_seller_profile(request):
     """Get seller profile data for Flutter"""
     try:
-        profile, created = SellerProfile.objects.get_or_create(user=request.user)
+        profile = user_context.for_request(request).seller_profile
+        if profile is None:
+            profile, created = SellerProfile.objects.get_or_create(user=request.user)
         return JsonResponse({
             "business_name": profile.business_name or "",
             "phone_number": profile.phone_number or "",
@@ -0,0 +1,144 @@
+"""User listing for the admin pages (web and Flutter).
+
+One query per page: the user type and both profiles come in through
+``select_related``, the type filter and the search run in SQL, and pages
+are keyset-paginated on (date_joined, id), newest first, so a deep page
+costs the same as the first.
+
+Search is a case-insensitive prefix match on username, email or full
+name. On SQLite it is written as a range on ``LOWER(column)`` (``>= 'abc'``
+and ``< 'abd'``, see prefix_end()) so the expression indexes from migration
+0003 are used; SQLite compares text byte by byte, so the range is exact. On
+PostgreSQL the order depends on the collation, so a range could miss rows:
+there it is a ``LOWER(column) LIKE 'abc%'``, served by the
+``text_pattern_ops`` indexes from migration 0004.
+"""
+import base64
+import binascii
+import sys
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.dateparse import parse_datetime
+
+from .models import SellerProfile, UserProfile, UserType
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+USER_TYPES = {value for value, _ in UserType.USER_TYPE_CHOICES}
+
+
+class InvalidParameter(ValueError):
+    pass
+
+
+def encode_cursor(user):
+    raw = f'{user.date_joined.isoformat()}|{user.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        stamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        date_joined = parse_datetime(stamp)
+        if date_joined is None:
+            raise InvalidParameter('Invalid cursor')
+        return date_joined, int(pk)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise InvalidParameter('Invalid cursor')
+
+
+def prefix_end(prefix):
+    """Smallest string above every string that starts with ``prefix`` ('abc' -> 'abd'), or None."""
+    # Karakter terakhir yang sudah maksimal gak bisa dinaikkan: buang, naikkan yang sebelumnya
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    code = ord(prefix[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        # Surrogate gak bisa di-encode ke UTF-8
+        code = 0xE000
+    return prefix[:-1] + chr(code)
+
+
+def _prefix(model, field, prefix):
+    column = f'{field}_lower'
+    queryset = model.objects.alias(**{column: Lower(field)})
+    if connection.vendor == 'postgresql':
+        return queryset.filter(**{f'{column}__startswith': prefix})
+    conditions = {f'{column}__gte': prefix}
+    end = prefix_end(prefix)
+    if end is not None:
+        conditions[f'{column}__lt'] = end
+    return queryset.filter(**conditions)
+
+
+def user_queryset(search=None, user_type=None):
+    users = User.objects.select_related('usertype', 'userprofile', 'sellerprofile')
+    if user_type:
+        if user_type not in USER_TYPES:
+            raise InvalidParameter(f'user_type must be one of {", ".join(sorted(USER_TYPES))}')
+        # User tanpa UserType dianggap customer (sama seperti sebelumnya)
+        condition = Q(usertype__user_type=user_type)
+        if user_type == 'customer':
+            condition |= Q(usertype__isnull=True)
+        users = users.filter(condition)
+    search = (search or '').strip().lower()
+    if search:
+        # UNION dari tiga pencarian per kolom: masing-masing kena index-nya sendiri
+        # (OR di satu WHERE, apalagi lintas JOIN, bikin auth_user di-scan)
+        matches = _prefix(User, 'username', search).values('pk').union(
+            _prefix(User, 'email', search).values('pk'),
+            _prefix(UserProfile, 'full_name', search).values('user_id'),
+        )
+        users = users.filter(pk__in=matches)
+    return users
+
+
+def page(search=None, user_type=None, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """Return ``(users, next_cursor)`` for one page, newest first. Raises InvalidParameter."""
+    users = user_queryset(search, user_type)
+    if cursor:
+        date_joined, pk = decode_cursor(cursor)
+        users = users.filter(Q(date_joined__lt=date_joined) | Q(date_joined=date_joined, pk__lt=pk))
+    rows = list(users.order_by('-date_joined', '-pk')[:page_size + 1])
+    if len(rows) > page_size:
+        return rows[:page_size], encode_cursor(rows[page_size - 1])
+    return rows, None
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(value if value not in (None, '') else default)
+    except (TypeError, ValueError):
+        raise InvalidParameter('page_size must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def related(user, name):
+    """The select_related one-to-one ``name`` of ``user``, or None when it doesn't exist (no query)."""
+    try:
+        return getattr(user, name)
+    except (UserType.DoesNotExist, UserProfile.DoesNotExist, SellerProfile.DoesNotExist):
+        return None
+
+
+def user_json(user):
+    user_type = related(user, 'usertype')
+    profile = related(user, 'userprofile')
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_active': user.is_active,
+        'is_superuser': user.is_superuser,
+        'date_joined': user.date_joined.isoformat(),
+        'user_type': user_type.user_type if user_type else 'customer',
+        'full_name': profile.full_name if profile else '',
+        'phone_number': profile.phone_number if profile else '',
+        'address': profile.address if profile else '',
+    }
@@ -3,6 +3,8 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from functools import wraps
 
+from .user_context import for_request
+
 def seller_required(view_func):
     """
     Decorator kustom yang memeriksa apakah pengguna sudah login DAN 
@@ -13,9 +15,7 @@ def seller_required(view_func):
     @wraps(view_func)
     @login_required(login_url='authentication:login') 
     def _wrapped_view(request, *args, **kwargs):        
-        is_seller = hasattr(request.user, 'usertype') and request.user.usertype.user_type == 'seller'
-        
-        if is_seller:
+        if for_request(request).is_seller:
             return view_func(request, *args, **kwargs)
         else:
             messages.error(request, "You do not have permission to access this page. You must be a seller.")
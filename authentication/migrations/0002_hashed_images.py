@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:16
+
+import the_rink.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_picture',
+            field=the_rink.fields.HashedImageField(blank=True, null=True, upload_to='profile_pictures/'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:32
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_hashed_images'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # auth_user bukan model app ini: index-nya lewat SQL (sintaksnya sama di SQLite dan PostgreSQL)
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_username_lower_idx ON auth_user (LOWER(username))',
+            'DROP INDEX auth_user_username_lower_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_email_lower_idx ON auth_user (LOWER(email))',
+            'DROP INDEX auth_user_email_lower_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_date_joined_idx ON auth_user (date_joined, id)',
+            'DROP INDEX auth_user_date_joined_idx',
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(django.db.models.functions.text.Lower('full_name'), name='userprofile_full_name_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# LIKE 'abc%' di PostgreSQL cuma bisa pakai index text_pattern_ops (index 0003 ikut collation)
+INDEXES = [
+    ('auth_user_username_lower_like_idx', 'auth_user', 'username'),
+    ('auth_user_email_lower_like_idx', 'auth_user', 'email'),
+    ('userprofile_full_name_like_idx', 'authentication_userprofile', 'full_name'),
+]
+
+
+def create_pattern_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in INDEXES:
+        schema_editor.execute(f'CREATE INDEX {name} ON {table} (LOWER({column}) text_pattern_ops)')
+
+
+def drop_pattern_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_admin_user_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_pattern_indexes, drop_pattern_indexes),
+    ]
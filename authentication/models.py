@@ -1,15 +1,24 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 
+from the_rink.fields import HashedImageField
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    profile_picture = HashedImageField(upload_to='profile_pictures/', blank=True, null=True)
     full_name = models.CharField(max_length=100, blank=True)
     phone_number = models.CharField(max_length=15, blank=True)
     email = models.EmailField(blank=True)
     date_of_birth = models.DateField(blank=True, null=True)
     address = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # Prefix search nama di daftar user admin (authentication.admin_users)
+            models.Index(Lower('full_name'), name='userprofile_full_name_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
@@ -1,8 +1,12 @@
-from django.test import TestCase, Client
+from django.test import RequestFactory, TestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from .models import UserProfile, SellerProfile, UserType
-from rental_gear.models import Gear
+from . import admin_users, user_context
+from rental_gear.context_processors import cart_count
+from rental_gear.models import CartItem, Gear
 from events.models import Event
 from forum.models import Post
 
@@ -212,3 +216,127 @@ class AuthenticationTestCase(TestCase):
         # Check user is deleted
         with self.assertRaises(User.DoesNotExist):
             User.objects.get(id=self.user.id)
+
+
+class AdminUserListingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('boss', password='pw')
+        for i in range(12):
+            user = User.objects.create_user(f'skater{i:02d}', email=f'skater{i:02d}@example.com')
+            UserType.objects.create(user=user, user_type='seller' if i % 3 == 0 else 'customer')
+            UserProfile.objects.create(user=user, full_name=f'Rink Member {i}')
+            if i % 3 == 0:
+                SellerProfile.objects.create(user=user, business_name=f'Shop {i}')
+        UserProfile.objects.filter(user__username='skater05').update(full_name='Zamboni Driver')
+
+    def list_users(self, **params):
+        return self.client.get(reverse('auth_mob:get_users_list'), params)
+
+    def test_query_count_does_not_grow_with_users(self):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as small:
+            self.list_users(page_size=5)
+        with CaptureQueriesContext(connection) as large:
+            self.list_users(page_size=200)
+        self.assertEqual(len(small), len(large))
+
+    def test_keyset_pages_cover_every_user_once(self):
+        self.client.force_login(self.admin)
+        seen, cursor = [], None
+        while True:
+            data = self.list_users(page_size=5, **({'cursor': cursor} if cursor else {})).json()
+            seen += [u['username'] for u in data['users']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), sorted(User.objects.values_list('username', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_prefix_search_and_type_filter(self):
+        self.client.force_login(self.admin)
+        names = lambda **p: sorted(u['username'] for u in self.list_users(**p).json()['users'])
+        self.assertEqual(names(q='ZAMBONI'), ['skater05'])
+        self.assertEqual(names(q='skater1'), ['skater10', 'skater11'])
+        self.assertEqual(names(q='skater0', user_type='seller'), ['skater00', 'skater03', 'skater06', 'skater09'])
+        # Tanpa UserType dihitung customer
+        self.assertIn('boss', names(user_type='customer'))
+        self.assertEqual(self.list_users(user_type='admin').status_code, 400)
+        self.assertEqual(self.list_users(cursor='nope').status_code, 400)
+
+    def test_prefix_search_non_ascii(self):
+        self.client.force_login(self.admin)
+        User.objects.create_user('ñandú')
+        User.objects.create_user('puck\U0001F3D2')
+        UserProfile.objects.create(user=User.objects.create_user('goalie'), full_name='\U0001F3D2 kiper')
+        names = lambda q: sorted(u['username'] for u in self.list_users(q=q).json()['users'])
+        self.assertEqual(names('ñan'), ['ñandú'])
+        # Karakter di luar BMP (emoji) > '\uffff': dulu kelewat oleh batas atas range
+        self.assertEqual(names('puck'), ['puck\U0001F3D2'])
+        self.assertEqual(names('\U0001F3D2'), ['goalie'])
+        self.assertEqual(admin_users.prefix_end('ab'), 'ac')
+        self.assertEqual(admin_users.prefix_end('a\U0010FFFF'), 'b')
+
+    def test_related_profiles_need_no_extra_queries(self):
+        users, _ = admin_users.page(page_size=20)
+        with self.assertNumQueries(0):
+            rows = [admin_users.user_json(user) for user in users]
+            [admin_users.related(user, 'sellerprofile') for user in users]
+        self.assertEqual(next(r for r in rows if r['username'] == 'skater03')['user_type'], 'seller')
+
+
+class UserContextTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username='ctxseller', password='pw', email='ctx@example.com')
+        UserType.objects.create(user=cls.seller, user_type='seller')
+        UserProfile.objects.create(user=cls.seller, full_name='Ctx Seller')
+        SellerProfile.objects.create(user=cls.seller, business_name='Ctx Rentals')
+        cls.gears = [Gear.objects.create(name=f'Ctx gear {i}', category='hockey', price_per_day=10, seller=cls.seller)
+                     for i in range(3)]
+        CartItem.objects.create(user=cls.seller, gear=cls.gears[0])
+        # User lama tanpa UserType/profil
+        cls.plain = User.objects.create_user(username='ctxplain', password='pw')
+
+    def test_session_user_carries_context(self):
+        self.client.force_login(self.seller)
+        with self.assertNumQueries(2):  # session + user (dengan tipe, profil & cart)
+            data = self.client.get(reverse('auth_mob:get_user_data')).json()
+        self.assertEqual(data['user_type'], 'seller')
+        self.assertEqual(data['full_name'], 'Ctx Seller')
+        self.assertEqual(data['business_name'], 'Ctx Rentals')
+
+    def test_user_without_type_is_customer(self):
+        self.client.force_login(self.plain)
+        self.assertEqual(self.client.get(reverse('auth_mob:get_user_type')).json()['user_type'], 'customer')
+        self.assertFalse(user_context.is_seller(User.objects.get(pk=self.plain.pk)))
+        self.assertTrue(user_context.is_seller(self.seller))
+
+    def test_user_from_elsewhere_loaded_once(self):
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=self.seller.pk)
+        context = user_context.for_request(request)
+        with self.assertNumQueries(1):
+            self.assertEqual(context.cart_count, 1)
+            self.assertTrue(context.is_seller)
+            self.assertEqual(context.profile.full_name, 'Ctx Seller')
+            self.assertEqual(context.seller_profile.business_name, 'Ctx Rentals')
+
+    def test_changes_during_request_update_context(self):
+        request = RequestFactory().get('/')
+        request.user = user_context.user_queryset().get(pk=self.seller.pk)
+
+        def view(request):
+            self.assertEqual(cart_count(request), {'cart_count': 1})
+            CartItem.objects.create(user=self.seller, gear=self.gears[1])
+            self.assertEqual(cart_count(request), {'cart_count': 2})
+            UserProfile.objects.filter(user=self.seller).get().delete()
+            self.assertIsNone(request.user_context.profile)
+            profile = UserProfile.objects.create(user=self.seller, full_name='Baru')
+            with self.assertNumQueries(0):
+                self.assertEqual(request.user_context.profile, profile)
+            return None
+
+        user_context.UserContextMiddleware(view)(request)
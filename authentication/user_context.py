@@ -0,0 +1,180 @@
+"""Everything the pages need about ``request.user``, loaded once per request.
+
+UserContextBackend (first in AUTHENTICATION_BACKENDS) loads the session
+user together with its UserType, UserProfile and SellerProfile
+(``select_related``) and its cart size (a COUNT subquery), so the query
+Django already runs for ``request.user`` is the only one. Users that come
+from elsewhere (a session made by the plain ModelBackend, RequestFactory in
+tests) are topped up with one query on first use.
+
+UserContextMiddleware puts a lazy UserContext on ``request.user_context``;
+context processors, decorators and views read the type, profiles and cart
+count from it (or from is_seller() for ``user_passes_test``) instead of
+querying again. Saving or deleting one of those rows, or a cart item, during
+the request updates the context, so a page rendered after "add to cart"
+shows the new count.
+"""
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.utils.functional import LazyObject, empty
+
+from .admin_users import related
+
+# Relasi one-to-one User -> model, yang ikut di-select_related
+RELATIONS = {
+    'usertype': 'authentication.UserType',
+    'userprofile': 'authentication.UserProfile',
+    'sellerprofile': 'authentication.SellerProfile',
+}
+
+_current = ContextVar('user_context', default=None)
+
+
+def user_queryset():
+    CartItem = apps.get_model('rental_gear', 'CartItem')
+    cart = CartItem.objects.filter(user=OuterRef('pk')).order_by().values('user')
+    return User.objects.select_related(*RELATIONS).annotate(
+        cart_count=Coalesce(Subquery(cart.annotate(n=Count('id')).values('n')), 0),
+    )
+
+
+def is_loaded(user):
+    # hasattr, bukan __dict__: request.user biasanya SimpleLazyObject
+    return hasattr(user, 'cart_count')
+
+
+def load(user):
+    """Fill in the relations and cart count of ``user`` (one query) unless it already has them."""
+    if not user.is_authenticated or is_loaded(user):
+        return user
+    loaded = user_queryset().get(pk=user.pk)
+    for name in RELATIONS:
+        user._state.fields_cache[name] = loaded._state.fields_cache.get(name)
+    user.cart_count = loaded.cart_count
+    return user
+
+
+def user_type(user):
+    # User tanpa UserType dianggap customer
+    usertype = related(user, 'usertype') if user.is_authenticated else None
+    return usertype.user_type if usertype else 'customer'
+
+
+def is_seller(user):
+    """``user_passes_test`` check: logged in with user type 'seller'."""
+    return user.is_authenticated and user_type(user) == 'seller'
+
+
+class UserContext:
+
+    def __init__(self, request):
+        self.request = request
+
+    @property
+    def user(self):
+        return load(self.request.user)
+
+    @property
+    def is_authenticated(self):
+        return self.request.user.is_authenticated
+
+    @property
+    def user_type(self):
+        return user_type(self.user)
+
+    @property
+    def is_seller(self):
+        return is_seller(self.user)
+
+    @property
+    def profile(self):
+        return related(self.user, 'userprofile') if self.is_authenticated else None
+
+    @property
+    def seller_profile(self):
+        return related(self.user, 'sellerprofile') if self.is_authenticated else None
+
+    @property
+    def cart_count(self):
+        return self.user.cart_count if self.is_authenticated else 0
+
+
+def for_request(request):
+    context = getattr(request, 'user_context', None)
+    if context is None:
+        # Tanpa middleware (RequestFactory, dsb.)
+        context = request.user_context = UserContext(request)
+    return context
+
+
+class UserContextBackend(ModelBackend):
+    """ModelBackend whose session user already carries the UserContext data."""
+
+    def get_user(self, user_id):
+        try:
+            user = user_queryset().get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+class UserContextMiddleware:
+    """Put a lazy UserContext on ``request.user_context`` (after AuthenticationMiddleware)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user_context = UserContext(request)
+        token = _current.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
+
+
+# --- Signals ------------------------------------------------------------------
+
+def _current_user(user_id):
+    """request.user of the running request if it is ``user_id`` and already loaded, else None."""
+    request = _current.get()
+    if request is None:
+        return None
+    user = getattr(request, 'user', None)
+    if user is None or isinstance(user, LazyObject) and user._wrapped is empty:
+        # request.user belum pernah dipakai: nanti dimuat dalam keadaan terbaru
+        return None
+    if not user.is_authenticated or user.pk != user_id or not is_loaded(user):
+        return None
+    return user
+
+
+def _on_relation_change(sender, instance, signal, **kwargs):
+    user = _current_user(instance.user_id)
+    if user is None:
+        return
+    name = next(name for name, label in RELATIONS.items() if label == sender._meta.label)
+    user._state.fields_cache[name] = None if signal is post_delete else instance
+
+
+def _on_cart_change(sender, instance, **kwargs):
+    user = _current_user(instance.user_id)
+    if user is not None:
+        # Dimuat ulang (satu query) kalau nanti dibaca lagi
+        del user.cart_count
+
+
+def connect_signals():
+    for label in RELATIONS.values():
+        model = apps.get_model(label)
+        for signal in (post_save, post_delete):
+            signal.connect(_on_relation_change, sender=model, dispatch_uid=f'user_context:{label}:{signal is post_save}')
+    CartItem = apps.get_model('rental_gear', 'CartItem')
+    post_save.connect(_on_cart_change, sender=CartItem, dispatch_uid='user_context:cart:save')
+    post_delete.connect(_on_cart_change, sender=CartItem, dispatch_uid='user_context:cart:delete')
@@ -5,11 +5,14 @@ from django.contrib.auth import authenticate, login, logout
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
 from .models import UserProfile, SellerProfile, UserType
+from . import admin_users, user_context
 from .forms import UserProfileForm, SellerProfileForm, CustomUserCreationForm
 from rental_gear.models import Gear
+from the_rink import stats
 
 # Create your views here.
 @csrf_exempt
@@ -53,8 +56,8 @@ def login_user(request):
             if created:
                 user.set_password('dikadalin')  # Set password for database
                 user.save()
-            # Login as the admin user
-            login(request, user)
+            # Login as the admin user (backend wajib disebut: ada lebih dari satu di settings)
+            login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
             # Set a flag to indicate admin is logged in
             request.session['admin_logged_in'] = True
             return redirect('authentication:dashadmin')
@@ -96,18 +99,22 @@ def admin_middleware_check(request):
 
 @login_required
 def profile(request):
-    # Get user type
-    user_type_obj = UserType.objects.get(user=request.user)
-    user_type = user_type_obj.user_type
+    # Tipe & profil sudah ikut query user (authentication.user_context)
+    context = user_context.for_request(request)
+    user_type = context.user_type
 
     # Get user profile (customer data)
-    user_profile, created = UserProfile.objects.get_or_create(user=request.user)
+    user_profile = context.profile
+    if user_profile is None:
+        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
 
     # Get seller profile and products if user is a seller
     seller_profile = None
     user_products = None
     if user_type == 'seller':
-        seller_profile, seller_created = SellerProfile.objects.get_or_create(user=request.user)
+        seller_profile = context.seller_profile
+        if seller_profile is None:
+            seller_profile, seller_created = SellerProfile.objects.get_or_create(user=request.user)
         user_products = Gear.objects.filter(seller=request.user)
 
     if request.method == 'POST':
@@ -168,23 +175,33 @@ def admin_user_list(request):
     if not request.session.get('is_admin'):
         return redirect('authentication:login')
 
-    users = User.objects.all().order_by('-date_joined')
-    user_types = UserType.objects.all()
-    user_profiles = UserProfile.objects.all()
-    seller_profiles = SellerProfile.objects.all()
-
-    # Create a dictionary to map user to their type and profiles
-    user_data = {}
-    for user in users:
-        user_data[user.id] = {
+    search = request.GET.get('q', '').strip()
+    user_type = request.GET.get('type', '')
+    try:
+        users, next_cursor = admin_users.page(
+            search, user_type, request.GET.get('cursor'), admin_users.parse_page_size(request.GET.get('page_size')),
+        )
+    except admin_users.InvalidParameter:
+        # Parameter ngaco dari URL: balik ke halaman pertama tanpa filter
+        search, user_type = '', ''
+        users, next_cursor = admin_users.page()
+
+    # Satu query untuk satu halaman; profil & tipe sudah ikut lewat select_related
+    user_data = {
+        user.id: {
             'user': user,
-            'user_type': user_types.filter(user=user).first(),
-            'user_profile': user_profiles.filter(user=user).first(),
-            'seller_profile': seller_profiles.filter(user=user).first(),
+            'user_type': admin_users.related(user, 'usertype'),
+            'user_profile': admin_users.related(user, 'userprofile'),
+            'seller_profile': admin_users.related(user, 'sellerprofile'),
         }
+        for user in users
+    }
 
     context = {
         'user_data': user_data,
+        'search': search,
+        'user_type': user_type,
+        'next_cursor': next_cursor,
     }
     return render(request, 'authentication/admin_user_list.html', context)
 
@@ -283,22 +300,7 @@ def dashadmin(request):
     if not request.session.get('is_admin'):
         return redirect('authentication:login')
 
-    # Get counts for system overview
-    from rental_gear.models import Gear
-    from events.models import Event
-    from forum.models import Post
-    from django.contrib.auth.models import User
-
-    gear_count = Gear.objects.count()
-    event_count = Event.objects.filter(date__gte=timezone.now().date()).count()
-    post_count = Post.objects.count()
-    user_count = User.objects.count()
-
-    context = {
-        'gear_count': gear_count,
-        'event_count': event_count,
-        'post_count': post_count,
-        'user_count': user_count,
-    }
+    # Semua counter dalam satu query + rollup (the_rink.stats), di-cache sebentar
+    context = {**stats.counters(), 'rollups': stats.rollups()}
 
     return render(request, 'dashadmin.html', context)
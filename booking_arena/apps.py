@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class BookingArenaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'booking_arena'
\ No newline at end of file
+    name = 'booking_arena'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,130 @@
+# File: booking_arena/availability.py
+"""Bulk slot availability from 24-bit per-day masks.
+
+An arena's bookable hours on a day are ``opening_mask & ~booked_mask``:
+the opening mask comes from ArenaOpeningHours (7 rules per arena) and the
+booked mask from ArenaDayOccupancy. Every function here answers for many
+arenas and many days with two queries, no per-day round trips.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Arena, ArenaDayOccupancy, ArenaOpeningHours, Booking
+
+HOURS_PER_DAY = 24
+FULL_DAY = (1 << HOURS_PER_DAY) - 1
+
+
+def opening_mask(open_time, close_time):
+    # Sama dengan loop slot lama: dari jam buka sampai sebelum jam tutup
+    if not open_time or not close_time:
+        return 0
+    mask = 0
+    for hour in range(open_time.hour, close_time.hour):
+        mask |= 1 << hour
+    return mask
+
+
+def hours_in(mask):
+    return [hour for hour in range(HOURS_PER_DAY) if mask & (1 << hour)]
+
+
+def _date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def free_masks(start, end, arena_ids=None, now=None):
+    """Return ``{arena_id: {date: free_mask}}`` for every arena and day in [start, end].
+
+    When ``now`` is given, days before it and hours up to its current hour
+    are treated as unavailable.
+    """
+    if arena_ids is None:
+        arena_ids = list(Arena.objects.values_list('id', flat=True))
+    arena_ids = list(arena_ids)
+
+    weekly = defaultdict(lambda: [0] * 7)
+    rules = ArenaOpeningHours.objects.filter(arena_id__in=arena_ids).values_list(
+        'arena_id', 'day', 'open_time', 'close_time'
+    )
+    for arena_id, day, open_time, close_time in rules:
+        weekly[arena_id][day] = opening_mask(open_time, close_time)
+
+    booked = {
+        (arena_id, date): mask
+        for arena_id, date, mask in ArenaDayOccupancy.objects.filter(
+            arena_id__in=arena_ids, date__range=(start, end), booked_mask__gt=0
+        ).values_list('arena_id', 'date', 'booked_mask')
+    }
+
+    result = {}
+    for arena_id in arena_ids:
+        days = {}
+        for day in _date_range(start, end):
+            mask = weekly[arena_id][day.weekday()] & ~booked.get((arena_id, day), 0)
+            if now is not None:
+                if day < now.date():
+                    mask = 0
+                elif day == now.date():
+                    mask &= FULL_DAY ^ ((1 << (now.hour + 1)) - 1)
+            days[day] = mask & FULL_DAY
+        result[arena_id] = days
+    return result
+
+
+def arenas_free_at(hour, start, end, arena_ids=None, now=None):
+    """Return ``{arena_id: [dates]}`` of days where ``hour`` is free, e.g. 18:00 next week."""
+    bit = 1 << hour
+    masks = free_masks(start, end, arena_ids, now)
+    return {
+        arena_id: [day for day, mask in days.items() if mask & bit]
+        for arena_id, days in masks.items()
+    }
+
+
+def earliest_free_slots(start, end, arena_ids=None, now=None):
+    """Return ``{arena_id: (date, hour) or None}`` for the first free slot of each arena."""
+    result = {}
+    for arena_id, days in free_masks(start, end, arena_ids, now).items():
+        result[arena_id] = None
+        for day in sorted(days):
+            mask = days[day]
+            if mask:
+                # bit terendah yang nyala = jam paling pagi
+                result[arena_id] = (day, (mask & -mask).bit_length() - 1)
+                break
+    return result
+
+
+def day_masks(arena_id, date):
+    """Return ``(opening_mask, booked_mask)`` of one arena on one day."""
+    rule = ArenaOpeningHours.objects.filter(arena_id=arena_id, day=date.weekday()).first()
+    opening = opening_mask(rule.open_time, rule.close_time) if rule else 0
+    booked = ArenaDayOccupancy.objects.filter(arena_id=arena_id, date=date).values_list(
+        'booked_mask', flat=True
+    ).first()
+    return opening, booked or 0
+
+
+def rebuild_occupancy():
+    """Recompute every ArenaDayOccupancy row from Booking. Returns the row count."""
+    masks = defaultdict(int)
+    booked = Booking.objects.filter(status='Booked').values_list('arena_id', 'date', 'start_hour')
+    for arena_id, date, hour in booked.iterator(chunk_size=2000):
+        masks[(arena_id, date)] |= 1 << hour
+
+    with transaction.atomic():
+        ArenaDayOccupancy.objects.all().delete()
+        ArenaDayOccupancy.objects.bulk_create(
+            [
+                ArenaDayOccupancy(arena_id=arena_id, date=date, booked_mask=mask)
+                for (arena_id, date), mask in masks.items()
+            ],
+            batch_size=1000,
+        )
+    return len(masks)
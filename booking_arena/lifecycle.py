@@ -0,0 +1,80 @@
+# File: booking_arena/lifecycle.py
+"""Booked -> Completed transitions for slots whose hour has passed.
+
+A slot ``h:00`` on ``date`` is over once the clock reaches ``h+1:00``. The
+worker walks elapsed 'Booked' rows in (date, start_hour) order over
+``booking_status_date_idx`` and flips them with one UPDATE per batch. The
+UPDATE keeps ``status='Booked'`` in its WHERE, so re-running (or two workers
+racing) never double counts or touches cancelled rows. Progress is stored in
+LifecycleWatermark so the next run only scans slots that elapsed since,
+plus a lookback of LOOKBACK_DAYS behind the watermark: a row that became
+'Booked' after its slot was already behind the watermark (an admin setting
+a booking back to Booked, for instance) still gets completed.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Booking, LifecycleWatermark
+
+WATERMARK_NAME = "booking_completed"
+DEFAULT_BATCH_SIZE = 500
+# Rentang di belakang watermark yang tetap di-scan ulang tiap run (murah: index status+date)
+LOOKBACK_DAYS = 2
+
+
+def cutoff_for(now=None):
+    """Return ``(date, hour)``: every slot strictly before it has elapsed."""
+    now = timezone.localtime(now or timezone.now())
+    return now.date(), now.hour
+
+
+def elapsed_bookings(now=None, since=None):
+    cutoff_date, cutoff_hour = cutoff_for(now)
+    qs = Booking.objects.filter(status='Booked').filter(
+        Q(date__lt=cutoff_date) | Q(date=cutoff_date, start_hour__lt=cutoff_hour)
+    )
+    if since is not None:
+        since_date, since_hour = since
+        qs = qs.filter(Q(date__gt=since_date) | Q(date=since_date, start_hour__gte=since_hour))
+    return qs
+
+
+def get_watermark():
+    mark = LifecycleWatermark.objects.filter(name=WATERMARK_NAME).first()
+    return (mark.date, mark.start_hour) if mark else None
+
+
+def complete_elapsed_bookings(now=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, full=False):
+    """Mark elapsed bookings Completed. Returns ``(count, batches)``.
+
+    ``full`` ignores the watermark (e.g. after importing past bookings);
+    ``dry_run`` only counts what would change and leaves the watermark alone.
+    """
+    cutoff = cutoff_for(now)
+    since = None if full else get_watermark()
+    if since is not None:
+        since = (since[0] - datetime.timedelta(days=LOOKBACK_DAYS), 0)
+    pending = elapsed_bookings(now, since)
+
+    if dry_run:
+        return pending.count(), 0
+
+    total = batches = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                pending.order_by('date', 'start_hour').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            # Occupancy bitmask sengaja gak disentuh: slot yang sudah lewat memang gak bisa di-book lagi
+            total += Booking.objects.filter(pk__in=ids, status='Booked').update(status='Completed')
+        batches += 1
+
+    LifecycleWatermark.objects.update_or_create(
+        name=WATERMARK_NAME, defaults={'date': cutoff[0], 'start_hour': cutoff[1]}
+    )
+    return total, batches
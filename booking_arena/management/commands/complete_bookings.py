@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from booking_arena.lifecycle import DEFAULT_BATCH_SIZE, complete_elapsed_bookings, get_watermark
+
+
+class Command(BaseCommand):
+    help = 'Tandai booking yang jamnya sudah lewat sebagai Completed (batch UPDATE, idempotent)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Hitung saja, jangan update apa-apa')
+        parser.add_argument('--full', action='store_true', help='Abaikan watermark dan scan semua booking')
+        parser.add_argument('--loop', type=int, default=0, metavar='SECONDS',
+                            help='Jalan terus, ulangi tiap SECONDS detik (mode scheduler)')
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_once(options)
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+
+    def run_once(self, options):
+        watermark = get_watermark()
+        count, batches = complete_elapsed_bookings(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            full=options['full'],
+        )
+        if options['dry_run']:
+            self.stdout.write(f'[dry-run] {count} booking(s) would be marked Completed (watermark: {watermark}).')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'{count} booking(s) marked Completed in {batches} batch(es).'
+            ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from booking_arena.availability import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Rebuild occupancy bitmask per arena per hari dari tabel Booking'
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild_occupancy()
+        self.stdout.write(self.style.SUCCESS(f'Occupancy rebuilt: {rows} arena-day rows.'))
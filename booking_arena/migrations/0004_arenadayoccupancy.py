@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:46
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_occupancy(apps, schema_editor):
+    Booking = apps.get_model('booking_arena', 'Booking')
+    ArenaDayOccupancy = apps.get_model('booking_arena', 'ArenaDayOccupancy')
+    masks = defaultdict(int)
+    booked = Booking.objects.filter(status='Booked').values_list('arena_id', 'date', 'start_hour')
+    for arena_id, date, hour in booked.iterator(chunk_size=2000):
+        masks[(arena_id, date)] |= 1 << hour
+    ArenaDayOccupancy.objects.bulk_create(
+        [
+            ArenaDayOccupancy(arena_id=arena_id, date=date, booked_mask=mask)
+            for (arena_id, date), mask in masks.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_arena', '0003_alter_arenaopeninghours_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArenaDayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booked_mask', models.IntegerField(default=0)),
+                ('arena', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='booking_arena.arena')),
+            ],
+            options={
+                'unique_together': {('arena', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,8 @@ from django.db import models
 
 # Create your models here.
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 import uuid
 
@@ -68,6 +69,90 @@ class Booking(models.Model):
     class Meta:
         # Mencegah double book untuk slot & tanggal yang sama
         unique_together = ('arena', 'date', 'start_hour')
+        indexes = [
+            # Buat worker lifecycle & query history: status dulu, lalu urutan waktu
+            models.Index(fields=['status', 'date', 'start_hour'], name='booking_status_date_idx'),
+            # "Booking saya" (upcoming/history) per user
+            models.Index(fields=['user', 'status', 'date', 'start_hour'], name='booking_user_status_idx'),
+            # Slot list per arena per hari
+            models.Index(fields=['arena', 'date', 'status'], name='booking_arena_day_idx'),
+            # Sort list & export admin (keyset: kolom sort + id)
+            models.Index(fields=['booked_at', 'id'], name='booking_booked_idx'),
+            models.Index(fields=['date', 'id'], name='booking_date_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Slot yang tersimpan di DB, buat tau bit occupancy mana yang harus digeser.
+        # Kalau field-nya di-defer (.only()), jangan di-load di sini biar gak rekursif
+        if {'arena_id', 'date', 'start_hour', 'status'} <= set(field_names):
+            instance._saved_slot = instance._slot()
+        return instance
+
+    def _slot(self):
+        if self.status != 'Booked':
+            return None
+        return (self.arena_id, self.date, self.start_hour)
+
+    def _load_saved_slot(self):
+        if not hasattr(self, '_saved_slot'):
+            self._saved_slot = None
+            if not self._state.adding:
+                row = Booking.objects.filter(pk=self.pk, status='Booked').values_list(
+                    'arena_id', 'date', 'start_hour'
+                ).first()
+                self._saved_slot = tuple(row) if row else None
+        return self._saved_slot
+
+    def save(self, *args, **kwargs):
+        # Occupancy digeser di signals.py (post_save), di transaksi yang sama
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.user.username} @ {self.arena.name} on {self.date} ({self.start_hour:02d}:00)"
+
+
+class ArenaDayOccupancy(models.Model):
+    # Bit ke-h di booked_mask = slot jam h:00 sudah di-booking (status 'Booked').
+    # Dijaga oleh signal Booking (booking_arena/signals.py); `manage.py rebuild_availability` kalau drift
+    # (QuerySet.update() & bulk_create gak lewat signal).
+    arena = models.ForeignKey(Arena, on_delete=models.CASCADE, related_name='occupancy')
+    date = models.DateField()
+    booked_mask = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('arena', 'date')
+
+    @classmethod
+    def occupy(cls, arena_id, date, hour):
+        cls.occupy_mask(arena_id, date, 1 << int(hour))
+
+    @classmethod
+    def occupy_mask(cls, arena_id, date, mask):
+        cls.objects.get_or_create(arena_id=arena_id, date=date)
+        cls.objects.filter(arena_id=arena_id, date=date).update(
+            booked_mask=F('booked_mask').bitor(mask)
+        )
+
+    @classmethod
+    def release(cls, arena_id, date, hour):
+        cls.objects.filter(arena_id=arena_id, date=date).update(
+            booked_mask=F('booked_mask').bitand(((1 << 24) - 1) ^ (1 << int(hour)))
+        )
+
+    def __str__(self):
+        return f"{self.arena} on {self.date}: {self.booked_mask:024b}"
+
+
+class LifecycleWatermark(models.Model):
+    # Sampai slot (date, start_hour) mana worker lifecycle sudah jalan.
+    # Dipakai `manage.py complete_bookings` supaya run berikutnya gak scan ulang dari awal.
+    name = models.CharField(max_length=50, unique=True)
+    date = models.DateField()
+    start_hour = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.user.username} @ {self.arena.name} on {self.date} ({self.start_hour:02d}:00)"
\ No newline at end of file
+        return f"{self.name}: {self.date} {self.start_hour:02d}:00"
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import Arena, ArenaOpeningHours, Booking
+from .services import BookingError, SlotUnavailable, claim_slot, validate_slot
 from django.contrib.auth.models import User
+from the_rink.thumbnails import ThumbnailField
 
 # --- USER SERIALIZER ---
 # Kita butuh ini biar frontend tau nama yang booking siapa
@@ -20,12 +22,14 @@ class ArenaOpeningHoursSerializer(serializers.ModelSerializer):
 class ArenaSerializer(serializers.ModelSerializer):
     # Nested serializer biar pas fetch Arena, jam bukanya langsung kebawa
     opening_hours_rules = ArenaOpeningHoursSerializer(many=True, read_only=True)
+    # Gambar arena aslinya bisa besar banget; list pakai thumbnail ini
+    thumbnail_url = ThumbnailField('list', source='img_url')
     
     class Meta:
         model = Arena
         fields = [
             'id', 'name', 'description', 'capacity', 'location', 
-            'img_url', 'opening_hours_text', 'google_maps_url',
+            'img_url', 'thumbnail_url', 'opening_hours_text', 'google_maps_url',
             'opening_hours_rules' 
         ]
 
@@ -43,16 +47,26 @@ class BookingSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['user', 'booked_at', 'status']
 
-    # Validasi biar gak tabrakan slot (Optional, karena unique_together udah handle, tapi ini lebih rapi error-nya)
+    # Validasi & booking lewat booking_arena.services, sama kayak web & Flutter
     def validate(self, data):
-        # Cek apakah slot ini udah ada yang booking & statusnya bukan Cancelled
-        existing = Booking.objects.filter(
-            arena=data['arena'],
-            date=data['date'],
-            start_hour=data['start_hour']
-        ).exclude(status='Cancelled')
-        
-        if existing.exists():
+        try:
+            booked_mask = validate_slot(data['arena'], data['date'], data['start_hour'])
+        except BookingError as e:
+            raise serializers.ValidationError(str(e))
+
+        if booked_mask & (1 << data['start_hour']):
+            raise serializers.ValidationError("Slot ini sudah dibooking orang lain, bro.")
+
+        return data
+
+    def create(self, validated_data):
+        try:
+            return claim_slot(
+                validated_data['user'],
+                validated_data['arena'],
+                validated_data['date'],
+                validated_data['start_hour'],
+                validated_data.get('activity'),
+            )
+        except SlotUnavailable:
             raise serializers.ValidationError("Slot ini sudah dibooking orang lain, bro.")
-            
-        return data
\ No newline at end of file
@@ -0,0 +1,246 @@
+# File: booking_arena/services.py
+"""Single booking path for the HTMX views, the Flutter API and BookingSerializer.
+
+The slot is claimed with a single ``INSERT ... ON CONFLICT DO UPDATE ...
+WHERE status <> 'Booked' RETURNING id`` (PostgreSQL and SQLite >= 3.35), so a
+free slot, a cancelled row that can be reused and a lost race are all settled
+by the database in one statement. Losers get SlotUnavailable (HTTP 409)
+instead of an IntegrityError.
+"""
+import datetime
+import time
+import uuid
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.utils import timezone
+
+from . import availability, lifecycle
+from .models import ArenaDayOccupancy, ArenaOpeningHours, Booking
+
+# SQLite cuma punya satu writer; kalau DB lagi di-lock kita coba lagi sebentar
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05
+
+CLAIM_FIELDS = ("id", "arena", "user", "date", "start_hour", "booked_at", "status", "activity")
+
+
+class BookingError(Exception):
+    status = 400
+
+
+class SlotUnavailable(BookingError):
+    status = 409
+
+
+def validate_slot(arena, date, hour):
+    if date is None:
+        raise BookingError("Invalid date format (YYYY-MM-DD).")
+    if not 0 <= hour < availability.HOURS_PER_DAY:
+        raise BookingError("Invalid hour.")
+    today, current_hour = lifecycle.cutoff_for()
+    if date < today:
+        raise BookingError("Cannot book past dates.")
+    if date == today and hour < current_hour:
+        # Jam yang sudah lewat gak akan pernah disentuh worker lifecycle (watermark sudah lewat)
+        raise BookingError("Cannot book past hours.")
+
+    open_mask, booked_mask = availability.day_masks(arena.pk, date)
+    if not open_mask & (1 << hour):
+        raise BookingError(f"Arena is closed at {hour}:00.")
+    return booked_mask
+
+
+def _claim_sql():
+    qn = connection.ops.quote_name
+    table = qn(Booking._meta.db_table)
+    col = {f.name: qn(f.column) for f in Booking._meta.concrete_fields}
+    columns = ", ".join(col[name] for name in CLAIM_FIELDS)
+    placeholders = ", ".join(["%s"] * len(CLAIM_FIELDS))
+    updates = ", ".join(
+        f"{col[name]} = excluded.{col[name]}"
+        for name in ("user", "booked_at", "status", "activity")
+    )
+    return (
+        f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) "
+        f"ON CONFLICT ({col['arena']}, {col['date']}, {col['start_hour']}) DO UPDATE "
+        f"SET {updates} WHERE {table}.{col['status']} <> %s "
+        f"RETURNING {col['id']}"
+    )
+
+
+def _claim(user, arena, date, hour, activity):
+    values = {
+        "id": uuid.uuid4(),
+        "arena": arena.pk,
+        "user": user.pk,
+        "date": date,
+        "start_hour": hour,
+        "booked_at": timezone.now(),
+        "status": "Booked",
+        "activity": activity,
+    }
+    params = [
+        Booking._meta.get_field(name).get_db_prep_save(values[name], connection)
+        for name in CLAIM_FIELDS
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(_claim_sql(), params + ["Booked"])
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return Booking._meta.pk.to_python(row[0])
+
+
+def claim_slot(user, arena, date, hour, activity=None):
+    """Book ``arena`` at ``date`` ``hour``:00 for ``user`` and return the Booking.
+
+    Raises BookingError for invalid input and SlotUnavailable when someone
+    else holds the slot.
+    """
+    hour = int(hour)
+    for attempt in range(LOCK_RETRIES):
+        try:
+            # Pengecekan cepat lewat bitmask juga bisa kena lock, jadi ikut di-retry
+            booked_mask = validate_slot(arena, date, hour)
+            if booked_mask & (1 << hour):
+                raise SlotUnavailable(f"Slot at {hour}:00 is no longer available.")
+            with transaction.atomic():
+                booking_id = _claim(user, arena, date, hour, activity)
+                if booking_id is None:
+                    raise SlotUnavailable(f"Slot at {hour}:00 is no longer available.")
+                # Raw SQL gak lewat Booking.save(), jadi bitmask di-update manual
+                ArenaDayOccupancy.occupy(arena.pk, date, hour)
+            break
+        except IntegrityError:
+            raise SlotUnavailable(f"Slot at {hour}:00 is no longer available.")
+        except OperationalError:
+            if attempt == LOCK_RETRIES - 1:
+                raise SlotUnavailable(f"Slot at {hour}:00 is busy, please try again.")
+            time.sleep(LOCK_BACKOFF * (attempt + 1))
+
+    return Booking.objects.select_related("arena", "user").get(pk=booking_id)
+
+
+MAX_BATCH_SLOTS = 200
+RECURRENCE_STEPS = {"daily": 1, "weekly": 7}
+
+
+class BatchConflict(SlotUnavailable):
+    def __init__(self, conflicts):
+        super().__init__(f"{len(conflicts)} slot(s) cannot be booked.")
+        self.conflicts = conflicts
+
+
+def expand_slots(date, start_hour, end_hour=None, freq=None, count=1, until=None):
+    """Turn an hour range plus an optional daily/weekly recurrence into (date, hour) pairs."""
+    if date is None:
+        raise BookingError("Invalid date format (YYYY-MM-DD).")
+    start_hour = int(start_hour)
+    end_hour = int(end_hour) if end_hour is not None else start_hour + 1
+    if not 0 <= start_hour < end_hour <= availability.HOURS_PER_DAY:
+        raise BookingError("Invalid hour range.")
+
+    # Batas dicek sebelum tanggal-tanggalnya dibuat: count/until datang langsung dari request
+    too_many = BookingError(f"Maximum {MAX_BATCH_SLOTS} slots per batch.")
+    max_days = MAX_BATCH_SLOTS // (end_hour - start_hour)
+    dates = [date]
+    if freq:
+        if freq not in RECURRENCE_STEPS:
+            raise BookingError("Recurrence must be 'daily' or 'weekly'.")
+        step = datetime.timedelta(days=RECURRENCE_STEPS[freq])
+        try:
+            if until is not None:
+                while dates[-1] + step <= until:
+                    if len(dates) >= max_days:
+                        raise too_many
+                    dates.append(dates[-1] + step)
+            else:
+                count = int(count)
+                if count > max_days:
+                    raise too_many
+                for _ in range(count - 1):
+                    dates.append(dates[-1] + step)
+        except OverflowError:
+            raise BookingError("Date out of range.")
+
+    return [(day, hour) for day in dates for hour in range(start_hour, end_hour)]
+
+
+def claim_slots(user, arena, slots, activity=None):
+    """Book every (date, hour) in ``slots`` or none of them.
+
+    Opening hours and existing bookings are checked with one query each.
+    New rows go in with bulk_create and cancelled rows are reused with one
+    conditional UPDATE, all in one transaction. Raises BatchConflict with a
+    per-slot report if anything is in the way.
+    """
+    slots = sorted(set(slots))
+    dates = sorted({day for day, _ in slots})
+    # Jam yang sudah lewat hari ini juga "past": worker lifecycle gak akan menyentuhnya lagi
+    today, current_hour = lifecycle.cutoff_for()
+
+    weekly = [0] * 7
+    for rule in ArenaOpeningHours.objects.filter(arena=arena):
+        weekly[rule.day] = availability.opening_mask(rule.open_time, rule.close_time)
+
+    existing = {
+        (b.date, b.start_hour): b
+        for b in Booking.objects.filter(
+            arena=arena, date__in=dates, start_hour__in={hour for _, hour in slots}
+        ).only('id', 'date', 'start_hour', 'status')
+    }
+
+    conflicts = []
+    for day, hour in slots:
+        reason = None
+        if day < today or (day == today and hour < current_hour):
+            reason = "past"
+        elif not weekly[day.weekday()] & (1 << hour):
+            reason = "closed"
+        elif (day, hour) in existing and existing[(day, hour)].status == 'Booked':
+            reason = "booked"
+        if reason:
+            conflicts.append({"date": str(day), "hour": hour, "reason": reason})
+    if conflicts:
+        raise BatchConflict(conflicts)
+
+    now = timezone.now()
+    reuse_ids = [existing[slot].pk for slot in slots if slot in existing]
+    new_rows = [
+        Booking(arena=arena, user=user, date=day, start_hour=hour,
+                status='Booked', activity=activity, booked_at=now)
+        for day, hour in slots if (day, hour) not in existing
+    ]
+
+    try:
+        with transaction.atomic():
+            if reuse_ids:
+                reused = Booking.objects.filter(pk__in=reuse_ids, status='Cancelled').update(
+                    user=user, status='Booked', activity=activity, booked_at=now
+                )
+                if reused != len(reuse_ids):
+                    raise IntegrityError("cancelled slot was taken meanwhile")
+            Booking.objects.bulk_create(new_rows)
+
+            day_masks = {}
+            for day, hour in slots:
+                day_masks[day] = day_masks.get(day, 0) | (1 << hour)
+            for day, mask in day_masks.items():
+                ArenaDayOccupancy.occupy_mask(arena.pk, day, mask)
+    except (IntegrityError, OperationalError):
+        # Keduluan orang lain di tengah jalan; laporin ulang slot mana yang bentrok
+        taken = set(
+            Booking.objects.filter(arena=arena, date__in=dates, status='Booked')
+            .values_list('date', 'start_hour')
+        )
+        raise BatchConflict([
+            {"date": str(day), "hour": hour, "reason": "booked"}
+            for day, hour in slots if (day, hour) in taken
+        ])
+
+    wanted = set(slots)
+    booked = Booking.objects.filter(
+        arena=arena, date__in=dates, start_hour__in={hour for _, hour in slots},
+        user=user, status='Booked',
+    ).order_by('date', 'start_hour')
+    return [b for b in booked if (b.date, b.start_hour) in wanted]
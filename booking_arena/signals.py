@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import ArenaDayOccupancy, Booking
+
+
+# Signal (bukan override save/delete) supaya cascade dari hapus User/Arena dan
+# QuerySet.delete() juga melepas bit occupancy-nya
+
+@receiver(pre_save, sender=Booking)
+def remember_saved_slot(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._load_saved_slot()
+
+
+@receiver(post_save, sender=Booking)
+def move_occupancy(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous, current = instance._load_saved_slot(), instance._slot()
+    if previous != current:
+        if previous:
+            ArenaDayOccupancy.release(*previous)
+        if current:
+            ArenaDayOccupancy.occupy(*current)
+    instance._saved_slot = current
+
+
+@receiver(pre_delete, sender=Booking)
+def remember_deleted_slot(sender, instance, **kwargs):
+    # Sebelum DELETE: setelahnya barisnya sudah gak bisa dibaca lagi
+    instance._load_saved_slot()
+
+
+@receiver(post_delete, sender=Booking)
+def release_occupancy(sender, instance, **kwargs):
+    previous = getattr(instance, '_saved_slot', None)
+    if previous:
+        ArenaDayOccupancy.release(*previous)
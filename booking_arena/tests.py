@@ -2,13 +2,20 @@ import datetime
 import tempfile
 import os
 import shutil
-from django.test import TestCase, Client, override_settings
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.dateparse import parse_date
-from django.db import IntegrityError
-from .models import Arena, Booking, ArenaOpeningHours
+from django.db import IntegrityError, connection
+from django.core.management import call_command
+from io import StringIO
+from .models import Arena, Booking, ArenaOpeningHours, ArenaDayOccupancy
+from . import availability, lifecycle
+from .services import MAX_BATCH_SLOTS, BatchConflict, BookingError, SlotUnavailable, claim_slot, claim_slots, expand_slots
+import json
+import threading
+from unittest import mock
 
 # --- Persiapan Template Mock ---
 # Ini penting untuk mencegah error 'TemplateDoesNotExist'
@@ -453,4 +460,326 @@ class AdminViewTests(TestCase):
         json_response = response.json()
         self.assertEqual(json_response['status'], 'error')
         self.assertIn('Validasi gagal', json_response['message'])
-        self.assertIn('name', json_response['errors'])
\ No newline at end of file
+        self.assertIn('name', json_response['errors'])
+class AvailabilityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='avail', password='pw')
+        cls.arena_a = Arena.objects.create(name="Arena A", description="-", capacity=50, location="Jakarta")
+        cls.arena_b = Arena.objects.create(name="Arena B", description="-", capacity=50, location="Bandung")
+        for day in range(7):
+            ArenaOpeningHours.objects.create(arena=cls.arena_a, day=day, open_time=datetime.time(17, 0), close_time=datetime.time(20, 0))
+            ArenaOpeningHours.objects.create(arena=cls.arena_b, day=day, open_time=datetime.time(10, 0), close_time=datetime.time(19, 0))
+        cls.start = timezone.now().date() + datetime.timedelta(days=7)
+        cls.end = cls.start + datetime.timedelta(days=6)
+
+    def mask(self, arena, date):
+        occupancy = ArenaDayOccupancy.objects.filter(arena=arena, date=date).first()
+        return occupancy.booked_mask if occupancy else 0
+
+    def book(self, arena, date, hour, **kwargs):
+        return Booking.objects.create(arena=arena, user=self.user, date=date, start_hour=hour, **kwargs)
+
+    def test_occupancy_follows_book_cancel_and_delete(self):
+        booking = self.book(self.arena_a, self.start, 18)
+        self.book(self.arena_a, self.start, 19)
+        self.assertEqual(self.mask(self.arena_a, self.start), (1 << 18) | (1 << 19))
+
+        booking.status = 'Cancelled'
+        booking.save()
+        self.assertEqual(self.mask(self.arena_a, self.start), 1 << 19)
+
+        booking.status = 'Booked'
+        booking.save()
+        booking.delete()
+        self.assertEqual(self.mask(self.arena_a, self.start), 1 << 19)
+
+    def test_cancelled_booking_does_not_occupy(self):
+        self.book(self.arena_a, self.start, 18, status='Cancelled')
+        self.assertEqual(self.mask(self.arena_a, self.start), 0)
+
+    def test_free_masks_bulk_query(self):
+        self.book(self.arena_a, self.start, 17)
+        with self.assertNumQueries(2):
+            masks = availability.free_masks(self.start, self.end, [self.arena_a.pk, self.arena_b.pk])
+        self.assertEqual(availability.hours_in(masks[self.arena_a.pk][self.start]), [18, 19])
+        self.assertEqual(len(masks[self.arena_b.pk]), 7)
+
+    def test_arenas_free_at_hour(self):
+        # Arena B tutup jam 19:00, jadi slot 19 cuma ada di Arena A
+        self.book(self.arena_a, self.start, 19)
+        result = availability.arenas_free_at(19, self.start, self.end, [self.arena_a.pk, self.arena_b.pk])
+        self.assertEqual(len(result[self.arena_a.pk]), 6)
+        self.assertNotIn(self.start, result[self.arena_a.pk])
+        self.assertEqual(result[self.arena_b.pk], [])
+
+    def test_earliest_free_slot(self):
+        for hour in (17, 18, 19):
+            self.book(self.arena_a, self.start, hour)
+        result = availability.earliest_free_slots(self.start, self.end, [self.arena_a.pk])
+        self.assertEqual(result[self.arena_a.pk], (self.start + datetime.timedelta(days=1), 17))
+
+    def test_availability_api(self):
+        self.book(self.arena_a, self.start, 17)
+        response = Client().get(reverse('booking_arena:get_availability_flutter'), {
+            'start': str(self.start), 'end': str(self.start), 'arena': str(self.arena_a.pk), 'hour': 17,
+        })
+        self.assertEqual(response.status_code, 200)
+        item = response.json()['arenas'][0]
+        self.assertEqual(item['free'][str(self.start)], [18, 19])
+        self.assertEqual(item['earliest'], {'date': str(self.start), 'hour': 18})
+        self.assertEqual(item['free_at_hour'], [])
+
+    def test_availability_api_rejects_impossible_date(self):
+        response = Client().get(reverse('booking_arena:get_availability_flutter'), {'start': '2026-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_availability_command(self):
+        self.book(self.arena_a, self.start, 18)
+        ArenaDayOccupancy.objects.all().delete()
+        call_command('rebuild_availability', stdout=StringIO())
+        self.assertEqual(self.mask(self.arena_a, self.start), 1 << 18)
+
+class BookingServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='svc', password='pw')
+        cls.other_user = User.objects.create_user(username='svc2', password='pw')
+        cls.arena = Arena.objects.create(name="Arena S", description="-", capacity=50, location="Jakarta")
+        for day in range(7):
+            ArenaOpeningHours.objects.create(arena=cls.arena, day=day, open_time=datetime.time(9, 0), close_time=datetime.time(21, 0))
+        cls.date = timezone.now().date() + datetime.timedelta(days=3)
+
+    def test_claim_creates_booking_and_occupancy(self):
+        booking = claim_slot(self.user, self.arena, self.date, 10, 'curling')
+        self.assertEqual((booking.user, booking.status, booking.activity), (self.user, 'Booked', 'curling'))
+        occupancy = ArenaDayOccupancy.objects.get(arena=self.arena, date=self.date)
+        self.assertEqual(occupancy.booked_mask, 1 << 10)
+
+    def test_elapsed_hour_today_is_rejected(self):
+        # "Sekarang" = self.date jam 14:xx waktu lokal
+        with mock.patch.object(lifecycle, 'cutoff_for', return_value=(self.date, 14)):
+            with self.assertRaisesMessage(BookingError, 'Cannot book past hours.'):
+                claim_slot(self.user, self.arena, self.date, 13)
+            self.assertEqual(claim_slot(self.user, self.arena, self.date, 14).start_hour, 14)
+
+    def test_deleting_owner_frees_the_slot(self):
+        owner = User.objects.create_user(username='leaving', password='pw')
+        claim_slot(owner, self.arena, self.date, 11)
+        claim_slot(owner, self.arena, self.date, 12)
+        # Cascade dari hapus User gak lewat Booking.delete()
+        owner.delete()
+        self.assertEqual(ArenaDayOccupancy.objects.get(arena=self.arena, date=self.date).booked_mask, 0)
+        self.assertEqual(claim_slot(self.other_user, self.arena, self.date, 11).user, self.other_user)
+
+    def test_queryset_delete_frees_the_slot(self):
+        claim_slot(self.user, self.arena, self.date, 13)
+        Booking.objects.filter(arena=self.arena, date=self.date).delete()
+        self.assertEqual(claim_slot(self.other_user, self.arena, self.date, 13).start_hour, 13)
+
+    def test_claim_taken_slot_conflicts(self):
+        claim_slot(self.user, self.arena, self.date, 10)
+        with self.assertRaises(SlotUnavailable):
+            claim_slot(self.other_user, self.arena, self.date, 10)
+
+    def test_claim_reuses_cancelled_row(self):
+        booking = claim_slot(self.user, self.arena, self.date, 11)
+        booking.status = 'Cancelled'
+        booking.save()
+
+        reclaimed = claim_slot(self.other_user, self.arena, self.date, 11, 'ice_hockey')
+        self.assertEqual(reclaimed.pk, booking.pk)
+        self.assertEqual(reclaimed.user, self.other_user)
+        self.assertEqual(Booking.objects.filter(arena=self.arena, date=self.date).count(), 1)
+
+    def test_claim_rejects_past_and_closed_hours(self):
+        with self.assertRaises(BookingError):
+            claim_slot(self.user, self.arena, timezone.now().date() - datetime.timedelta(days=1), 10)
+        with self.assertRaises(BookingError):
+            claim_slot(self.user, self.arena, self.date, 22)
+
+    def test_flutter_create_reuses_cancelled_and_returns_409(self):
+        Booking.objects.create(arena=self.arena, user=self.other_user, date=self.date, start_hour=12, status='Cancelled')
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('booking_arena:create_booking_flutter')
+        payload = {'arena_id': str(self.arena.pk), 'date': str(self.date), 'start_hour': 12, 'activity': 'curling'}
+
+        response = client.post(url, data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        response = client.post(url, data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    THREADS = 12
+
+    def setUp(self):
+        self.arena = Arena.objects.create(name="Arena C", description="-", capacity=50, location="Jakarta")
+        for day in range(7):
+            ArenaOpeningHours.objects.create(arena=self.arena, day=day, open_time=datetime.time(9, 0), close_time=datetime.time(21, 0))
+        self.date = timezone.now().date() + datetime.timedelta(days=3)
+        self.clients = []
+        for i in range(self.THREADS):
+            client = Client()
+            client.force_login(User.objects.create_user(username=f'racer{i}', password='pw'))
+            self.clients.append(client)
+
+    def test_one_winner_under_contention(self):
+        url = reverse('booking_arena:create_booking_flutter')
+        payload = json.dumps({'arena_id': str(self.arena.pk), 'date': str(self.date), 'start_hour': 18})
+        barrier = threading.Barrier(self.THREADS)
+        statuses = []
+
+        def hammer(client):
+            try:
+                barrier.wait()
+                response = client.post(url, data=payload, content_type='application/json')
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=hammer, args=(c,)) for c in self.clients]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(sorted(set(statuses)), [200, 409])
+        self.assertEqual(statuses.count(200), 1)
+        self.assertEqual(Booking.objects.filter(arena=self.arena, date=self.date, start_hour=18, status='Booked').count(), 1)
+
+class BatchBookingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='league', password='pw')
+        cls.other_user = User.objects.create_user(username='league2', password='pw')
+        cls.arena = Arena.objects.create(name="Arena L", description="-", capacity=50, location="Jakarta")
+        for day in range(7):
+            ArenaOpeningHours.objects.create(arena=cls.arena, day=day, open_time=datetime.time(9, 0), close_time=datetime.time(21, 0))
+        cls.date = timezone.now().date() + datetime.timedelta(days=2)
+
+    def post(self, payload):
+        client = Client()
+        client.force_login(self.user)
+        return client.post(reverse('booking_arena:create_batch_booking_flutter'),
+                           data=json.dumps(payload), content_type='application/json')
+
+    def test_expand_slots_weekly(self):
+        slots = expand_slots(self.date, 18, 20, freq='weekly', count=3)
+        self.assertEqual(len(slots), 6)
+        self.assertEqual(slots[-1], (self.date + datetime.timedelta(days=14), 19))
+
+    def test_batch_rejects_elapsed_hours_today(self):
+        # "Sekarang" = self.date jam 15:xx waktu lokal
+        with mock.patch.object(lifecycle, 'cutoff_for', return_value=(self.date, 15)):
+            with self.assertRaises(BatchConflict) as caught:
+                claim_slots(self.user, self.arena, [(self.date, 9), (self.date, 15), (self.date, 16)])
+        self.assertEqual(caught.exception.conflicts, [{"date": str(self.date), "hour": 9, "reason": "past"}])
+        self.assertFalse(Booking.objects.filter(arena=self.arena).exists())
+
+    def test_expand_slots_bounded_up_front(self):
+        with self.assertRaisesMessage(BookingError, 'Maximum'):
+            expand_slots(self.date, 8, 10, freq='daily', count=10 ** 9)
+        with self.assertRaisesMessage(BookingError, 'Maximum'):
+            expand_slots(self.date, 8, 10, freq='daily', until=datetime.date.max)
+        with self.assertRaisesMessage(BookingError, 'Date out of range'):
+            expand_slots(datetime.date.max - datetime.timedelta(days=3), 8, 9, freq='weekly', count=2)
+        self.assertEqual(len(expand_slots(self.date, 8, 10, freq='daily', count=100)), MAX_BATCH_SLOTS)
+
+    def test_multi_hour_recurring_batch(self):
+        response = self.post({
+            'arena_id': str(self.arena.pk), 'date': str(self.date), 'start_hour': 18, 'end_hour': 21,
+            'activity': 'curling', 'recurrence': {'freq': 'weekly', 'count': 4},
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['bookings']), 12)
+        self.assertEqual(Booking.objects.filter(user=self.user, status='Booked').count(), 12)
+        occupancy = ArenaDayOccupancy.objects.get(arena=self.arena, date=self.date)
+        self.assertEqual(occupancy.booked_mask, (1 << 18) | (1 << 19) | (1 << 20))
+
+    def test_batch_is_all_or_nothing(self):
+        week_two = self.date + datetime.timedelta(days=7)
+        Booking.objects.create(arena=self.arena, user=self.other_user, date=week_two, start_hour=19)
+
+        response = self.post({
+            'arena_id': str(self.arena.pk), 'date': str(self.date), 'start_hour': 19, 'end_hour': 22,
+            'recurrence': {'freq': 'weekly', 'count': 2},
+        })
+        self.assertEqual(response.status_code, 409)
+        reasons = {(c['date'], c['hour']): c['reason'] for c in response.json()['conflicts']}
+        self.assertEqual(reasons[(str(week_two), 19)], 'booked')
+        self.assertEqual(reasons[(str(self.date), 21)], 'closed')
+        self.assertFalse(Booking.objects.filter(user=self.user).exists())
+
+    def test_batch_reuses_cancelled_rows(self):
+        cancelled = Booking.objects.create(arena=self.arena, user=self.other_user, date=self.date, start_hour=10, status='Cancelled')
+        bookings = claim_slots(self.user, self.arena, expand_slots(self.date, 10, 12))
+        self.assertEqual(len(bookings), 2)
+        cancelled.refresh_from_db()
+        self.assertEqual((cancelled.user, cancelled.status), (self.user, 'Booked'))
+
+
+class BookingLifecycleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='skater', password='pw')
+        cls.arena = Arena.objects.create(name="Arena W", description="-", capacity=50, location="Jakarta")
+        cls.now = timezone.make_aware(datetime.datetime(2030, 5, 10, 14, 30))
+        today = cls.now.date()
+        cls.past = Booking.objects.create(arena=cls.arena, user=cls.user, date=today - datetime.timedelta(days=1), start_hour=20)
+        cls.earlier_today = Booking.objects.create(arena=cls.arena, user=cls.user, date=today, start_hour=13)
+        cls.running = Booking.objects.create(arena=cls.arena, user=cls.user, date=today, start_hour=14)
+        cls.future = Booking.objects.create(arena=cls.arena, user=cls.user, date=today + datetime.timedelta(days=1), start_hour=9)
+        cls.cancelled = Booking.objects.create(arena=cls.arena, user=cls.user, date=today - datetime.timedelta(days=2), start_hour=10, status='Cancelled')
+
+    def statuses(self):
+        return dict(Booking.objects.values_list('id', 'status'))
+
+    def test_marks_only_elapsed_bookings(self):
+        count, batches = lifecycle.complete_elapsed_bookings(now=self.now, batch_size=1)
+        self.assertEqual((count, batches), (2, 2))
+        statuses = self.statuses()
+        self.assertEqual(statuses[self.past.id], 'Completed')
+        self.assertEqual(statuses[self.earlier_today.id], 'Completed')
+        self.assertEqual(statuses[self.running.id], 'Booked')
+        self.assertEqual(statuses[self.future.id], 'Booked')
+        self.assertEqual(statuses[self.cancelled.id], 'Cancelled')
+
+    def test_dry_run_changes_nothing(self):
+        before = self.statuses()
+        self.assertEqual(lifecycle.complete_elapsed_bookings(now=self.now, dry_run=True), (2, 0))
+        self.assertEqual(self.statuses(), before)
+        self.assertIsNone(lifecycle.get_watermark())
+
+    def test_idempotent_and_watermarked(self):
+        lifecycle.complete_elapsed_bookings(now=self.now)
+        self.assertEqual(lifecycle.get_watermark(), (self.now.date(), 14))
+        self.assertEqual(lifecycle.complete_elapsed_bookings(now=self.now), (0, 0))
+
+        # Slot yang lewat sebelum watermark cuma kejangkau lewat --full
+        old = Booking.objects.create(arena=self.arena, user=self.user, date=self.now.date() - datetime.timedelta(days=5), start_hour=9)
+        later = self.now + datetime.timedelta(hours=1)
+        self.assertEqual(lifecycle.complete_elapsed_bookings(now=later), (1, 1))
+        old.refresh_from_db()
+        self.assertEqual(old.status, 'Booked')
+        self.assertEqual(lifecycle.complete_elapsed_bookings(now=later, full=True), (1, 1))
+
+    def test_rebooked_row_behind_watermark_is_completed(self):
+        lifecycle.complete_elapsed_bookings(now=self.now)
+        # Admin mengembalikan booking kemarin ke Booked setelah watermark lewat
+        Booking.objects.filter(pk=self.past.pk).update(status='Booked')
+        later = self.now + datetime.timedelta(hours=1)
+        self.assertEqual(lifecycle.complete_elapsed_bookings(now=later), (2, 1))
+        self.assertEqual(self.statuses()[self.past.id], 'Completed')
+
+    def test_command_dry_run(self):
+        out = StringIO()
+        call_command('complete_bookings', '--dry-run', stdout=out)
+        self.assertIn('[dry-run]', out.getvalue())
+        self.assertEqual(Booking.objects.filter(status='Completed').count(), 0)
@@ -22,7 +22,9 @@ urlpatterns = [
     # =================================================
     path('api/arenas/', get_arenas_flutter, name='get_arenas_flutter'),
     path('api/bookings/', get_bookings_flutter, name='get_bookings_flutter'),
+    path('api/availability/', get_availability_flutter, name='get_availability_flutter'),
     path('api/booking/create/', create_booking_flutter, name='create_booking_flutter'),
+    path('api/booking/batch/', create_batch_booking_flutter, name='create_batch_booking_flutter'),
     path('api/booking/cancel/', cancel_booking_flutter, name='cancel_booking_flutter'),
     path('api/my-history/', my_history_flutter, name='my_history_flutter'),
     path('api/delete/<uuid:arena_id>/', delete_arena_flutter, name='delete_arena_flutter'),
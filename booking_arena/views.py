@@ -9,12 +9,22 @@ from django.utils import timezone
 from django.db.models import Q
 from django.db import transaction
 from django.urls import reverse
+from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
 
 from .models import Arena, Booking, ArenaOpeningHours
 from .forms import ArenaForm, ArenaOpeningHoursFormSet
+from . import availability
+from .lifecycle import cutoff_for
+from the_rink import admin_lists
+from the_rink.cache import cache_view
+from .services import BatchConflict, BookingError, claim_slot, claim_slots, expand_slots
+import datetime
+import uuid
 import traceback
 
+ADMIN_PAGE_SIZE = 50
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
@@ -30,17 +40,8 @@ def _get_arena_slots_context(request, arena_id, date_str):
         raise HttpResponseBadRequest("Invalid date format (YYYY-MM-DD).")
 
     arena = get_object_or_404(Arena, pk=arena_id)
-    day_of_week = selected_date.weekday()
-
-    open_time_today, close_time_today, is_closed_today = None, None, True
-    try:
-        opening_rule = ArenaOpeningHours.objects.get(arena=arena, day=day_of_week)
-        open_time_today = opening_rule.open_time
-        close_time_today = opening_rule.close_time
-        if open_time_today and close_time_today:
-            is_closed_today = False
-    except ArenaOpeningHours.DoesNotExist:
-        is_closed_today = True
+    open_mask, booked_mask = availability.day_masks(arena.pk, selected_date)
+    is_closed_today = not open_mask
 
     is_bookable = selected_date >= timezone.now().date()
     
@@ -55,16 +56,18 @@ def _get_arena_slots_context(request, arena_id, date_str):
     if is_closed_today:
         return context
 
-    bookings_today = Booking.objects.filter(
-        arena=arena,
-        date=selected_date,
-        status='Booked'
-    ).select_related('user')
-    booked_hours = {b.start_hour: b for b in bookings_today}
+    # Occupancy mask kosong = belum ada booking, gak perlu query Booking
+    booked_hours = {}
+    if booked_mask & open_mask:
+        bookings_today = Booking.objects.filter(
+            arena=arena,
+            date=selected_date,
+            status='Booked'
+        ).select_related('user')
+        booked_hours = {b.start_hour: b for b in bookings_today}
 
     hourly_slots_data = []
-    current_hour = open_time_today.hour
-    while current_hour < close_time_today.hour:
+    for current_hour in availability.hours_in(open_mask):
         booking_info = booked_hours.get(current_hour)
         status = 'Booked' if booking_info else 'Available'
         price_info = "Rp 350.000"
@@ -80,7 +83,6 @@ def _get_arena_slots_context(request, arena_id, date_str):
             'price_info': price_info,
             'is_user_booking': is_user_booking,
         })
-        current_hour += 1
 
     context['hourly_slots_data'] = hourly_slots_data
     return context
@@ -111,16 +113,15 @@ def arena_detail(request, arena_id):
 
 @login_required
 def user_booking_list(request):
-    now = timezone.now()
-    current_date = now.date()
-    current_hour = now.hour
+    # Waktu lokal, sama dengan worker lifecycle (timezone.now() itu UTC)
+    current_date, current_hour = cutoff_for()
 
     user_bookings = Booking.objects.filter(
         user=request.user, 
         status='Booked'
     ).filter(
         Q(date__gt=current_date) | 
-        Q(date=current_date, start_hour__gt=current_hour)
+        Q(date=current_date, start_hour__gte=current_hour)
     ).order_by('date', 'start_hour')
 
     return render(request, 'user_bookings.html', {
@@ -156,26 +157,17 @@ def create_booking_hourly(request, arena_id):
     
     if not date_str or not hour_str or not activity: return HttpResponse("Data incomplete", status=400)
     
-    selected_date = parse_date(date_str)
-    selected_hour = int(hour_str)
-    
     try:
-        with transaction.atomic():
-            arena = get_object_or_404(Arena, pk=arena_id)
-            existing_booking = Booking.objects.filter(arena=arena, date=selected_date, start_hour=selected_hour).select_for_update().first()
-
-            if existing_booking:
-                if existing_booking.status == 'Booked':
-                    return HttpResponse(f"Slot at {selected_hour}:00 is taken.", status=409)
-                else:
-                    existing_booking.status = 'Booked'
-                    existing_booking.user = request.user
-                    existing_booking.activity = activity
-                    existing_booking.booked_at = timezone.now()
-                    existing_booking.save()
-            else:
-                Booking.objects.create(user=request.user, arena=arena, date=selected_date, start_hour=selected_hour, status='Booked', activity=activity)
-    except Exception as e: return HttpResponse(f"Failed: {e}", status=500)
+        selected_date = parse_date(date_str)
+        selected_hour = int(hour_str)
+    except ValueError:
+        return HttpResponse("Invalid date or hour.", status=400)
+
+    arena = get_object_or_404(Arena, pk=arena_id)
+    try:
+        claim_slot(request.user, arena, selected_date, selected_hour, activity)
+    except BookingError as e:
+        return HttpResponse(str(e), status=e.status)
 
     # === BAGIAN INI YANG GW UPDATE ===
     context = _get_arena_slots_context(request, arena_id, date_str)
@@ -242,6 +234,7 @@ def delete_arena_ajax(request, arena_id):
 # =================================================================
 
 @csrf_exempt
+@cache_view('arena')
 def get_arenas_flutter(request):
     arenas = Arena.objects.all()
     data = []
@@ -256,6 +249,47 @@ def get_arenas_flutter(request):
         })
     return JsonResponse(data, safe=False)
 
+@csrf_exempt
+def get_availability_flutter(request):
+    # ?start=YYYY-MM-DD&end=YYYY-MM-DD[&arena=<uuid>...][&hour=18]
+    now = timezone.localtime()
+    try:
+        start = parse_date(request.GET.get('start', '')) or now.date()
+        end = parse_date(request.GET.get('end', '')) or start + datetime.timedelta(days=6)
+    except (ValueError, OverflowError):
+        # Formatnya benar tapi tanggalnya gak ada (mis. 2026-02-30)
+        return JsonResponse({"error": "Tanggal tidak valid"}, status=400)
+    if end < start or (end - start).days > 31:
+        return JsonResponse({"error": "Range tanggal maksimal 31 hari"}, status=400)
+
+    try:
+        arena_ids = [uuid.UUID(a) for a in request.GET.getlist('arena')] or None
+    except ValueError:
+        return JsonResponse({"error": "Arena ID tidak valid"}, status=400)
+    hour = request.GET.get('hour')
+    try:
+        hour = int(hour) if hour is not None else None
+    except ValueError:
+        return JsonResponse({"error": "Param 'hour' harus angka"}, status=400)
+    if hour is not None and not 0 <= hour < availability.HOURS_PER_DAY:
+        return JsonResponse({"error": "Param 'hour' harus 0-23"}, status=400)
+
+    masks = availability.free_masks(start, end, arena_ids, now=now)
+
+    data = []
+    for arena_id, days in masks.items():
+        free = {str(day): availability.hours_in(mask) for day, mask in days.items() if mask}
+        earliest = next(((day, hours[0]) for day, hours in free.items()), None)
+        item = {
+            "arena_id": str(arena_id),
+            "free": free,
+            "earliest": {"date": earliest[0], "hour": earliest[1]} if earliest else None,
+        }
+        if hour is not None:
+            item["free_at_hour"] = [day for day, hours in free.items() if hour in hours]
+        data.append(item)
+    return JsonResponse({"start": str(start), "end": str(end), "arenas": data})
+
 # Admin Flutter endpoints
 @csrf_exempt
 @login_required
@@ -310,21 +344,63 @@ def create_booking_flutter(request):
             if not booking_date: return JsonResponse({"status": False, "message": "Format tanggal salah!"}, status=400)
 
             arena = get_object_or_404(Arena, pk=arena_id)
-            existing = Booking.objects.filter(arena=arena, date=booking_date, start_hour=start_hour, status='Booked').exists()
-
-            if existing: return JsonResponse({"status": False, "message": "Slot penuh!"}, status=409)
+            try:
+                booking = claim_slot(request.user, arena, booking_date, start_hour, activity)
+            except BookingError as e:
+                return JsonResponse({"status": False, "message": str(e)}, status=e.status)
 
-            booking = Booking.objects.create(
-                user=request.user, arena=arena, date=booking_date, start_hour=start_hour, activity=activity, status='Booked'
-            )
             return JsonResponse({"status": True, "message": "Booking Berhasil!", "booking_id": str(booking.id)})
 
+        except Http404:
+            raise
+
         except Exception as e:
             traceback.print_exc()
             return JsonResponse({"status": False, "message": f"Server Error: {str(e)}"}, status=500)
             
     return JsonResponse({"status": False, "message": "Method not allowed"}, status=405)
 
+@csrf_exempt
+def create_batch_booking_flutter(request):
+    # Body: {arena_id, date, start_hour, end_hour?, activity?,
+    #        recurrence?: {freq: 'daily'|'weekly', count? | until?}}
+    if not request.user.is_authenticated:
+        return JsonResponse({"status": False, "message": "Anda belum login. Silakan login ulang."}, status=401)
+    if request.method != 'POST':
+        return JsonResponse({"status": False, "message": "Method not allowed"}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        arena = get_object_or_404(Arena, pk=data.get('arena_id') or data.get('arena'))
+        recurrence = data.get('recurrence') or {}
+        until = recurrence.get('until')
+        slots = expand_slots(
+            parse_date(data.get('date') or ''),
+            data.get('start_hour'),
+            data.get('end_hour'),
+            freq=recurrence.get('freq'),
+            count=recurrence.get('count', 1),
+            until=parse_date(until) if until else None,
+        )
+    except (ValueError, TypeError, ValidationError):
+        return JsonResponse({"status": False, "message": "Data booking tidak valid!"}, status=400)
+    except BookingError as e:
+        return JsonResponse({"status": False, "message": str(e)}, status=e.status)
+
+    try:
+        bookings = claim_slots(request.user, arena, slots, data.get('activity'))
+    except BatchConflict as e:
+        return JsonResponse({"status": False, "message": str(e), "conflicts": e.conflicts}, status=e.status)
+
+    return JsonResponse({
+        "status": True,
+        "message": f"{len(bookings)} slot berhasil dibooking!",
+        "bookings": [
+            {"id": str(b.id), "date": str(b.date), "start_hour": b.start_hour}
+            for b in bookings
+        ],
+    })
+
 @csrf_exempt
 @login_required
 def cancel_booking_flutter(request):
@@ -344,7 +420,8 @@ def cancel_booking_flutter(request):
 @csrf_exempt
 @login_required
 def my_history_flutter(request):
-    bookings = Booking.objects.filter(user=request.user).order_by('-date')
+    # Status 'Completed' diisi worker `complete_bookings`, jadi di sini cukup baca status
+    bookings = Booking.objects.filter(user=request.user).select_related('arena').order_by('-date', '-start_hour')
     data = []
     for b in bookings:
         data.append({
@@ -368,8 +445,20 @@ def admin_arena_list(request):
 
 @user_passes_test(is_superuser)
 def admin_booking_list(request):
-    bookings = Booking.objects.all().select_related('arena', 'user').order_by('-date', '-start_hour')
-    return render(request, 'booking_arena/admin_booking_list.html', {'bookings': bookings})
+    # Satu halaman (keyset), bukan semua booking sekaligus; ?status= & ?sort= ikut list admin Flutter
+    params = request.GET
+    try:
+        bookings = admin_lists.BOOKINGS.page_objects(params, ADMIN_PAGE_SIZE)
+    except admin_lists.InvalidParameter:
+        params = {}
+        bookings = admin_lists.BOOKINGS.page_objects(params, ADMIN_PAGE_SIZE)
+    return render(request, 'booking_arena/admin_booking_list.html', {
+        'bookings': bookings[:ADMIN_PAGE_SIZE],
+        'next_cursor': admin_lists.BOOKINGS.next_cursor(params, bookings, ADMIN_PAGE_SIZE),
+        'status': params.get('status', ''),
+        'sort': params.get('sort', ''),
+        'status_choices': Booking.STATUS_CHOICES,
+    })
 
 @user_passes_test(is_superuser)
 def admin_arena_create(request):
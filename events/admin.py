@@ -1,6 +1,6 @@
 # events/admin.py
 from django.contrib import admin
-from .models import Event, EventRegistration
+from .models import Event, EventRegistration, EventWaitlistEntry
 
 class EventRegistrationInline(admin.TabularInline):
     """
@@ -58,4 +58,13 @@ class EventRegistrationAdmin(admin.ModelAdmin):
     list_display = ('event', 'user', 'registered_at', 'attended')
     list_filter = ('event__category', 'attended', 'registered_at')
     search_fields = ('event__name', 'user__username', 'user__email')
-    list_editable = ('attended',)
\ No newline at end of file
+    list_editable = ('attended',)
+
+@admin.register(EventWaitlistEntry)
+class EventWaitlistEntryAdmin(admin.ModelAdmin):
+    """
+    Antrean event yang penuh, urut dari yang paling dulu daftar.
+    """
+    list_display = ('event', 'user', 'joined_at')
+    list_filter = ('event__category',)
+    search_fields = ('event__name', 'user__username')
@@ -0,0 +1,281 @@
+"""Bulk event ingestion (used by `manage.py ingest_events`).
+
+Rows are read lazily from CSV or JSON Lines, validated without touching the
+database and written in chunks with one ``INSERT ... ON CONFLICT (slug) DO
+UPDATE`` per chunk, so memory stays flat and the file can be any size.
+
+The slug is the upsert key. A row with a ``slug`` column updates exactly
+that event. Otherwise an existing event with the same name and date is
+taken to be the same event and gets updated; a new event gets the slug
+of its name, or the next free ``-N`` suffix when that slug is taken.
+Collisions are resolved per chunk with a few batched queries (same-event
+lookup, IN on the candidate slugs, one index range per taken base), never
+one query per row.
+"""
+import csv
+import datetime
+import json
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from .models import Event
+
+SLUG_MAX = Event._meta.get_field('slug').max_length
+CATEGORIES = {value for value, _ in Event.CATEGORY_CHOICES}
+LEVELS = {value for value, _ in Event.LEVEL_CHOICES}
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+UPDATE_FIELDS = [
+    'name', 'category', 'level', 'description', 'requirements', 'date', 'start_time', 'end_time',
+    'location', 'price', 'max_participants', 'organizer', 'instructor', 'is_active', 'updated_at',
+]
+# Batas OR di satu query (SQLite punya batas kedalaman ekspresi)
+PREFIX_BATCH = 200
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path, fmt=None):
+    """Yield ``(line_number, row, error)`` from a CSV or JSONL file without loading it whole."""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row, None
+            return
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield number, None, f'invalid JSON: {e}'
+                continue
+            if isinstance(row, dict):
+                yield number, row, None
+            else:
+                yield number, None, 'expected a JSON object'
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _text(row, name, max_length=None, required=False, default=''):
+    value = row.get(name)
+    value = default if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'{name} is required')
+    if max_length and len(value) > max_length:
+        raise RowError(f'{name} is longer than {max_length} characters')
+    return value
+
+
+def _choice(row, name, choices, default):
+    value = _text(row, name, default=default) or default
+    if value not in choices:
+        raise RowError(f'{name} must be one of {", ".join(sorted(choices))}')
+    return value
+
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RowError(f'invalid date {value!r} (YYYY-MM-DD)')
+
+
+def _time(value, default):
+    if value in (None, ''):
+        return default
+    try:
+        return datetime.time.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RowError(f'invalid time {value!r} (HH:MM)')
+
+
+def _flag(value, default):
+    # JSON false/0 tetap False (jangan pakai "value or default")
+    if value in (None, ''):
+        return default
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def clean_row(row):
+    """Validate one raw row and return unsaved Event field values. Raises RowError."""
+    if row.get('date') in (None, ''):
+        raise RowError('date is required')
+    data = {
+        'name': _text(row, 'name', 200, required=True),
+        'description': _text(row, 'description', required=True),
+        'requirements': _text(row, 'requirements') or None,
+        'category': _choice(row, 'category', CATEGORIES, 'social'),
+        'level': _choice(row, 'level', LEVELS, 'all'),
+        'date': _date(row['date']),
+        'start_time': _time(row.get('start_time'), datetime.time(9, 0)),
+        'end_time': _time(row.get('end_time'), datetime.time(17, 0)),
+        'location': _text(row, 'location', 100, default='Main Arena') or 'Main Arena',
+        'organizer': _text(row, 'organizer', 200) or None,
+        'instructor': _text(row, 'instructor', 200) or None,
+        'is_active': _flag(row.get('is_active'), default=True),
+        'slug': _text(row, 'slug', SLUG_MAX),
+    }
+    if data['end_time'] <= data['start_time']:
+        raise RowError('end_time must be after start_time')
+    try:
+        data['price'] = Decimal(str(row.get('price') or 0)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError(f"invalid price {row.get('price')!r}")
+    if data['price'] < 0 or data['price'] >= Decimal('1e8'):
+        raise RowError('price out of range')
+    try:
+        data['max_participants'] = int(row.get('max_participants') or 30)
+    except (TypeError, ValueError):
+        raise RowError(f"invalid max_participants {row.get('max_participants')!r}")
+    if data['max_participants'] < 1:
+        raise RowError('max_participants must be positive')
+    if data['slug'] and data['slug'] != slugify(data['slug']):
+        raise RowError(f"invalid slug {data['slug']!r}")
+    return data
+
+
+def base_slug(name, reserve=8):
+    # Sisakan tempat buat akhiran "-N"
+    return (slugify(name)[:SLUG_MAX - reserve].strip('-')) or 'event'
+
+
+def _suffixed_slugs(bases):
+    # Range, bukan LIKE, supaya kepakai index unik slug ('.' = karakter setelah '-').
+    # SQL mentah: ratusan Q() di-OR lewat ORM lebih lama dari query-nya sendiri
+    table = connection.ops.quote_name(Event._meta.db_table)
+    column = connection.ops.quote_name(Event._meta.get_field('slug').column)
+    where = ' OR '.join([f'({column} > %s AND {column} < %s)'] * len(bases))
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {column} FROM {table} WHERE {where}', [
+            value for base in bases for value in (f'{base}-', f'{base}.')
+        ])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def unique_slug(name, exclude_pk=None):
+    """Slug for one event (admin form / API) following the same ``-N`` rule as the importer."""
+    base = base_slug(name)
+    taken = set(
+        Event.objects.exclude(pk=exclude_pk)
+        .filter(Q(slug=base) | Q(slug__gt=f'{base}-', slug__lt=f'{base}.'))
+        .values_list('slug', flat=True)
+    )
+    if base not in taken:
+        return base
+    suffixes = [int(slug.rpartition('-')[2]) for slug in taken if slug.rpartition('-')[2].isdigit()]
+    return f'{base}-{max(suffixes, default=1) + 1}'
+
+
+class SlugAllocator:
+    """Hands out unique slugs across all the chunks of one import run."""
+
+    def __init__(self):
+        self.used = set()
+        self.highest = {}  # base -> akhiran terbesar yang sudah ada/dipakai
+        self.events = {}   # (name, date) -> slug yang dipakai di run ini
+
+    def assign(self, rows):
+        """Give every row without a slug one. Returns the slugs that already existed in the database."""
+        pending = [(row, base_slug(row['name'])) for row in rows if not row['slug']]
+        self.used.update(row['slug'] for row in rows if row['slug'])
+        bases = {base for _, base in pending}
+        keys = {(row['name'], row['date']) for row, _ in pending}
+
+        # Event yang sama (nama + tanggal) yang sudah ada di database
+        same_event = {}
+        if keys:
+            for slug, name, date in Event.objects.filter(
+                name__in={name for name, _ in keys}, date__in={date for _, date in keys}
+            ).values_list('slug', 'name', 'date'):
+                if (name, date) in keys:
+                    same_event[(name, date)] = slug
+        existing = set(Event.objects.filter(
+            slug__in=bases | {row['slug'] for row in rows if row['slug']} | set(same_event.values())
+        ).values_list('slug', flat=True))
+
+        # Base yang sudah dipakai: cari akhiran terbesar semua base itu sekaligus
+        # (termasuk base yang dipakai beberapa event berbeda di chunk ini)
+        events_per_base = defaultdict(set)
+        for row, base in pending:
+            events_per_base[base].add((row['name'], row['date']))
+        clashing = sorted(
+            base for base in bases
+            if (base in existing or base in self.used or len(events_per_base[base]) > 1)
+            and base not in self.highest
+        )
+        for base in clashing:
+            self.highest[base] = 1
+        for start in range(0, len(clashing), PREFIX_BATCH):
+            for slug in _suffixed_slugs(clashing[start:start + PREFIX_BATCH]):
+                base, _, suffix = slug.rpartition('-')
+                if suffix.isdigit() and base in self.highest:
+                    self.highest[base] = max(self.highest[base], int(suffix))
+
+        # Dua putaran: base yang masih bebas diklaim dulu, baru sisanya diberi akhiran.
+        # Jadi "Foo" yang bentrok tidak bisa mengambil foo-2 milik "Foo 2" di chunk yang sama
+        deferred = []
+        for row, base in pending:
+            key = (row['name'], row['date'])
+            # Event yang sama diimpor ulang: update, jangan bikin duplikat
+            slug = self.events.get(key) or same_event.get(key)
+            if slug is None and base not in existing and base not in self.used:
+                slug = base
+            if slug is None:
+                deferred.append((row, base))
+                continue
+            row['slug'] = slug
+            self.events[key] = slug
+            self.used.add(slug)
+        for row, base in deferred:
+            key = (row['name'], row['date'])
+            slug = self.events.get(key)
+            if slug is None:
+                suffix = self.highest.get(base, 1)
+                while True:
+                    suffix += 1
+                    slug = f'{base}-{suffix}'
+                    if slug not in existing and slug not in self.used:
+                        break
+                self.highest[base] = suffix
+            row['slug'] = slug
+            self.events[key] = slug
+            self.used.add(slug)
+        return {row['slug'] for row in rows if row['slug'] in existing}
+
+
+def upsert(rows):
+    """Insert or update ``rows`` (cleaned, with slugs) in one statement."""
+    events = [Event(**row) for row in rows]
+    Event.objects.bulk_create(
+        events, update_conflicts=True, unique_fields=['slug'], update_fields=UPDATE_FIELDS,
+    )
+    return len(events)
+
+
+def ingest_chunk(rows, slugs):
+    """Assign slugs to and upsert one chunk of cleaned rows. Returns ``(created, updated)``."""
+    with transaction.atomic():
+        existing = slugs.assign(rows)
+        # Slug yang sama dua kali di satu chunk: baris terakhir yang menang
+        unique = list({row['slug']: row for row in rows}.values())
+        upsert(unique)
+    return len(unique) - len(existing), len(existing)
@@ -0,0 +1,70 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events import ingest
+from the_rink import cache as view_cache
+
+
+class Command(BaseCommand):
+    help = 'Import/upsert event dari file CSV atau JSONL besar, per chunk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File .csv, .jsonl atau .ndjson')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                            help='Default: ditebak dari ekstensi file')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--rejects', default=None,
+                            help='Tulis baris yang ditolak (nomor baris + alasan) ke CSV ini')
+        parser.add_argument('--dry-run', action='store_true', help='Cuma validasi, gak nulis ke database')
+
+    def handle(self, *args, **options):
+        self.rejected = []
+        slugs = ingest.SlugAllocator()
+        created = updated = seen = 0
+        started = time.perf_counter()
+
+        try:
+            rows = ingest.read_rows(options['path'], options['format'])
+            for chunk in ingest.chunked(self.valid_rows(rows), options['chunk_size']):
+                seen += len(chunk)
+                if not options['dry_run']:
+                    new, changed = ingest.ingest_chunk(chunk, slugs)
+                    created += new
+                    updated += changed
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'  {seen:,} rows  ({seen / elapsed:,.0f} rows/s)')
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+
+        if created or updated:
+            # bulk_create gak lewat signal, jadi cache halaman event di-invalidate manual
+            view_cache.bump('event')
+
+        elapsed = time.perf_counter() - started
+        total = seen + len(self.rejected)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s): '
+            f'{created:,} created, {updated:,} updated, {len(self.rejected):,} rejected'
+            + (' (dry run)' if options['dry_run'] else '')
+        ))
+        for line, reason in self.rejected[:20]:
+            self.stdout.write(self.style.WARNING(f'  line {line}: {reason}'))
+        if len(self.rejected) > 20:
+            self.stdout.write(self.style.WARNING(f'  ... {len(self.rejected) - 20:,} more'))
+        if options['rejects'] and self.rejected:
+            with open(options['rejects'], 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['line', 'reason'])
+                writer.writerows(self.rejected)
+
+    def valid_rows(self, rows):
+        for line, row, error in rows:
+            if error is None:
+                try:
+                    yield ingest.clean_row(row)
+                    continue
+                except ingest.RowError as e:
+                    error = str(e)
+            self.rejected.append((line, error))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:16
+
+import the_rink.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_waitlist'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='image',
+            field=the_rink.fields.HashedImageField(blank=True, null=True, upload_to='events/'),
+        ),
+    ]
@@ -1,9 +1,36 @@
 from django.db import models
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.text import slugify 
 import datetime
 
+from the_rink.fields import HashedImageField
+
+class EventQuerySet(models.QuerySet):
+    def with_participation(self, user=None):
+        """Annotate participant count, remaining spots and (for ``user``) the registration flag.
+
+        Everything comes from correlated subqueries in the same SELECT, so a
+        listing is one query no matter how many events it shows. The
+        properties on Event pick these annotations up automatically.
+        """
+        registrations = EventRegistration.objects.filter(event=OuterRef('pk')).order_by()
+        qs = self.annotate(
+            participant_count=Coalesce(
+                Subquery(registrations.values('event').annotate(n=Count('id')).values('n')), 0
+            ),
+            remaining_spots=F('max_participants') - F('participant_count'),
+        )
+        if user is not None and user.is_authenticated:
+            return qs.annotate(
+                user_registered=Exists(registrations.filter(user=user)),
+                participation_user_id=Value(user.pk),
+            )
+        return qs
+
+
 class Event(models.Model):
     CATEGORY_CHOICES = [
         ('competition', 'Competition'),
@@ -37,21 +64,34 @@ class Event(models.Model):
     organizer = models.CharField(max_length=200, blank=True, null=True)
     instructor = models.CharField(max_length=200, blank=True, null=True)
     
-    image = models.ImageField(upload_to='events/', blank=True, null=True)
+    image = HashedImageField(upload_to='events/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = EventQuerySet.as_manager()
     
     class Meta:
         ordering = ['date', 'start_time']
+        indexes = [
+            # Partial index: list publik cuma lihat event aktif, urut tanggal
+            models.Index(fields=['date', 'start_time'], condition=models.Q(is_active=True), name='event_active_date_idx'),
+            # Filter kategori (+level dicek per baris) tetap urut tanpa sort tambahan
+            models.Index(fields=['category', 'date', 'start_time'], condition=models.Q(is_active=True), name='event_active_category_idx'),
+            # Sort list & export admin (semua event, aktif atau tidak)
+            models.Index(fields=['created_at', 'id'], name='event_created_idx'),
+            models.Index(fields=['date', 'id'], name='event_date_idx'),
+        ]
     
     def __str__(self):
         return self.name
     
     @property
     def current_participants(self):
-        # Diubah: Menggunakan related_name 'registrations' dari EventRegistration
+        # Pakai anotasi dari with_participation() kalau ada, kalau gak baru COUNT sendiri
+        if 'participant_count' in self.__dict__:
+            return self.participant_count
         return self.registrations.count()
     
     @property
@@ -60,6 +100,8 @@ class Event(models.Model):
     
     @property
     def spots_left(self):
+        if 'remaining_spots' in self.__dict__:
+            return self.remaining_spots
         return self.max_participants - self.current_participants
     
     @property
@@ -68,6 +110,9 @@ class Event(models.Model):
     
     def is_registered(self, user):
         if user.is_authenticated:
+            # Anotasi with_participation(user) cuma berlaku untuk user yang sama
+            if getattr(self, 'participation_user_id', None) == user.pk:
+                return self.user_registered
             # Diubah: Mengecek ke model EventRegistration
             return self.registrations.filter(user=user).exists()
         return False
@@ -85,4 +130,18 @@ class EventRegistration(models.Model):
         ordering = ['-registered_at']
     
     def __str__(self):
-        return f"{self.user.username} - {self.event.name}"
\ No newline at end of file
+        return f"{self.user.username} - {self.event.name}"
+
+
+class EventWaitlistEntry(models.Model):
+    """A user waiting for a seat on a full event; the oldest entry is promoted first."""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='waitlist_entries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='event_waitlist_entries')
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['event', 'user']
+        ordering = ['joined_at', 'id']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.event.name} (waitlist)"
@@ -0,0 +1,140 @@
+"""Event registration with a hard capacity and a waitlist.
+
+register() and cancel() start their transaction with a no-op UPDATE on the
+event row (``max_participants = max_participants``). On PostgreSQL that
+takes the row lock and on SQLite the database write lock, so counting the
+seats, inserting the registration and promoting from the waitlist run for
+one request per event at a time: the number of registrations can never go
+past max_participants. A full event puts new sign-ups on the waitlist, and
+a cancellation hands the free seat to the oldest waitlist entry inside the
+same transaction.
+"""
+import time
+
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F, Q
+
+from .models import Event, EventRegistration, EventWaitlistEntry
+
+REGISTERED = 'registered'
+WAITLISTED = 'waitlisted'
+
+# Sama seperti booking/checkout: SQLite cuma satu writer, coba lagi sebentar kalau lagi di-lock.
+# Lebih banyak dari booking karena pendaftaran event yang baru dibuka memang diserbu bareng
+LOCK_RETRIES = 10
+LOCK_BACKOFF = 0.05
+
+
+class RegistrationError(Exception):
+    status = 400
+
+
+class EventNotFound(RegistrationError):
+    status = 404
+
+
+class AlreadyRegistered(RegistrationError):
+    status = 409
+
+
+class EventFull(RegistrationError):
+    status = 409
+
+
+def _retrying(func):
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return func()
+        except OperationalError:
+            if attempt == LOCK_RETRIES - 1:
+                raise RegistrationError("Registration is busy, please try again.")
+            time.sleep(LOCK_BACKOFF * (attempt + 1))
+
+
+def _lock(event_id):
+    """Lock the event row until the end of the transaction and return its capacity."""
+    if not Event.objects.filter(pk=event_id).update(max_participants=F('max_participants')):
+        raise EventNotFound("Event not found")
+    return Event.objects.filter(pk=event_id).values_list('max_participants', flat=True).get()
+
+
+def _promote(event_id, capacity):
+    promoted = []
+    free = capacity - EventRegistration.objects.filter(event_id=event_id).count()
+    for entry in EventWaitlistEntry.objects.filter(event_id=event_id)[:max(free, 0)]:
+        entry.delete()
+        EventRegistration.objects.create(event_id=event_id, user_id=entry.user_id)
+        promoted.append(entry.user_id)
+    return promoted
+
+
+def register(user, event, waitlist=True):
+    """Register ``user`` for ``event``; returns REGISTERED or WAITLISTED.
+
+    Raises AlreadyRegistered for a duplicate (registration or waitlist), EventFull when the event is
+    full and ``waitlist`` is False, and RegistrationError for past events.
+    """
+    if event.is_past:
+        raise RegistrationError("Event has passed")
+
+    def run():
+        with transaction.atomic():
+            capacity = _lock(event.pk)
+            if EventRegistration.objects.filter(event_id=event.pk, user=user).exists():
+                raise AlreadyRegistered("Already registered")
+            if EventRegistration.objects.filter(event_id=event.pk).count() < capacity:
+                EventRegistration.objects.create(event_id=event.pk, user=user)
+                EventWaitlistEntry.objects.filter(event_id=event.pk, user=user).delete()
+                return REGISTERED
+            if not waitlist:
+                raise EventFull("Event is full")
+            if not EventWaitlistEntry.objects.get_or_create(event_id=event.pk, user=user)[1]:
+                raise AlreadyRegistered("Already on the waitlist")
+            return WAITLISTED
+
+    try:
+        return _retrying(run)
+    except IntegrityError:
+        # Gak bisa terjadi selama lock-nya jalan, tapi jangan sampai jadi 500
+        raise AlreadyRegistered("Already registered")
+
+
+def cancel(user, event):
+    """Remove ``user`` from the event or its waitlist.
+
+    Returns the ids of the users promoted into the freed seat. Raises
+    RegistrationError when the user was neither registered nor waiting.
+    """
+    def run():
+        with transaction.atomic():
+            capacity = _lock(event.pk)
+            if EventRegistration.objects.filter(event_id=event.pk, user=user).delete()[0]:
+                return _promote(event.pk, capacity)
+            if EventWaitlistEntry.objects.filter(event_id=event.pk, user=user).delete()[0]:
+                return []
+            raise RegistrationError("You were not registered for this event.")
+
+    return _retrying(run)
+
+
+def promote_waitlist(event):
+    """Fill free seats (e.g. after max_participants was raised) from the waitlist."""
+    def run():
+        with transaction.atomic():
+            return _promote(event.pk, _lock(event.pk))
+
+    return _retrying(run)
+
+
+def waitlist_position(user, event):
+    """1-based position of ``user`` on the waitlist, or None."""
+    if not user.is_authenticated:
+        return None
+    entry = EventWaitlistEntry.objects.filter(event=event, user=user).values_list('joined_at', 'id').first()
+    if entry is None:
+        return None
+    joined_at, pk = entry
+    ahead = EventWaitlistEntry.objects.filter(
+        Q(joined_at__lt=joined_at) | Q(joined_at=joined_at, id__lt=pk), event=event
+    ).count()
+    return ahead + 1
@@ -6,28 +6,25 @@ from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.utils import timezone
 from .models import Event, EventRegistration
+from . import services
+from .ingest import unique_slug
 from django.template.loader import render_to_string
 # events/views.py
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from .models import Event
 from django.db import transaction
+from the_rink.cache import cache_view, cached
+from the_rink.thumbnails import thumbnail_url
 
 @csrf_exempt
+@cache_view('event')
 def get_events_json(request):
-    events = Event.objects.filter(is_active=True)
-    
-    registered_event_ids = set()
-    if request.user.is_authenticated:
-        registered_event_ids = set(
-            EventRegistration.objects.filter(user=request.user)
-            .values_list('event_id', flat=True)
-        )
+    events = Event.objects.filter(is_active=True).with_participation(request.user)
 
     data = []
     for event in events:
-        # Logika is_registered: True jika ID event ada di daftar pendaftaran user
-        is_registered = event.id in registered_event_ids
+        is_registered = event.is_registered(request.user)
 
         data.append({
             'id': event.id,
@@ -39,6 +36,7 @@ def get_events_json(request):
             'price': float(event.price),
             'category': event.category,
             'image_url': event.image.url if event.image else '',
+            'thumbnail_url': thumbnail_url(event.image, 'list'),
             'participant_count': event.current_participants,
             'max_participants': event.max_participants,
             'is_registered': is_registered, # Menggunakan hasil lookup di atas
@@ -51,32 +49,41 @@ def join_event_flutter(request, event_id):
         return JsonResponse({'status': False, 'message': 'Unauthorized'}, status=401)
     
     if request.method == 'POST':
-        try:
-            event = Event.objects.get(id=event_id)
-            user = request.user
-            
-            # Cek apakah sudah terdaftar (Query langsung ke tabel Registration biar akurat)
-            if EventRegistration.objects.filter(event=event, user=user).exists():
-                return JsonResponse({'status': False, 'message': 'Already registered'}, status=400)
-            
-            if event.is_full:
-                return JsonResponse({'status': False, 'message': 'Event is full'}, status=400)
-            
-            if event.is_past:
-                return JsonResponse({'status': False, 'message': 'Event has passed'}, status=400)
-
-            # Simpan registrasi
-            EventRegistration.objects.create(event=event, user=user)
-            
-            return JsonResponse({'status': True, 'message': 'Successfully joined!'})
-            
-        except Event.DoesNotExist:
+        event = Event.objects.filter(id=event_id).first()
+        if event is None:
             return JsonResponse({'status': False, 'message': 'Event not found'}, status=404)
-        except Exception as e:
-            return JsonResponse({'status': False, 'message': str(e)}, status=500)
+        try:
+            outcome = services.register(request.user, event)
+        except services.RegistrationError as e:
+            return JsonResponse({'status': False, 'message': str(e)}, status=e.status)
+
+        if outcome == services.WAITLISTED:
+            return JsonResponse({
+                'status': True,
+                'waitlisted': True,
+                'waitlist_position': services.waitlist_position(request.user, event),
+                'message': 'Event is full, you are on the waitlist.',
+            })
+        return JsonResponse({'status': True, 'waitlisted': False, 'message': 'Successfully joined!'})
             
     return JsonResponse({'status': False, 'message': 'Invalid method'}, status=405)
 
+@csrf_exempt
+def leave_event_flutter(request, event_id):
+    if not request.user.is_authenticated:
+        return JsonResponse({'status': False, 'message': 'Unauthorized'}, status=401)
+    if request.method != 'POST':
+        return JsonResponse({'status': False, 'message': 'Invalid method'}, status=405)
+
+    event = Event.objects.filter(id=event_id).first()
+    if event is None:
+        return JsonResponse({'status': False, 'message': 'Event not found'}, status=404)
+    try:
+        services.cancel(request.user, event)
+    except services.RegistrationError as e:
+        return JsonResponse({'status': False, 'message': str(e)}, status=e.status)
+    return JsonResponse({'status': True, 'message': 'Registration cancelled.'})
+
 def event_list(request):
     """Display all events with optional filtering"""
     category = request.GET.get('category', request.session.get('event_category', 'all'))
@@ -87,10 +94,11 @@ def event_list(request):
     request.session['event_level'] = level
 
     # Get upcoming events only
+    today = timezone.now().date()
     events = Event.objects.filter(
         is_active=True,
-        date__gte=timezone.now().date()
-    )
+        date__gte=today
+    ).with_participation()
     
     # Apply filters
     if category and category != 'all':
@@ -98,6 +106,9 @@ def event_list(request):
     
     if level and level != 'all':
         events = events.filter(level=level)
+
+    # Halaman ini nulis session, jadi yang di-cache datanya saja, bukan respons utuh
+    events = cached('event_list', 'event', parts=(category, level, today), build=lambda: list(events))
     
     # Check if it's an HTMX request
     if request.headers.get('HX-Request'):
@@ -116,19 +127,20 @@ def event_list(request):
 
 def event_detail(request, slug):
     """Display detailed event information"""
-    event = get_object_or_404(Event, slug=slug, is_active=True)
+    event = get_object_or_404(Event.objects.with_participation(request.user), slug=slug, is_active=True)
     
     # Get related events (same category, different event)
     related_events = Event.objects.filter(
         category=event.category,
         is_active=True,
         date__gte=timezone.now().date()
-    ).exclude(id=event.id)[:3]
+    ).exclude(id=event.id).with_participation()[:3]
     
     context = {
         'event': event,
         'related_events': related_events,
-        'is_registered': event.is_registered(request.user)
+        'is_registered': event.is_registered(request.user),
+        'waitlist_position': services.waitlist_position(request.user, event),
     }
     
     return render(request, 'events/detail.html', context)
@@ -154,37 +166,28 @@ def register_event(request, slug):
     Mengembalikan partial button baru dan trigger untuk menutup modal.
     """
     event = get_object_or_404(Event, slug=slug, is_active=True)
-    
-    # Cek jika event penuh
-    if event.is_full:
-        messages.error(request, 'Sorry, this event is fully booked.')
-        return render(request, 'events/partials/registration_modal.html', {'event': event})
 
-    # Cek jika sudah terdaftar
-    if event.is_registered(request.user):
-        messages.error(request, 'You are already registered for this event.')
+    try:
+        outcome = services.register(request.user, event)
+    except services.RegistrationError as e:
+        messages.error(request, str(e))
         return render(request, 'events/partials/registration_modal.html', {'event': event})
 
-    # Cek jika event sudah lewat
-    if event.is_past:
-        messages.error(request, 'Cannot register for past events.')
-        return render(request, 'events/partials/registration_modal.html', {'event': event})
-
-    # Daftarkan user
-    # HANYA BUAT EventRegistration, 'participants.add' sudah dihapus
-    EventRegistration.objects.create(event=event, user=request.user)
-    
     # Siapkan partial button baru
     html = render_to_string('events/partials/event_book_button.html', {
         'event': event,
-        'is_registered': True,
+        'is_registered': outcome == services.REGISTERED,
+        'waitlist_position': services.waitlist_position(request.user, event),
         'user': request.user
     })
     
     # Kirim response HTMX
     response = HttpResponse(html)
     response['HX-Trigger'] = 'closeModal' # Trigger custom event 'closeModal'
-    messages.success(request, f'Successfully registered for {event.name}!')
+    if outcome == services.WAITLISTED:
+        messages.info(request, f'{event.name} is full, you have been added to the waitlist.')
+    else:
+        messages.success(request, f'Successfully registered for {event.name}!')
     return response
 
 
@@ -197,14 +200,12 @@ def cancel_registration(request, slug):
     """
     event = get_object_or_404(Event, slug=slug, is_active=True)
     
-    # Hapus pendaftaran
-    registration = EventRegistration.objects.filter(event=event, user=request.user)
-    
-    if registration.exists():
-        registration.delete()
+    # Hapus pendaftaran (atau antrean); kursi yang kosong langsung diisi dari waitlist
+    try:
+        services.cancel(request.user, event)
         messages.success(request, 'Registration cancelled successfully.')
-    else:
-        messages.error(request, 'You were not registered for this event.')
+    except services.RegistrationError as e:
+        messages.error(request, str(e))
 
     # Kembalikan partial button baru
     return render(request, 'events/partials/event_book_button.html', {
@@ -236,7 +237,7 @@ def my_events(request):
 def admin_event_list(request):
     if not request.session.get('is_admin'):
         return redirect('authentication:login')
-    events = Event.objects.all()
+    events = Event.objects.with_participation()
     return render(request, 'events/admin_event_list.html', {'events': events})
 
 def admin_event_create(request):
@@ -247,7 +248,7 @@ def admin_event_create(request):
         form = EventForm(request.POST, request.FILES)
         if form.is_valid():
             event = form.save(commit=False)
-            event.slug = slugify(event.name)
+            event.slug = unique_slug(event.name)
             event.save()
             messages.success(request, 'Event created successfully!')
             return redirect('events:admin_event_list')
@@ -264,8 +265,11 @@ def admin_event_update(request, id):
         form = EventForm(request.POST, request.FILES, instance=event)
         if form.is_valid():
             event = form.save(commit=False)
-            event.slug = slugify(event.name)
+            if 'name' in form.changed_data:
+                event.slug = unique_slug(event.name, exclude_pk=event.pk)
             event.save()
+            # Kapasitas bisa saja dinaikkan: isi kursi barunya dari waitlist
+            services.promote_waitlist(event)
             messages.success(request, 'Event updated successfully!')
             return redirect('events:admin_event_list')
     else:
@@ -284,7 +288,7 @@ def admin_event_delete(request, id):
 
 @csrf_exempt
 def get_event_detail_json(request, event_id):
-    event = get_object_or_404(Event, id=event_id, is_active=True)
+    event = get_object_or_404(Event.objects.with_participation(request.user), id=event_id, is_active=True)
 
     related_events = Event.objects.filter(
         category=event.category,
@@ -303,9 +307,11 @@ def get_event_detail_json(request, event_id):
             'price': float(event.price),
             'category': event.category,
             'image_url': event.image.url if event.image else '',
+            'thumbnail_url': thumbnail_url(event.image, 'detail'),
             'participant_count': event.current_participants,
             'max_participants': event.max_participants,
             'is_registered': event.is_registered(request.user),
+            'waitlist_position': services.waitlist_position(request.user, event),
         },
         'recommended_events': [
             {
@@ -314,6 +320,7 @@ def get_event_detail_json(request, event_id):
                 'date': str(e.date),
                 'location': e.location,
                 'image_url': e.image.url if e.image else '',
+                'thumbnail_url': thumbnail_url(e.image, 'list'),
             }
             for e in related_events
         ]
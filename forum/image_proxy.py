@@ -0,0 +1,304 @@
+"""Caching proxy for remote forum thumbnails (``/forum/proxy-image/?url=``).
+
+Downloaded images are kept on disk, content-addressed::
+
+    <IMAGE_PROXY_DIR>/blobs/ab/<sha256 of the bytes>
+    <IMAGE_PROXY_DIR>/urls/cd/<sha256 of the url>.json  -> digest, content type, size, fetch time
+
+A hit is answered from the file with ``ETag: "<digest>"`` and a long
+``Cache-Control``, and a matching ``If-None-Match`` gets a 304. A miss is
+streamed to the client chunk by chunk while it is written to a temporary
+file; only a complete download of at most IMAGE_PROXY_MAX_BYTES is kept.
+Once more than IMAGE_PROXY_CACHE_BYTES is on disk the least recently used
+blobs (by mtime, touched on hits) are deleted.
+
+Failures (upstream 4xx/5xx, timeouts, not an image, too big) are
+remembered in the Django cache for NEGATIVE_TTL, so a dead link is not
+fetched again on every page view. Hosts that resolve to private or
+loopback addresses are refused unless IMAGE_PROXY_ALLOW_PRIVATE is set;
+redirects are followed by hand (at most MAX_REDIRECTS) and every
+``Location`` is checked the same way.
+"""
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# (connect, read): jangan sampai worker ketahan 10 detik per gambar lagi
+TIMEOUT = (3.05, 10)
+POOL_SIZE = 20
+MAX_AGE = 7 * 24 * 60 * 60
+# Gambar di URL yang sama bisa diganti; setelah ini diambil ulang
+REFRESH_AFTER = 7 * 24 * 60 * 60
+NEGATIVE_TTL = 5 * 60
+# Redirect diikuti manual (tiap Location dicek check_url), paling banyak segini
+MAX_REDIRECTS = 3
+# mtime blob (penanda LRU) cukup diperbarui sejam sekali
+TOUCH_AFTER = 60 * 60
+# Sapu cache setiap kali sudah menulis 1/10 batasnya, sampai tinggal 90%
+SWEEP_FRACTION = 10
+EVICT_TO = 0.9
+
+_local = threading.local()
+_written = 0
+_lock = threading.Lock()
+
+
+class ProxyError(Exception):
+    status = 502
+
+
+class InvalidImageURL(ProxyError):
+    status = 400
+
+
+class BlockedHost(ProxyError):
+    status = 403
+
+
+def _root():
+    return Path(settings.IMAGE_PROXY_DIR)
+
+
+def _url_key(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def _index_path(key):
+    return _root() / 'urls' / key[:2] / f'{key}.json'
+
+
+def _blob_path(digest):
+    return _root() / 'blobs' / digest[:2] / digest
+
+
+def _failure_key(key):
+    return f'imgproxy:fail:{key}'
+
+
+def _session():
+    # Satu Session (dengan pool koneksi keep-alive) per thread worker, sama seperti importer gear
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+    return session
+
+
+def check_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise InvalidImageURL('Only http(s) image URLs can be proxied')
+    if getattr(settings, 'IMAGE_PROXY_ALLOW_PRIVATE', False):
+        return
+    try:
+        addresses = socket.getaddrinfo(parsed.hostname, parsed.port or 443, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        raise ProxyError(f'Cannot resolve {parsed.hostname}')
+    for *_, sockaddr in addresses:
+        if not ipaddress.ip_address(sockaddr[0].split('%')[0]).is_global:
+            raise BlockedHost('Refusing to proxy a private address')
+
+
+def _fail(key, message):
+    cache.set(_failure_key(key), message, NEGATIVE_TTL)
+    return ProxyError(message)
+
+
+# --- Cache di disk ------------------------------------------------------------
+
+def lookup(url):
+    """Return ``(entry, blob path)`` for a fresh cached copy of ``url``, or None."""
+    index = _index_path(_url_key(url))
+    try:
+        entry = json.loads(index.read_text())
+        stat = _blob_path(entry['digest']).stat()
+    except (OSError, ValueError, KeyError):
+        return None
+    if time.time() - entry['fetched_at'] > REFRESH_AFTER:
+        return None
+    blob = _blob_path(entry['digest'])
+    if time.time() - stat.st_mtime > TOUCH_AFTER:
+        try:
+            os.utime(blob)
+        except OSError:
+            pass
+    return entry, blob
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.part-')
+    with os.fdopen(fd, 'w') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _store(key, tmp, digest, size, content_type):
+    blob = _blob_path(digest)
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    # Isi sama dari URL lain: blob yang sudah ada dipakai
+    os.replace(tmp, blob)
+    _write_atomic(_index_path(key), json.dumps({
+        'digest': digest, 'content_type': content_type, 'size': size, 'fetched_at': time.time(),
+    }))
+
+    global _written
+    with _lock:
+        _written += size
+        if _written < settings.IMAGE_PROXY_CACHE_BYTES // SWEEP_FRACTION:
+            return
+        _written = 0
+    evict()
+
+
+def evict(limit=None):
+    """Delete least recently used blobs until the cache is under EVICT_TO of the limit. Returns bytes freed."""
+    limit = settings.IMAGE_PROXY_CACHE_BYTES if limit is None else limit
+    now = time.time()
+    blobs, total = [], 0
+    for path in (_root() / 'blobs').glob('*/*'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        if path.name.startswith('.part-'):
+            # Sisa download yang terputus
+            if now - stat.st_mtime > TOUCH_AFTER:
+                path.unlink(missing_ok=True)
+            continue
+        blobs.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    for path in (_root() / 'urls').glob('*/*.json'):
+        try:
+            if now - path.stat().st_mtime > REFRESH_AFTER:
+                path.unlink(missing_ok=True)
+        except OSError:
+            continue
+
+    freed = 0
+    if total > limit:
+        for _, size, path in sorted(blobs):
+            if total - freed <= limit * EVICT_TO:
+                break
+            path.unlink(missing_ok=True)
+            freed += size
+    return freed
+
+
+# --- Response -----------------------------------------------------------------
+
+def _cached_response(request, entry, blob):
+    etag = f'"{entry["digest"]}"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponse(status=304)
+    else:
+        try:
+            response = FileResponse(open(blob, 'rb'), content_type=entry['content_type'])
+        except OSError:
+            # Baru saja kena evict
+            return None
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={MAX_AGE}'
+    return response
+
+
+def _stream(key, upstream, content_type):
+    """Pass ``upstream`` through chunk by chunk while writing it to the cache."""
+    parts = _root() / 'blobs' / key[:2]
+    parts.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=parts, prefix='.part-')
+    sha, size, complete = hashlib.sha256(), 0, False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in upstream.iter_content(CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.IMAGE_PROXY_MAX_BYTES:
+                    # Content-Length-nya bohong/tidak ada: potong, jangan disimpan
+                    _fail(key, 'Image is too large')
+                    return
+                sha.update(chunk)
+                f.write(chunk)
+                yield chunk
+        complete = True
+    except requests.RequestException as e:
+        logger.warning('image proxy: %s broke off: %s', upstream.url, e)
+        _fail(key, f'Error fetching image: {e}')
+    finally:
+        upstream.close()
+        if not complete:
+            os.remove(tmp)
+    if complete:
+        _store(key, tmp, sha.hexdigest(), size, content_type)
+
+
+def _open(key, url):
+    """GET ``url``, following redirects by hand so every hop goes through check_url()."""
+    for _ in range(MAX_REDIRECTS + 1):
+        try:
+            check_url(url)
+        except BlockedHost as e:
+            cache.set(_failure_key(key), str(e), NEGATIVE_TTL)
+            raise
+        try:
+            upstream = _session().get(url, stream=True, timeout=TIMEOUT, allow_redirects=False)
+        except requests.RequestException as e:
+            raise _fail(key, f'Error fetching image: {e}')
+        if not upstream.is_redirect:
+            return upstream
+        upstream.close()
+        url = urljoin(url, upstream.headers['Location'])
+    raise _fail(key, 'Too many redirects')
+
+
+def _fetch(key, url):
+    upstream = _open(key, url)
+    try:
+        upstream.raise_for_status()
+    except requests.RequestException as e:
+        upstream.close()
+        raise _fail(key, f'Error fetching image: {e}')
+    content_type = upstream.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    length = upstream.headers.get('Content-Length', '')
+    if not content_type.startswith('image/'):
+        upstream.close()
+        raise _fail(key, 'Not an image')
+    if length.isdigit() and int(length) > settings.IMAGE_PROXY_MAX_BYTES:
+        upstream.close()
+        raise _fail(key, 'Image is too large')
+    response = StreamingHttpResponse(_stream(key, upstream, content_type), content_type=content_type)
+    response['Cache-Control'] = f'public, max-age={MAX_AGE}'
+    return response
+
+
+def serve(request, url):
+    """Response for ``url``: from the disk cache, or streamed from upstream. Raises ProxyError."""
+    key = _url_key(url)
+    hit = lookup(url)
+    if hit:
+        response = _cached_response(request, *hit)
+        if response is not None:
+            return response
+    failure = cache.get(_failure_key(key))
+    if failure:
+        raise ProxyError(failure)
+    return _fetch(key, url)
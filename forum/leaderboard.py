@@ -0,0 +1,84 @@
+"""Cached "top posts" leaderboard.
+
+Posts carry a maintained ``score`` column with a matching index, so building
+the board is an index range scan of LEADERBOARD_SIZE rows. The result is kept
+in Django's cache (locmem by default, any shared backend works) and is only
+dropped when a write touches a post that is on the board or that now
+outranks its last entry.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+
+from forum.models import Post, Reply
+
+LEADERBOARD_SIZE = 5
+CACHE_KEY = "forum:leaderboard"
+# Safety net for writes that bypass the model hooks (bulk/cascade deletes)
+CACHE_TIMEOUT = 5 * 60
+
+RANK_ORDERING = ("-score", "-upvote_count", "-downvote_count", "-created_at", "-id")
+RANK_FIELDS = ("score", "upvote_count", "downvote_count", "created_at", "id")
+
+
+def _rank(values):
+    return tuple(values[field] for field in RANK_FIELDS)
+
+
+def _build():
+    posts = (
+        Post.objects
+        .select_related("author")
+        .order_by(*RANK_ORDERING)[:LEADERBOARD_SIZE]
+    )
+    return [
+        {
+            "id": post.id,
+            "title": post.title,
+            "content": post.content,
+            "thumbnail_url": post.thumbnail_url,
+            "created_at": post.created_at,
+            "author": post.author.username if post.author else None,
+            "user_id": post.author_id,
+            "score": post.score,
+            "upvote_count": post.upvote_count,
+            "downvote_count": post.downvote_count,
+        }
+        for post in posts
+    ]
+
+
+def get_top_posts(limit=LEADERBOARD_SIZE):
+    entries = cache.get(CACHE_KEY)
+    if entries is None:
+        entries = _build()
+        cache.set(CACHE_KEY, entries, CACHE_TIMEOUT)
+    return entries[:limit]
+
+
+def get_reply_counts(entries):
+    counts = (
+        Reply.objects
+        .filter(post_id__in=[e["id"] for e in entries])
+        .values("post_id")
+        .annotate(total=Count("id"))
+    )
+    return {row["post_id"]: row["total"] for row in counts}
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+
+
+def note_post_change(post_id):
+    """Drop the cached board if ``post_id`` is on it or now ranks above its last entry."""
+    entries = cache.get(CACHE_KEY)
+    if entries is None:
+        return
+
+    if len(entries) < LEADERBOARD_SIZE or any(e["id"] == post_id for e in entries):
+        invalidate()
+        return
+
+    post = Post.objects.filter(pk=post_id).values(*RANK_FIELDS).first()
+    if post and _rank(post) > _rank(entries[-1]):
+        invalidate()
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from forum import leaderboard
+from forum.models import Post, Reply, UpVote
+
+
+def _tally(fk, is_upvote):
+    votes = (
+        UpVote.objects
+        .filter(**{fk: OuterRef('pk')}, is_upvote=is_upvote)
+        .values(fk)
+        .annotate(c=Count('pk'))
+        .values('c')
+    )
+    return Coalesce(Subquery(votes), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute Post/Reply upvote_count and downvote_count from the UpVote table'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            posts = Post.objects.update(
+                upvote_count=_tally('post', True),
+                downvote_count=_tally('post', False),
+            )
+            Post.objects.update(score=F('upvote_count') - F('downvote_count'))
+            replies = Reply.objects.update(
+                upvote_count=_tally('reply', True),
+                downvote_count=_tally('reply', False),
+            )
+        leaderboard.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Vote counters rebuilt for {posts} posts and {replies} replies.'
+        ))
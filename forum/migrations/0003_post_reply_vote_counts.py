@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:38
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_counts(apps, schema_editor):
+    UpVote = apps.get_model('forum', 'UpVote')
+    for model_name, fk in (('Post', 'post'), ('Reply', 'reply')):
+        model = apps.get_model('forum', model_name)
+
+        def tally(is_upvote):
+            votes = (
+                UpVote.objects
+                .filter(**{fk: OuterRef('pk')}, is_upvote=is_upvote)
+                .values(fk)
+                .annotate(c=Count('pk'))
+                .values('c')
+            )
+            return Coalesce(Subquery(votes), 0)
+
+        model.objects.update(upvote_count=tally(True), downvote_count=tally(False))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0002_remove_upvote_unique_vote_per_user_post_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='downvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='downvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_vote_counts, migrations.RunPython.noop),
+    ]
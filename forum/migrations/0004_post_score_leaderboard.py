@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_score(apps, schema_editor):
+    Post = apps.get_model('forum', 'Post')
+    Post.objects.update(score=F('upvote_count') - F('downvote_count'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0003_post_reply_vote_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='score',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-score', '-upvote_count', '-downvote_count', '-created_at', '-id'], name='post_leaderboard_idx'),
+        ),
+    ]
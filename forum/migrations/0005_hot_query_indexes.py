@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0004_post_score_leaderboard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_at', '-id'], name='post_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reply',
+            index=models.Index(fields=['post', 'created_at', 'id'], name='reply_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='upvote',
+            index=models.Index(fields=['post', 'is_upvote'], name='upvote_post_kind_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='upvote',
+            index=models.Index(fields=['reply', 'is_upvote'], name='upvote_reply_kind_idx'),
+        ),
+    ]
@@ -1,7 +1,13 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 
 
+def _check_leaderboard(post_id):
+    from forum import leaderboard
+    transaction.on_commit(lambda: leaderboard.note_post_change(post_id))
+
+
 class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
     title = models.CharField(max_length=200)
@@ -9,12 +15,28 @@ class Post(models.Model):
     thumbnail_url = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized vote counters, kept in sync by UpVote.save() and forum/signals.py.
+    # Run `manage.py rebuild_vote_counts` if they ever drift.
+    upvote_count = models.PositiveIntegerField(default=0)
+    downvote_count = models.PositiveIntegerField(default=0)
+    # upvote_count - downvote_count, what the leaderboard ranks on
+    score = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-score', '-upvote_count', '-downvote_count', '-created_at', '-id'],
+                name='post_leaderboard_idx',
+            ),
+            # Feed & admin list: newest first, keyset cursor (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='post_feed_idx'),
+        ]
 
     def total_upvotes(self):
-        return self.upvotes.filter(is_upvote=True).count()
+        return self.upvote_count
 
     def total_downvotes(self):
-        return self.upvotes.filter(is_upvote=False).count()
+        return self.downvote_count
 
     def __str__(self):
         return self.title
@@ -26,12 +48,24 @@ class Reply(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized vote counters, kept in sync by UpVote.save() and forum/signals.py.
+    # Run `manage.py rebuild_vote_counts` if they ever drift.
+    upvote_count = models.PositiveIntegerField(default=0)
+    downvote_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Replies satu post, urut lama -> baru (get_replies & feed replies)
+            models.Index(fields=['post', 'created_at', 'id'], name='reply_post_created_idx'),
+            # List & export admin: semua reply, terbaru dulu
+            models.Index(fields=['created_at', 'id'], name='reply_created_idx'),
+        ]
 
     def total_upvotes(self):
-        return self.upvotes.filter(is_upvote=True).count()
+        return self.upvote_count
 
     def total_downvotes(self):
-        return self.upvotes.filter(is_upvote=False).count()
+        return self.downvote_count
 
     def __str__(self):
         return f"Reply by {self.author.username} on {self.post.title}"
@@ -71,6 +105,62 @@ class UpVote(models.Model):
                 condition=models.Q(post__isnull=True, session_key__isnull=False)
             ),
         ]
+        indexes = [
+            # Tally per target (rebuild_vote_counts) tanpa baca semua vote
+            models.Index(fields=['post', 'is_upvote'], name='upvote_post_kind_idx'),
+            models.Index(fields=['reply', 'is_upvote'], name='upvote_reply_kind_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted direction so save() knows which counter to move
+        instance._saved_is_upvote = dict(zip(field_names, values)).get('is_upvote')
+        return instance
+
+    def _bump_counter(self, is_upvote, delta):
+        if self.post_id:
+            fk, model, pk = 'post', Post, self.post_id
+        elif self.reply_id:
+            fk, model, pk = 'reply', Reply, self.reply_id
+        else:
+            return
+        field = 'upvote_count' if is_upvote else 'downvote_count'
+        changes = {field: delta}
+        if model is Post:
+            changes['score'] = delta if is_upvote else -delta
+        model.objects.filter(pk=pk).update(**{
+            name: F(name) + value for name, value in changes.items()
+        })
+
+        # Keep an already-loaded target instance in step with the database
+        if self._meta.get_field(fk).is_cached(self):
+            target = getattr(self, fk)
+            for name, value in changes.items():
+                setattr(target, name, getattr(target, name) + value)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        previous = getattr(self, '_saved_is_upvote', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self._bump_counter(self.is_upvote, 1)
+            elif previous is not None and previous != self.is_upvote:
+                self._bump_counter(previous, -1)
+                self._bump_counter(self.is_upvote, 1)
+            if self.post_id:
+                _check_leaderboard(self.post_id)
+        self._saved_is_upvote = self.is_upvote
+
+    def delete(self, *args, **kwargs):
+        # Counter diturunkan di signals.py (post_delete), supaya cascade dari hapus User ikut.
+        # Barisnya dikunci dulu: vote yang sudah terhapus (un-vote dobel, instance basi)
+        # gak boleh sampai ke post_delete dan menurunkan counter dua kali
+        with transaction.atomic():
+            if not UpVote.objects.select_for_update().filter(pk=self.pk).values_list('pk', flat=True):
+                return 0, {self._meta.label: 0}
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         target = self.post if self.post else self.reply
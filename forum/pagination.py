@@ -0,0 +1,88 @@
+"""Keyset (cursor) pagination for the forum JSON feeds.
+
+Pages are ordered on (created_at, id) and the cursor is the position of the
+last row sent, so deep pages cost the same as the first one.
+"""
+import base64
+import binascii
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj):
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        stamp, pk = raw.rsplit("|", 1)
+        created_at = parse_datetime(stamp)
+        if created_at is None:
+            raise InvalidCursor(cursor)
+        return created_at, int(pk)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise InvalidCursor(cursor)
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        size = int(request.GET.get("page_size", default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def keyset_queryset(queryset, cursor=None, descending=True):
+    """Order ``queryset`` on (created_at, id) and skip past ``cursor``.
+
+    Raises InvalidCursor for a cursor that cannot be decoded, so callers can
+    answer with a 400 before any streaming starts.
+    """
+    if descending:
+        ordering = ("-created_at", "-id")
+    else:
+        ordering = ("created_at", "id")
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        if descending:
+            after = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        else:
+            after = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        queryset = queryset.filter(after)
+
+    return queryset.order_by(*ordering)
+
+
+def stream_page(queryset, page_size, serialize):
+    """Yield one page of ``queryset`` as a JSON document, row by row.
+
+    One extra row is fetched to find out whether another page exists; it is
+    never serialized. The document looks like
+    ``{"results": [...], "next_cursor": "..." | null}``.
+    """
+    yield '{"results": ['
+    last = None
+    has_more = False
+    for index, obj in enumerate(queryset[:page_size + 1].iterator()):
+        if index == page_size:
+            has_more = True
+            break
+        prefix = "," if index else ""
+        yield prefix + json.dumps(serialize(obj), cls=DjangoJSONEncoder)
+        last = obj
+
+    next_cursor = encode_cursor(last) if has_more else None
+    yield '], "next_cursor": ' + json.dumps(next_cursor) + "}"
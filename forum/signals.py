@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Post, UpVote, _check_leaderboard
+
+
+# Signal (bukan override delete) supaya cascade dari hapus User juga ikut ke-handle
+
+@receiver(post_delete, sender=UpVote)
+def uncount_vote(sender, instance, **kwargs):
+    instance._bump_counter(instance.is_upvote, -1)
+    if instance.post_id:
+        _check_leaderboard(instance.post_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def check_leaderboard(sender, instance, **kwargs):
+    # Post yang terhapus lewat cascade (hapus author) juga harus keluar dari board
+    _check_leaderboard(instance.pk)
@@ -3,11 +3,24 @@ from django.urls import reverse
 from django.contrib.auth.models import User
 from forum.models import Post, Reply, UpVote
 from django.test.client import RequestFactory
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import override_settings
+from forum import image_proxy, leaderboard
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
 import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from urllib.parse import urlparse
 
 
 class ForumBaseTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.user = User.objects.create_user(username="angga", password="123")
         self.user2 = User.objects.create_user(username="yafi", password="123")
@@ -254,3 +267,310 @@ class TopPostTests(ForumBaseTest):
         data = res.json()
         self.assertTrue(isinstance(data, list))
         self.assertIn("title", data[0])
+
+class VoteCounterTests(ForumBaseTest):
+    def toggle(self, target_type, target_id, is_upvote):
+        return self.client.post(reverse("forum:toggle_vote"),
+                                data=json.dumps({"type": target_type, "id": target_id, "is_upvote": is_upvote}),
+                                content_type="application/json")
+
+    def test_toggle_updates_post_counters(self):
+        self.toggle("post", self.post.id, True)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.upvote_count, self.post.downvote_count), (1, 0))
+
+        res = self.toggle("post", self.post.id, False)
+        self.assertEqual(res.json(), {"upvotes": 0, "downvotes": 1})
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.upvote_count, self.post.downvote_count), (0, 1))
+
+        res = self.toggle("post", self.post.id, False)
+        self.assertEqual(res.json(), {"upvotes": 0, "downvotes": 0})
+
+    def test_toggle_updates_reply_counters(self):
+        reply = Reply.objects.create(post=self.post, author=self.user, content="Cool!")
+        self.toggle("reply", reply.id, False)
+        reply.refresh_from_db()
+        self.assertEqual((reply.upvote_count, reply.downvote_count), (0, 1))
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.upvote_count, self.post.downvote_count), (0, 0))
+
+    def test_feed_reads_counters_without_vote_queries(self):
+        UpVote.objects.create(user=self.user, post=self.post, is_upvote=True)
+        reply = Reply.objects.create(post=self.post, author=self.user, content="Cool!")
+        UpVote.objects.create(user=self.user2, reply=reply, is_upvote=False)
+
+        # posts + replies prefetch, nothing per row
+        with self.assertNumQueries(2):
+            res = self.client.get(reverse("forum:show_json"))
+        data = res.json()[0]
+        self.assertEqual(data["upvotes_count"], 1)
+        self.assertEqual(data["replies"][0]["downvotes_count"], 1)
+
+    def test_deleting_voter_uncounts_votes(self):
+        reply = Reply.objects.create(post=self.post, author=self.user, content="Cool!")
+        UpVote.objects.create(user=self.user2, post=self.post, is_upvote=True)
+        UpVote.objects.create(user=self.user2, reply=reply, is_upvote=False)
+        # Cascade dari hapus User gak lewat UpVote.delete()
+        self.user2.delete()
+        self.post.refresh_from_db()
+        reply.refresh_from_db()
+        self.assertEqual((self.post.upvote_count, self.post.downvote_count, self.post.score), (0, 0, 0))
+        self.assertEqual((reply.upvote_count, reply.downvote_count), (0, 0))
+
+    def test_deleting_a_vote_twice_uncounts_once(self):
+        UpVote.objects.create(user=self.user2, post=self.post, is_upvote=True)
+        vote = UpVote.objects.create(user=self.user, post=self.post, is_upvote=True)
+        stale = UpVote.objects.get(pk=vote.pk)
+        vote.delete()
+        self.assertEqual(stale.delete(), (0, {"forum.UpVote": 0}))
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.upvote_count, self.post.score), (1, 1))
+
+    def test_rebuild_vote_counts_command(self):
+        UpVote.objects.create(user=self.user, post=self.post, is_upvote=True)
+        UpVote.objects.create(user=self.user2, post=self.post, is_upvote=False)
+        Post.objects.filter(pk=self.post.pk).update(upvote_count=9, downvote_count=9)
+
+        call_command("rebuild_vote_counts", stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.upvote_count, self.post.downvote_count), (1, 1))
+
+class FeedTests(ForumBaseTest):
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_feed_pages_with_cursor(self):
+        for i in range(4):
+            Post.objects.create(author=self.user2, title=f"Post {i}", content="x")
+        url = reverse("forum:show_feed_json")
+
+        first = self.read(self.client.get(url, {"page_size": 3}))
+        self.assertEqual(len(first["results"]), 3)
+        self.assertIsNotNone(first["next_cursor"])
+
+        second = self.read(self.client.get(url, {"page_size": 3, "cursor": first["next_cursor"]}))
+        self.assertEqual(len(second["results"]), 2)
+        self.assertIsNone(second["next_cursor"])
+
+        ids = [p["id"] for p in first["results"] + second["results"]]
+        expected = list(Post.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_feed_filters_mine_and_search(self):
+        Post.objects.create(author=self.user2, title="Someone else", content="x")
+        url = reverse("forum:show_feed_json")
+
+        mine = self.read(self.client.get(url, {"mine": "1"}))
+        self.assertEqual([p["id"] for p in mine["results"]], [self.post.id])
+
+        found = self.read(self.client.get(url, {"q": "else"}))
+        self.assertEqual([p["title"] for p in found["results"]], ["Someone else"])
+
+    def test_feed_invalid_cursor(self):
+        res = self.client.get(reverse("forum:show_feed_json"), {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, 400)
+
+    def test_replies_feed_oldest_first(self):
+        replies = [Reply.objects.create(post=self.post, author=self.user, content=f"r{i}") for i in range(3)]
+        url = reverse("forum:get_replies_feed", args=[self.post.id])
+
+        first = self.read(self.client.get(url, {"page_size": 2}))
+        second = self.read(self.client.get(url, {"page_size": 2, "cursor": first["next_cursor"]}))
+
+        ids = [r["id"] for r in first["results"] + second["results"]]
+        self.assertEqual(ids, [r.id for r in replies])
+        self.assertIsNone(second["next_cursor"])
+
+class LeaderboardTests(ForumBaseTest):
+    def setUp(self):
+        super().setUp()
+        self.others = [
+            Post.objects.create(author=self.user2, title=f"Other {i}", content="x")
+            for i in range(6)
+        ]
+
+    def vote(self, post, user, is_upvote=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            UpVote.objects.create(user=user, post=post, is_upvote=is_upvote)
+
+    def test_score_column_tracks_votes(self):
+        self.vote(self.post, self.user)
+        self.vote(self.post, self.user2, is_upvote=False)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.score, 0)
+
+    def test_top_posts_ranked_by_score(self):
+        self.vote(self.others[2], self.user)
+        self.vote(self.others[2], self.user2)
+        self.vote(self.others[4], self.user)
+        ids = [p["id"] for p in leaderboard.get_top_posts(2)]
+        self.assertEqual(ids, [self.others[2].id, self.others[4].id])
+
+    def test_cached_board_served_without_queries(self):
+        leaderboard.get_top_posts()
+        with self.assertNumQueries(0):
+            leaderboard.get_top_posts()
+
+    def test_vote_below_cutoff_keeps_cache(self):
+        for post in self.others[:5]:
+            self.vote(post, self.user)
+        leaderboard.get_top_posts()
+
+        # self.post is off the board and a downvote cannot lift it onto it
+        self.vote(self.post, self.user2, is_upvote=False)
+        self.assertIsNotNone(cache.get(leaderboard.CACHE_KEY))
+
+    def test_vote_crossing_cutoff_invalidates(self):
+        for post in self.others[:5]:
+            self.vote(post, self.user)
+        leaderboard.get_top_posts()
+
+        self.vote(self.post, self.user)
+        self.vote(self.post, self.user2)
+        self.assertEqual(leaderboard.get_top_posts()[0]["id"], self.post.id)
+
+    def test_deleting_voter_reranks_cached_board(self):
+        voter = User.objects.create_user(username="leaving", password="123")
+        for post in self.others[:5]:
+            self.vote(post, self.user)
+        self.vote(self.others[5], self.user)
+        self.vote(self.others[5], voter)
+        self.assertEqual(leaderboard.get_top_posts()[0]["id"], self.others[5].id)
+
+        # Cascade: vote-nya hilang, skor turun, board yang di-cache harus dibuang
+        with self.captureOnCommitCallbacks(execute=True):
+            voter.delete()
+        self.assertIsNone(cache.get(leaderboard.CACHE_KEY))
+        self.assertEqual(leaderboard.get_top_posts()[0]["score"], 1)
+
+    def test_deleting_author_drops_post_from_board(self):
+        author = User.objects.create_user(username="author", password="123")
+        post = Post.objects.create(author=author, title="Gone", content="x")
+        self.vote(post, self.user)
+        self.vote(post, self.user2)
+        self.assertEqual(leaderboard.get_top_posts()[0]["id"], post.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            author.delete()
+        self.assertNotIn(post.id, [p["id"] for p in leaderboard.get_top_posts()])
+
+
+class StubImageServer(ThreadingHTTPServer):
+    """Local upstream for the proxy tests: FILES, REDIRECTS (302), anything else 404."""
+    FILES = {
+        '/a.png': ('image/png', b'\x89PNG' + b'a' * 4000),
+        '/b.png': ('image/png', b'\x89PNG' + b'b' * 4000),
+        '/big.png': ('image/png', b'\x89PNG' + b'x' * 20000),
+        '/page.html': ('text/html', b'<html></html>'),
+    }
+    REDIRECTS = {
+        '/moved.png': '/a.png',
+        '/metadata.png': 'http://localhost:1/latest/meta-data/',
+    }
+
+    def __init__(self):
+        self.hits = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                self.hits.append(handler.path)
+                if handler.path in self.REDIRECTS:
+                    handler.send_response(302)
+                    handler.send_header('Location', self.REDIRECTS[handler.path])
+                    handler.end_headers()
+                    return
+                if handler.path not in self.FILES:
+                    handler.send_error(404)
+                    return
+                content_type, body = self.FILES[handler.path]
+                handler.send_response(200)
+                handler.send_header('Content-Type', content_type)
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+
+
+class ImageProxyTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        settings = override_settings(
+            IMAGE_PROXY_DIR=self.dir, IMAGE_PROXY_ALLOW_PRIVATE=True,
+            IMAGE_PROXY_MAX_BYTES=10000, IMAGE_PROXY_CACHE_BYTES=1000000,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.server = StubImageServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+
+    def get(self, path, **headers):
+        response = self.client.get(reverse('forum:proxy_image'), {'url': self.base + path}, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_streams_once_then_serves_from_disk_with_etag(self):
+        response, body = self.get('/a.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(body, StubImageServer.FILES['/a.png'][1])
+
+        response, body = self.get('/a.png')
+        self.assertEqual(body, StubImageServer.FILES['/a.png'][1])
+        self.assertIn('max-age', response['Cache-Control'])
+        etag = response['ETag']
+
+        response, _ = self.get('/a.png', if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.server.hits, ['/a.png'])
+
+    def test_failures_are_negatively_cached(self):
+        for path in ('/missing.png', '/page.html', '/big.png'):
+            self.assertEqual(self.get(path)[0].status_code, 502)
+            self.assertEqual(self.get(path)[0].status_code, 502)
+        self.assertEqual(self.server.hits, ['/missing.png', '/page.html', '/big.png'])
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'urls')))
+
+    def test_least_recently_used_blob_is_evicted(self):
+        self.get('/a.png')
+        self.get('/b.png')
+        a = image_proxy.lookup(self.base + '/a.png')[1]
+        os.utime(a, (0, 0))
+        image_proxy.evict(limit=5000)
+        self.assertIsNone(image_proxy.lookup(self.base + '/a.png'))
+        self.assertIsNotNone(image_proxy.lookup(self.base + '/b.png'))
+
+    def test_private_hosts_and_other_schemes_are_refused(self):
+        with override_settings(IMAGE_PROXY_ALLOW_PRIVATE=False):
+            self.assertEqual(self.get('/a.png')[0].status_code, 403)
+        response = self.client.get(reverse('forum:proxy_image'), {'url': 'file:///etc/passwd'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.server.hits, [])
+
+    def test_redirects_are_checked_hop_by_hop(self):
+        checked = []
+
+        def check(url):
+            # Stub-nya sendiri dianggap publik; "localhost" berperan sebagai alamat internal
+            checked.append(url)
+            if urlparse(url).hostname == 'localhost':
+                raise image_proxy.BlockedHost('Refusing to proxy a private address')
+
+        with mock.patch.object(image_proxy, 'check_url', side_effect=check):
+            response, body = self.get('/moved.png')
+            self.assertEqual(body, StubImageServer.FILES['/a.png'][1])
+            self.assertEqual(self.get('/metadata.png')[0].status_code, 403)
+        self.assertEqual(checked[-1], 'http://localhost:1/latest/meta-data/')
+        self.assertEqual(self.server.hits, ['/moved.png', '/a.png', '/metadata.png'])
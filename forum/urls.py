@@ -8,6 +8,8 @@ from forum.views import (
     show_json,
     show_xml_by_id,
     show_json_by_id,
+    show_feed_json,
+    get_replies_feed,
     add_reply,
     get_replies,
     toggle_vote,
@@ -55,6 +57,10 @@ urlpatterns = [
     path('json/', show_json, name='show_json'),
     path('xml/', show_xml, name='show_xml'),
 
+    # Cursor-paginated feed
+    path('feed/', show_feed_json, name='show_feed_json'),
+    path('feed/<int:post_id>/replies/', get_replies_feed, name='get_replies_feed'),
+
     # Django Replies CRUD
     path('add-reply/<int:post_id>/', add_reply, name='add_reply'),
     path('get-replies/<int:post_id>/', get_replies, name='get_replies'),
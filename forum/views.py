@@ -1,17 +1,21 @@
 from django.http import HttpResponse
 from django.http import JsonResponse
+from django.http import StreamingHttpResponse
 from django.db.models import Count, Q
 from django.db.models import F
 from django.db.models import Prefetch
+from django.db import transaction
 from forum.models import Reply, Post, UpVote
+from forum import image_proxy, leaderboard
+from the_rink.cache import cache_view
+from forum.pagination import InvalidCursor, get_page_size, keyset_queryset, stream_page
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 from django.utils.html import strip_tags
 from django.core import serializers
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils.timezone import localtime
-import requests
 import json
 from functools import wraps
 
@@ -23,18 +27,25 @@ def login_required_json(view_func):
         return view_func(request, *args, **kwargs)
     return _wrapped
 
+def _apply_vote(vote_filter, user, session_key, is_upvote):
+    # UpVote.save() and the post_delete signal move the target's counters with F() updates
+    owner = {"user": user} if user else {"session_key": session_key}
+    with transaction.atomic():
+        vote, created = UpVote.objects.get_or_create(
+            **owner, **vote_filter, defaults={"is_upvote": is_upvote}
+        )
+        if created:
+            return
+        if vote.is_upvote == is_upvote:
+            vote.delete()
+        else:
+            vote.is_upvote = is_upvote
+            vote.save(update_fields=["is_upvote"])
+
 def show_forum(request):
     posts = Post.objects.order_by("-created_at", "-id")
 
-    top_posts = (
-        Post.objects
-        .annotate(
-            total_up=Count('upvotes', filter=Q(upvotes__is_upvote=True)),
-            total_down=Count('upvotes', filter=Q(upvotes__is_upvote=False))
-        )
-        .annotate(score=F('total_up') - F('total_down'))
-        .order_by('-score', '-total_up', '-total_down', '-created_at', '-id')[:5]
-    )
+    top_posts = leaderboard.get_top_posts(5)
 
     return render(request, "home.html", {"posts": posts, "top_posts": top_posts})
 
@@ -123,17 +134,16 @@ def show_xml(request):
     return HttpResponse(xml_data, content_type="application/xml")
 
 
+@cache_view('forum')
 def show_json(request):
     post_list = (
         Post.objects
         .select_related('author')
         .prefetch_related(
-            'upvotes', 
             Prefetch(
                 'replies',
                 queryset=Reply.objects
                     .select_related('author')
-                    .prefetch_related('upvotes') 
                     .order_by('created_at', 'id')
             )
         )
@@ -172,6 +182,67 @@ def show_json(request):
 
     return JsonResponse(data, safe=False)
 
+def _serialize_feed_post(post):
+    return {
+        "id": post.id,
+        "author": post.author.username if post.author else None,
+        "title": post.title,
+        "content": post.content,
+        "created_at": localtime(post.created_at).isoformat(),
+        "updated_at": localtime(post.updated_at).isoformat(),
+        "thumbnail_url": post.thumbnail_url,
+        "user_id": post.author_id,
+        "upvotes_count": post.upvote_count,
+        "downvotes_count": post.downvote_count,
+        "replies_count": post.num_replies,
+    }
+
+def _serialize_feed_reply(reply):
+    return {
+        "id": reply.id,
+        "author": reply.author.username,
+        "author_id": reply.author_id,
+        "post_id": reply.post_id,
+        "content": reply.content,
+        "created_at": localtime(reply.created_at).isoformat(),
+        "updated_at": localtime(reply.updated_at).isoformat(),
+        "upvotes_count": reply.upvote_count,
+        "downvotes_count": reply.downvote_count,
+    }
+
+# Cursor-paginated post feed, newest first. Replies load via get_replies_feed.
+def show_feed_json(request):
+    posts = (
+        Post.objects
+        .select_related('author')
+        .annotate(num_replies=Count('replies'))
+    )
+    if request.GET.get('mine') and request.user.is_authenticated:
+        posts = posts.filter(author=request.user)
+    query = request.GET.get('q', '').strip()
+    if query:
+        posts = posts.filter(title__icontains=query)
+
+    try:
+        posts = keyset_queryset(posts, request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    page = stream_page(posts, get_page_size(request), _serialize_feed_post)
+    return StreamingHttpResponse(page, content_type="application/json")
+
+# Cursor-paginated replies of one post, oldest first.
+def get_replies_feed(request, post_id):
+    replies = Reply.objects.filter(post_id=post_id).select_related('author')
+
+    try:
+        replies = keyset_queryset(replies, request.GET.get('cursor'), descending=False)
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    page = stream_page(replies, get_page_size(request), _serialize_feed_reply)
+    return StreamingHttpResponse(page, content_type="application/json")
+
 def show_json_by_id(request, post_id):
     try:
         post = Post.objects.select_related('author').get(pk=post_id)
@@ -219,12 +290,12 @@ def add_reply(request, post_id):
         })
     
 def get_replies(request, post_id):
-    replies = Reply.objects.filter(post_id=post_id).order_by("created_at")
+    replies = Reply.objects.filter(post_id=post_id).select_related("author").order_by("created_at")
     data = [{
         "id": r.id,
         "author": r.author.username,
-        "author_id": r.author.id, 
-        "post_id": r.post.id,  
+        "author_id": r.author_id,
+        "post_id": r.post_id,
         "content": r.content,
         "created_at": r.created_at.isoformat().replace("+00:00", "Z"),
         "upvotes_count": r.total_upvotes(),
@@ -297,20 +368,12 @@ def toggle_vote(request):
                 return JsonResponse({"error": "Invalid target type"}, status=400)
 
             # 🟩 Toggle logic
-            if user:
-                vote, created = UpVote.objects.get_or_create(user=user, **vote_filter)
-            else:
-                vote, created = UpVote.objects.get_or_create(session_key=session_key, **vote_filter)
-
-            if not created and vote.is_upvote == is_upvote:
-                vote.delete()
-            else:
-                vote.is_upvote = is_upvote
-                vote.save()
+            _apply_vote(vote_filter, user, session_key, is_upvote)
 
+            target.refresh_from_db(fields=["upvote_count", "downvote_count"])
             return JsonResponse({
-                "upvotes": UpVote.objects.filter(**vote_filter, is_upvote=True).count(),
-                "downvotes": UpVote.objects.filter(**vote_filter, is_upvote=False).count(),
+                "upvotes": target.upvote_count,
+                "downvotes": target.downvote_count,
             })
 
         except Exception as e:
@@ -320,26 +383,19 @@ def toggle_vote(request):
     return JsonResponse({"error": "Invalid request"}, status=400)
 
 def get_top_posts_json(request):
-    posts = (
-        Post.objects
-        .annotate(
-            total_up=Count('upvotes', filter=Q(upvotes__is_upvote=True)),
-            total_down=Count('upvotes', filter=Q(upvotes__is_upvote=False))
-        )
-        .annotate(score=F('total_up') - F('total_down'))
-        .order_by('-score', '-total_up', '-total_down', '-created_at', '-id')[:3]
-    )
+    posts = leaderboard.get_top_posts(3)
+    reply_counts = leaderboard.get_reply_counts(posts)
 
     data = [
         {
-            "id": p.id,
-            "title": p.title,
-            "content": strip_tags(p.content)[:120],
-            "total_up": p.total_up,
-            "total_down": p.total_down,
-            "replies": p.replies.count(),
-            "thumbnail_url": p.thumbnail_url,
-            "created_at": localtime(p.created_at).isoformat() if p.created_at else None,
+            "id": p["id"],
+            "title": p["title"],
+            "content": strip_tags(p["content"])[:120],
+            "total_up": p["upvote_count"],
+            "total_down": p["downvote_count"],
+            "replies": reply_counts.get(p["id"], 0),
+            "thumbnail_url": p["thumbnail_url"],
+            "created_at": localtime(p["created_at"]).isoformat() if p["created_at"] else None,
         }
         for p in posts
     ]
@@ -348,7 +404,12 @@ def get_top_posts_json(request):
 
 def get_post_detail(request, post_id):
     try:
-        post = Post.objects.select_related("author").get(pk=post_id)
+        post = (
+            Post.objects
+            .select_related("author")
+            .annotate(num_replies=Count("replies"))
+            .get(pk=post_id)
+        )
         data = {
             "id": post.id,
             "title": post.title,
@@ -359,7 +420,7 @@ def get_post_detail(request, post_id):
             "user_id": post.author.id if post.author else None,
             "upvotes_count": post.total_upvotes(),
             "downvotes_count": post.total_downvotes(),
-            "replies_count": post.replies.count(),
+            "replies_count": post.num_replies,
         }
         return JsonResponse(data)
     except Post.DoesNotExist:
@@ -436,24 +497,17 @@ def admin_reply_delete(request, id):
         return redirect('forum:admin_reply_list')
     return render(request, 'forum/admin_reply_confirm_delete.html', {'reply': reply})
 
+@require_GET
 def proxy_image(request):
     image_url = request.GET.get('url')
     if not image_url:
         return HttpResponse('No URL provided', status=400)
-    
     try:
-        # Fetch image from external source
-        response = requests.get(image_url, timeout=10)
-        response.raise_for_status()
-        
-        # Return the image with proper content type
-        return HttpResponse(
-            response.content,
-            content_type=response.headers.get('Content-Type', 'image/jpeg')
-        )
-    except requests.RequestException as e:
-        return HttpResponse(f'Error fetching image: {str(e)}', status=500)
-    
+        # Disk cache + streaming, lihat forum.image_proxy
+        return image_proxy.serve(request, image_url)
+    except image_proxy.ProxyError as e:
+        return HttpResponse(str(e), status=e.status)
+
 @csrf_exempt
 @login_required_json
 def add_post_flutter(request):
@@ -634,20 +688,12 @@ def toggle_vote_flutter(request):
                 return JsonResponse({"error": "Invalid target type"}, status=400)
 
             # 🟩 Toggle logic
-            if user:
-                vote, created = UpVote.objects.get_or_create(user=user, **vote_filter)
-            else:
-                vote, created = UpVote.objects.get_or_create(session_key=session_key, **vote_filter)
-
-            if not created and vote.is_upvote == is_upvote:
-                vote.delete()
-            else:
-                vote.is_upvote = is_upvote
-                vote.save()
+            _apply_vote(vote_filter, user, session_key, is_upvote)
 
+            target.refresh_from_db(fields=["upvote_count", "downvote_count"])
             return JsonResponse({
-                "upvotes": UpVote.objects.filter(**vote_filter, is_upvote=True).count(),
-                "downvotes": UpVote.objects.filter(**vote_filter, is_upvote=False).count(),
+                "upvotes": target.upvote_count,
+                "downvotes": target.downvote_count,
             })
 
         except Exception as e:
@@ -657,25 +703,20 @@ def toggle_vote_flutter(request):
     return JsonResponse({"error": "Invalid request"}, status=400)
 
 def get_top_posts_json_flutter(request):
+    top_ids = [p["id"] for p in leaderboard.get_top_posts(5)]
     posts = (
         Post.objects
+        .filter(id__in=top_ids)
         .select_related('author')
         .prefetch_related(
-            'upvotes',
             Prefetch(
                 'replies',
                 queryset=Reply.objects
                     .select_related('author')
-                    .prefetch_related('upvotes')
                     .order_by('created_at', 'id')
             )
         )
-        .annotate(
-            total_up=Count('upvotes', filter=Q(upvotes__is_upvote=True), distinct=True),
-            total_down=Count('upvotes', filter=Q(upvotes__is_upvote=False), distinct=True),
-        )
-        .annotate(score=F('total_up') - F('total_down'))
-        .order_by('-score', '-total_up', '-total_down', '-created_at', '-id')[:5]
+        .order_by(*leaderboard.RANK_ORDERING)
     )
 
     data = []
@@ -702,8 +743,8 @@ def get_top_posts_json_flutter(request):
             "updated_at": localtime(post.updated_at).isoformat(),
             "thumbnail_url": post.thumbnail_url or "",
             "user_id": post.author.id if post.author else None,
-            "upvotes_count": int(getattr(post, "total_up", 0)),
-            "downvotes_count": int(getattr(post, "total_down", 0)),
+            "upvotes_count": post.upvote_count,
+            "downvotes_count": post.downvote_count,
 
             "replies": replies_data,
             "replies_count": len(replies_data),
@@ -713,7 +754,12 @@ def get_top_posts_json_flutter(request):
 
 def get_post_detail_flutter(request, post_id):
     try:
-        post = Post.objects.select_related("author").get(pk=post_id)
+        post = (
+            Post.objects
+            .select_related("author")
+            .annotate(num_replies=Count("replies"))
+            .get(pk=post_id)
+        )
         data = {
             "id": post.id,
             "title": post.title,
@@ -724,7 +770,7 @@ def get_post_detail_flutter(request, post_id):
             "user_id": post.author.id if post.author else None,
             "upvotes_count": post.total_upvotes(),
             "downvotes_count": post.total_downvotes(),
-            "replies_count": post.replies.count(),
+            "replies_count": post.num_replies,
         }
         return JsonResponse(data)
     except Post.DoesNotExist:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Gear, CartItem, Rental, RentalItem
+from .models import Gear, CartItem, GearDayUsage, GearReservation, Rental, RentalItem
 
 @admin.register(Gear)
 class GearAdmin(admin.ModelAdmin):
@@ -11,10 +11,19 @@ class GearAdmin(admin.ModelAdmin):
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('user', 'gear', 'quantity')
 
+@admin.register(GearReservation)
+class GearReservationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'gear', 'quantity', 'start_date', 'end_date', 'expires_at')
+
+@admin.register(GearDayUsage)
+class GearDayUsageAdmin(admin.ModelAdmin):
+    list_display = ('gear', 'date', 'units')
+    list_filter = ('date',)
+
 @admin.register(Rental)
 class RentalAdmin(admin.ModelAdmin):
     list_display = ('customer_name', 'user', 'rental_date', 'return_date', 'total_cost')
 
 @admin.register(RentalItem)
 class RentalItemAdmin(admin.ModelAdmin):
-    list_display = ('rental', 'gear_name', 'quantity', 'price_per_day_at_checkout')
+    list_display = ('rental', 'gear_name', 'quantity', 'start_date', 'end_date', 'price_per_day_at_checkout')
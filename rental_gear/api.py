@@ -0,0 +1,132 @@
+"""Helpers for the Flutter gear catalog API.
+
+The catalog has a version counter (CatalogVersion) that goes up whenever a
+gear is saved or deleted. get_gears_json derives its ETag/Last-Modified
+from it, so a client asking again for an unchanged catalog gets a 304
+after one tiny query and no serialization at all.
+
+Listing pages are built with ``.values()`` on just the requested fields
+(``?fields=id,name,price_per_day``); the seller columns come from a join,
+never from a query per gear.
+"""
+import base64
+import binascii
+import hashlib
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from the_rink.thumbnails import thumbnail_url
+
+from .models import CatalogVersion
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Nama field di API -> lookup di database
+FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'category': 'category',
+    'price_per_day': 'price_per_day',
+    'stock': 'stock',
+    'description': 'description',
+    'image_url': 'image_url',
+    'thumbnail_url': 'image',
+    'seller_id': 'seller_id',
+    'seller_username': 'seller__username',
+    'is_featured': 'is_featured',
+}
+
+
+class InvalidParameter(ValueError):
+    pass
+
+
+def bump_catalog_version():
+    now = timezone.now()
+    with transaction.atomic():
+        if not CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1, updated_at=now):
+            CatalogVersion.objects.get_or_create(pk=1, defaults={'version': 1, 'updated_at': now})
+
+
+def catalog_version():
+    """Return ``(version, updated_at)``; ``(0, None)`` before the first change."""
+    return CatalogVersion.objects.filter(pk=1).values_list('version', 'updated_at').first() or (0, None)
+
+
+def request_catalog_version(request):
+    # Dipanggil oleh etag_func dan last_modified_func; cukup satu query per request
+    if not hasattr(request, '_catalog_version'):
+        request._catalog_version = catalog_version()
+    return request._catalog_version
+
+
+def catalog_etag(request):
+    version, _ = request_catalog_version(request)
+    params = hashlib.md5(repr(sorted(request.GET.lists())).encode()).hexdigest()[:12]
+    return f'gears-{version}-{params}'
+
+
+def catalog_last_modified(request):
+    return request_catalog_version(request)[1]
+
+
+def parse_fields(value):
+    if not value:
+        return list(FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise InvalidParameter(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def parse_int(request, name, default, minimum=0, maximum=None):
+    try:
+        value = int(request.GET.get(name, default))
+    except (TypeError, ValueError):
+        raise InvalidParameter(f'{name} must be an integer')
+    value = max(minimum, value)
+    return min(value, maximum) if maximum is not None else value
+
+
+def encode_cursor(pk):
+    return base64.urlsafe_b64encode(f'gear|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        kind, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        if kind != 'gear':
+            raise InvalidParameter('Invalid cursor')
+        return int(pk)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise InvalidParameter('Invalid cursor')
+
+
+def _clean(name, value):
+    # Tipe data sama persis dengan respons lama
+    if name == 'price_per_day':
+        return float(value)
+    if name in ('description', 'image_url'):
+        return value or ''
+    if name == 'thumbnail_url':
+        return thumbnail_url(value, 'list')
+    return value
+
+
+def gear_rows(queryset, fields):
+    """Serialize ``queryset`` with ``.values()`` on just ``fields``."""
+    lookups = [FIELDS[name] for name in fields]
+    return [
+        {name: _clean(name, row[lookup]) for name, lookup in zip(fields, lookups)}
+        for row in queryset.values(*lookups)
+    ]
+
+
+def project(data, fields):
+    return {name: data[name] for name in fields}
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RentalGearConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rental_gear'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,6 +1,5 @@
-from .models import CartItem
+from authentication.user_context import for_request
 
 def cart_count(request):
-    if request.user.is_authenticated:
-        return {'cart_count': CartItem.objects.filter(user=request.user).count()}
-    return {'cart_count': 0}
+    # Ikut query user (authentication.user_context), bukan COUNT sendiri
+    return {'cart_count': for_request(request).cart_count}
@@ -0,0 +1,271 @@
+"""Gear dataset importer (`manage.py import_gear`).
+
+Reads every CSV under ``Dataset/`` (or the files/directories given) and
+inserts the gear in batches with ``bulk_create``. For every batch the
+product images are fetched by a bounded thread pool while nothing else
+waits on the network one row at a time; the bytes are stored once per
+content hash (``gear_images/ab/abcdef....jpg``), so the same picture used by
+fifty products is written once and shared. Thumbnails of the stored
+images are queued for the background pool in the_rink.thumbnails.
+
+Where images come from is pluggable: the real URLs over HTTP, a stub
+server (``--images-from http://localhost:8001``) or a local directory
+holding the files by name (``--images-from ./mirror``), so an import can
+run fully offline.
+
+Every batch is inserted, put in the search index and recorded in the
+checkpoint (ImportCheckpoint: rows done per file) in one transaction, so an
+interrupted import started again with the same checkpoint continues after
+the last committed batch and never inserts a batch twice.
+"""
+import csv
+import hashlib
+import os
+import re
+import threading
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from the_rink import thumbnails
+
+from .models import Gear, ImportCheckpoint
+from .search import index_gears
+
+IMAGE_DIR = 'gear_images'
+# Kurs dan aturan harga sama dengan scripts lama: harga USD -> IDR, sewa per hari = harga / 30
+USD_TO_IDR = Decimal('15500')
+RENTAL_DAYS = Decimal('30')
+DEFAULT_STOCK = 3
+DEFAULT_SELLER = 'default_seller'
+
+FOLDER_CATEGORIES = {'hockey': 'hockey', 'curling': 'curling'}
+KEYWORD_CATEGORIES = [
+    ('ice_skating', ('skate', 'boot')),
+    ('apparel', ('pant', 'dress', 'skirt', 'legging', 'tight', 'jacket')),
+    ('protective_gear', ('protect', 'pad', 'guard')),
+]
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG', 'png'),
+    (b'GIF8', 'gif'),
+]
+
+
+def clean_price(value):
+    if not value or str(value).strip().lower() in ('n/a', '-', ''):
+        return Decimal('0')
+    s = re.sub(r'[^\d,.]', '', str(value))
+    # Koma sebagai desimal ("12,50"), atau titik ribuan yang lebih dari satu
+    if ',' in s and '.' not in s:
+        s = s.replace(',', '.')
+    s = s.replace(',', '')
+    if s.count('.') > 1:
+        head, _, tail = s.rpartition('.')
+        s = head.replace('.', '') + '.' + tail
+    try:
+        return Decimal(s)
+    except InvalidOperation:
+        return Decimal('0')
+
+
+def category_for(path, name):
+    folder = Path(path).parent.name.lower()
+    if folder in FOLDER_CATEGORIES:
+        return FOLDER_CATEGORIES[folder]
+    lowered = name.lower()
+    for category, words in KEYWORD_CATEGORIES:
+        if any(word in lowered for word in words):
+            return category
+    return 'accessories'
+
+
+def gear_fields(path, row, category=None):
+    """Turn one dataset row into Gear field values, or None when it has no name."""
+    name = ' '.join(part for part in ((row.get('Brand') or '').strip(), (row.get('Name') or '').strip()) if part)
+    if not name:
+        return None
+    if len(name) > 100:
+        name = name[:97] + '...'
+    daily = (clean_price(row.get('Price')) * USD_TO_IDR / RENTAL_DAYS).quantize(Decimal('0'))
+    return {
+        'name': name,
+        'category': category or category_for(path, name),
+        'price_per_day': daily,
+        'stock': DEFAULT_STOCK,
+        'image_url': (row.get('Image_URL') or row.get('Image') or '').strip() or None,
+    }
+
+
+def dataset_files(paths):
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.rglob('*.csv')) if path.is_dir() else [path])
+    return files
+
+
+# --- Gambar -----------------------------------------------------------------
+
+class HttpFetcher:
+    """Downloads image URLs; with ``base_url`` the host is swapped (stub server)."""
+
+    def __init__(self, base_url=None, timeout=15):
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def __call__(self, url):
+        if self.base_url:
+            url = self.base_url + urlparse(url).path
+        # Satu Session per thread: keep-alive tanpa berbagi Session antar thread
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        response = session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+
+class DirectoryFetcher:
+    """Reads ``<root>/<file name of the URL>``, for offline imports."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def __call__(self, url):
+        return (self.root / os.path.basename(urlparse(url).path)).read_bytes()
+
+
+def make_fetcher(source=None):
+    if not source or source.startswith(('http://', 'https://')):
+        return HttpFetcher(source)
+    return DirectoryFetcher(source)
+
+
+def image_extension(content, url=''):
+    for signature, extension in SIGNATURES:
+        if content.startswith(signature):
+            return extension
+    if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
+        return 'webp'
+    extension = os.path.splitext(urlparse(url).path)[1].lstrip('.').lower()
+    return extension if extension in ('jpg', 'jpeg', 'png', 'gif', 'webp') else 'jpg'
+
+
+def store_image(content, url=''):
+    """Save ``content`` under its SHA-256 name and return the storage path (existing files are reused)."""
+    digest = hashlib.sha256(content).hexdigest()
+    path = f'{IMAGE_DIR}/{digest[:2]}/{digest}.{image_extension(content, url)}'
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(content))
+    return path
+
+
+class ImageStats:
+    def __init__(self):
+        self.fetched = self.stored = self.reused = self.failed = 0
+        self.paths = set()
+        self.lock = threading.Lock()
+
+
+def fetch_images(urls, fetcher, pool, stats):
+    """Fetch and store every URL in ``urls`` through ``pool``. Returns ``{url: storage path}``."""
+
+    def fetch(url):
+        try:
+            content = fetcher(url)
+        except Exception:
+            with stats.lock:
+                stats.failed += 1
+            return url, None
+        with stats.lock:
+            # Di dalam lock: dua URL dengan isi sama jangan sampai nulis file dua kali
+            path = store_image(content, url)
+            stats.fetched += 1
+            if path in stats.paths:
+                stats.reused += 1
+            else:
+                stats.paths.add(path)
+                stats.stored += 1
+        return url, path
+
+    return {url: path for url, path in pool.map(fetch, set(urls)) if path}
+
+
+# --- Checkpoint ---------------------------------------------------------------
+
+class Checkpoint:
+    """``{file: rows done}`` for one named import run, stored in ImportCheckpoint."""
+
+    def __init__(self, name):
+        self.name = name
+        self.done = dict(ImportCheckpoint.objects.filter(name=name).values_list('source', 'rows_done'))
+
+    def rows_done(self, key):
+        return self.done.get(key, 0)
+
+    def save(self, key, rows):
+        # Dipanggil di dalam transaksi batch-nya (import_batch)
+        ImportCheckpoint.objects.update_or_create(name=self.name, source=key, defaults={'rows_done': rows})
+        self.done[key] = rows
+
+    def clear(self):
+        ImportCheckpoint.objects.filter(name=self.name).delete()
+        self.done = {}
+
+
+# --- Import -------------------------------------------------------------------
+
+def default_seller():
+    seller, _ = User.objects.get_or_create(
+        username=DEFAULT_SELLER,
+        defaults={'email': 'seller@example.com', 'first_name': 'Default', 'last_name': 'Seller'},
+    )
+    return seller
+
+
+def read_batches(path, batch_size, skip=0):
+    """Yield ``(rows read so far, [row dicts])`` from one CSV, skipping the first ``skip`` rows."""
+    with open(path, newline='', encoding='utf-8') as f:
+        batch, read = [], 0
+        for row in csv.DictReader(f):
+            read += 1
+            if read <= skip:
+                continue
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield read, batch
+                batch = []
+        if batch:
+            yield read, batch
+
+
+def import_batch(path, rows, seller, category, fetcher, pool, stats, checkpoint=None, read=0):
+    """Insert one batch of rows. Returns the created Gear objects.
+
+    The rows, their search documents and ``checkpoint`` (``read`` rows done
+    for ``path``) are committed together.
+    """
+    fields = [f for f in (gear_fields(path, row, category) for row in rows) if f]
+    images = {}
+    if fetcher is not None:
+        # Gambar diambil sebelum transaksi dibuka: jangan tahan transaksi selama nunggu network
+        images = fetch_images([f['image_url'] for f in fields if f['image_url']], fetcher, pool, stats)
+    gears = [Gear(seller=seller, image=images.get(f['image_url']), **f) for f in fields]
+    with transaction.atomic():
+        created = Gear.objects.bulk_create(gears)
+        # bulk_create gak lewat signal: index search diisi manual
+        index_gears(gear.pk for gear in created)
+        if checkpoint is not None:
+            checkpoint.save(str(path), read)
+    # bulk_create gak lewat post_save: thumbnail-nya diantrikan di sini
+    if thumbnails.enabled():
+        for path in set(images.values()):
+            thumbnails.schedule(path, thumbnails.CONTENT_SIZES)
+    return created
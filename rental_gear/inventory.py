@@ -0,0 +1,115 @@
+"""Per-day gear inventory.
+
+``Gear.stock`` is how many units of a gear exist. A rental (or a checkout
+hold) occupies units for an inclusive date window, and GearDayUsage keeps
+how many units are in use on each day. Units free from D1 to D2 are
+therefore ``stock - max(units in use on any day in [D1, D2])``: one MAX
+aggregate over the overlapping days, for one gear or for a whole catalog
+page at once. Units come back on their own once the window is over.
+
+Usage only changes through conditional UPDATEs (``units <= stock - n``),
+so concurrent checkouts for the same days cannot overbook.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Gear, GearDayUsage, GearReservation, RentalItem
+
+
+def _date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def _peak_usage(start, end):
+    return Subquery(
+        GearDayUsage.objects.filter(gear=OuterRef('pk'), date__range=(start, end))
+        .order_by()
+        .values('gear')
+        .annotate(peak=Max('units'))
+        .values('peak'),
+        output_field=IntegerField(),
+    )
+
+
+def with_availability(queryset, start, end):
+    """Annotate a Gear queryset with ``available_units`` for [start, end]."""
+    return queryset.annotate(
+        available_units=Greatest(F('stock') - Coalesce(_peak_usage(start, end), Value(0)), Value(0))
+    )
+
+
+def available_units(gear_id, start, end):
+    """How many units of one gear are free on every day from ``start`` to ``end``."""
+    free = with_availability(Gear.objects.filter(pk=gear_id), start, end).values_list(
+        'available_units', flat=True
+    ).first()
+    return free or 0
+
+
+def available_units_bulk(gear_ids, start, end):
+    """Return ``{gear_id: free units}`` for many gears with a single query."""
+    return dict(
+        with_availability(Gear.objects.filter(pk__in=list(gear_ids)), start, end).values_list(
+            'id', 'available_units'
+        )
+    )
+
+
+def take_units(gear_id, start, end, quantity):
+    """Occupy ``quantity`` units on every day of [start, end]. Returns False (and changes nothing) if any day is full."""
+    days = list(_date_range(start, end))
+    stock = Gear.objects.filter(pk=gear_id).values_list('stock', flat=True).first()
+    if stock is None or quantity > stock:
+        return False
+    with transaction.atomic():
+        GearDayUsage.objects.bulk_create([GearDayUsage(gear_id=gear_id, date=day) for day in days], ignore_conflicts=True)
+        updated = GearDayUsage.objects.filter(
+            gear_id=gear_id, date__range=(start, end), units__lte=stock - quantity
+        ).update(units=F('units') + quantity)
+        if updated != len(days):
+            # Ada hari yang penuh: batalkan penambahan di hari-hari lain juga
+            transaction.set_rollback(True)
+            return False
+    return True
+
+
+def return_units(gear_id, start, end, quantity):
+    GearDayUsage.objects.filter(
+        gear_id=gear_id, date__range=(start, end), units__gte=quantity
+    ).update(units=F('units') - quantity)
+
+
+def rebuild_usage(since=None):
+    """Recompute GearDayUsage from rental items and checkout holds. Returns the row count.
+
+    Only days from ``since`` (default today) onwards are rebuilt; the past
+    never affects availability.
+    """
+    since = since or timezone.localdate()
+    units = defaultdict(int)
+    windows = list(
+        RentalItem.objects.filter(gear__isnull=False, end_date__gte=since).values_list(
+            'gear_id', 'start_date', 'end_date', 'quantity'
+        )
+    ) + list(
+        GearReservation.objects.filter(end_date__gte=since).values_list('gear_id', 'start_date', 'end_date', 'quantity')
+    )
+    for gear_id, start, end, quantity in windows:
+        for day in _date_range(max(start, since), end):
+            units[(gear_id, day)] += quantity
+
+    with transaction.atomic():
+        GearDayUsage.objects.filter(date__gte=since).delete()
+        GearDayUsage.objects.bulk_create(
+            [GearDayUsage(gear_id=gear_id, date=day, units=n) for (gear_id, day), n in units.items()],
+            batch_size=1000,
+        )
+    return len(units)
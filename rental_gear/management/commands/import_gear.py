@@ -1,74 +1,80 @@
-import csv
-import os
-from decimal import Decimal
-from urllib.parse import urlparse
-from urllib.request import urlretrieve
-from django.core.management.base import BaseCommand
-from django.core.files import File
-from rental_gear.models import Gear
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from django.conf import settings
-import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from rental_gear import importer, search
+from rental_gear.api import bump_catalog_version
+from rental_gear.models import Gear
+from rental_gear.signals import gear_delete_signals_muted
+from the_rink import cache as view_cache
+
 
 class Command(BaseCommand):
-    help = 'Import gear data from CSV files'
+    help = 'Import semua CSV gear di Dataset/ (batch bulk_create, gambar paralel, bisa di-resume)'
 
     def add_arguments(self, parser):
-        parser.add_argument('csv_file', type=str, help='The CSV file to import')
-        parser.add_argument('category', type=str, help='The category of gear (hockey, curling, ice_skating)')
+        parser.add_argument('paths', nargs='*', help='File CSV atau folder (default: Dataset/)')
+        parser.add_argument('--category', default=None,
+                            help='Paksa satu kategori (default: dari nama folder / nama produk)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=8, help='Jumlah thread download gambar')
+        parser.add_argument('--images-from', default=None,
+                            help='Folder lokal atau base URL stub server; default: URL asli')
+        parser.add_argument('--no-images', action='store_true', help='Simpan image_url saja, tanpa download')
+        parser.add_argument('--checkpoint', default='import_gear',
+                            help='Nama progress buat resume (tabel ImportCheckpoint); dihapus kalau import selesai')
+        parser.add_argument('--restart', action='store_true', help='Abaikan checkpoint yang ada')
+        parser.add_argument('--replace', action='store_true', help='Hapus semua gear dulu (seperti load_all_data lama)')
 
-    def handle(self, *args, **kwargs):
-        csv_file = kwargs['csv_file']
-        category = kwargs['category']
+    def handle(self, *args, **options):
+        if options['category'] and options['category'] not in dict(Gear.CATEGORY_CHOICES):
+            raise CommandError(f"Unknown category {options['category']!r}")
+        files = importer.dataset_files(options['paths'] or [settings.BASE_DIR / 'Dataset'])
+        if not files:
+            raise CommandError('No CSV files found')
 
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                # Convert price string to decimal and calculate daily rate
-                price_str = row['Price'].replace('$', '').replace(',', '')
-                try:
-                    price = Decimal(price_str)
-                    daily_rate = (price / Decimal('30')).quantize(Decimal('0.01'))  # Monthly price divided by 30
-                except:
-                    self.stdout.write(self.style.WARNING(f'Invalid price format for {row["Name"]}, skipping...'))
-                    continue
+        checkpoint = importer.Checkpoint(options['checkpoint'])
+        if options['restart'] or options['replace']:
+            checkpoint.clear()
+        if options['replace']:
+            # Tanpa signal per gear: index search dikosongkan sekali, katalog di-bump sekali
+            with transaction.atomic(), gear_delete_signals_muted():
+                Gear.objects.all().delete()
+                search.rebuild_index()
+                bump_catalog_version()
 
-                # Create gear name from brand and name
-                name = f"{row['Brand']} {row['Name']}"
-                if len(name) > 100:
-                    name = name[:97] + '...'
+        fetcher = None if options['no_images'] else importer.make_fetcher(options['images_from'])
+        stats = importer.ImageStats()
+        seller = importer.default_seller()
+        created = rows = 0
+        started = time.perf_counter()
 
-                # Create gear object
-                gear = Gear(
-                    name=name,
-                    category=category,
-                    price_per_day=daily_rate,
-                    size='Standard',  # Default size since not provided in CSV
-                    stock=5  # Default stock value
-                )
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for path in files:
+                key = str(path)
+                skip = checkpoint.rows_done(key)
+                if skip:
+                    self.stdout.write(f'{path}: resuming after row {skip}')
+                for read, batch in importer.read_batches(path, options['batch_size'], skip):
+                    # Gear, index search dan checkpoint di-commit bareng
+                    gears = importer.import_batch(
+                        path, batch, seller, options['category'], fetcher, pool, stats, checkpoint, read,
+                    )
+                    created += len(gears)
+                    rows += len(batch)
+                self.stdout.write(f'{path}: done ({created:,} gear so far)')
 
-                # Handle image download and save
-                image_url = row.get('Image_URL')
-                if image_url:
-                    try:
-                        # Get file name from URL
-                        img_temp = tempfile.NamedTemporaryFile(delete=True)
-                        img_temp.close()
-                        
-                        # Download the image
-                        filename = os.path.basename(urlparse(image_url).path)
-                        if not filename.endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                            filename += '.jpg'
-                        
-                        urlretrieve(image_url, img_temp.name)
-                        
-                        # Save the image
-                        with open(img_temp.name, 'rb') as img_file:
-                            gear.image.save(filename, File(img_file), save=False)
-                    except Exception as e:
-                        self.stdout.write(self.style.WARNING(f'Failed to download image for {name}: {str(e)}'))
+        checkpoint.clear()
+        if created:
+            bump_catalog_version()
+            view_cache.bump('gear')
 
-                try:
-                    gear.save()
-                    self.stdout.write(self.style.SUCCESS(f'Successfully imported {name}'))
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'Failed to save {name}: {str(e)}'))
\ No newline at end of file
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows:,} rows, {created:,} gear created in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s); '
+            f'images: {stats.fetched:,} fetched, {stats.stored:,} stored, '
+            f'{stats.reused:,} deduplicated, {stats.failed:,} failed'
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from rental_gear.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang index full-text search gear (FTS5 di SQLite, tsvector di PostgreSQL)'
+
+    def handle(self, *args, **kwargs):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'{count} gear(s) indexed.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from rental_gear.inventory import rebuild_usage
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang GearDayUsage (unit terpakai per hari) dari RentalItem dan hold checkout'
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild_usage()
+        self.stdout.write(self.style.SUCCESS(f'{rows} gear-day row(s) rebuilt.'))
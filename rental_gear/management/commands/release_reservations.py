@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from rental_gear.services import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Balikin unit dari reservasi cart yang sudah expired (jalanin via cron)'
+
+    def handle(self, *args, **kwargs):
+        released = release_expired()
+        self.stdout.write(self.style.SUCCESS(f'{released} expired reservation(s) released.'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_gear', '0002_alter_gear_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['user', 'gear'], name='cartitem_user_gear_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gear',
+            index=models.Index(fields=['category'], name='gear_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gear',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['category'], name='gear_featured_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_gear', '0003_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GearReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('gear', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='rental_gear.gear')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gear_reservations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='reservation_expiry_idx')],
+                'unique_together': {('user', 'gear')},
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:19
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def release_old_holds(apps, schema_editor):
+    # Hold dari engine lama sudah mengurangi Gear.stock; balikin dulu karena stock
+    # sekarang artinya total unit. Checkout berikutnya bikin hold baru per tanggal.
+    Gear = apps.get_model('rental_gear', 'Gear')
+    GearReservation = apps.get_model('rental_gear', 'GearReservation')
+    for gear_id, quantity in GearReservation.objects.values_list('gear_id', 'quantity'):
+        Gear.objects.filter(pk=gear_id).update(stock=F('stock') + quantity)
+    GearReservation.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_gear', '0004_gear_reservation'),
+    ]
+
+    operations = [
+        migrations.RunPython(release_old_holds, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='cartitem',
+            name='start_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gearreservation',
+            name='end_date',
+            field=models.DateField(default=datetime.date.today),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='gearreservation',
+            name='start_date',
+            field=models.DateField(default=datetime.date.today),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='rentalitem',
+            name='end_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rentalitem',
+            name='gear',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rental_items', to='rental_gear.gear'),
+        ),
+        migrations.AddField(
+            model_name='rentalitem',
+            name='start_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='GearDayUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('gear', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='rental_gear.gear')),
+            ],
+            options={
+                'unique_together': {('gear', 'date')},
+            },
+        ),
+    ]
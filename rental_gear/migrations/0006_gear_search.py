@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    from rental_gear.search import BACKENDS
+
+    backend = BACKENDS.get(schema_editor.connection.vendor)
+    if backend is None:
+        return
+    backend = backend()
+    for sql in backend.create_sql:
+        schema_editor.execute(sql)
+
+    # Backfill pakai model historis, sama seperti search._documents
+    Gear = apps.get_model('rental_gear', 'Gear')
+    SellerProfile = apps.get_model('authentication', 'SellerProfile')
+    business = dict(SellerProfile.objects.exclude(business_name='').values_list('user_id', 'business_name'))
+    labels = {
+        'hockey': 'Hockey', 'curling': 'Curling', 'ice_skating': 'Ice Skating', 'apparel': 'Apparel',
+        'accessories': 'Accessories', 'protective_gear': 'Protective Gear', 'other': 'Other',
+    }
+    rows = Gear.objects.values_list('id', 'name', 'category', 'seller_id', 'seller__username', 'description')
+    documents = [
+        (pk, name, labels.get(category, category), business.get(seller_id) or username, description or '')
+        for pk, name, category, seller_id, username, description in rows.iterator(chunk_size=2000)
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        for start in range(0, len(documents), 1000):
+            backend.index(cursor, documents[start:start + 1000])
+
+
+def drop_search_table(apps, schema_editor):
+    from rental_gear.search import BACKENDS
+
+    backend = BACKENDS.get(schema_editor.connection.vendor)
+    if backend is None:
+        return
+    for sql in backend().drop_sql:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_gear', '0005_gear_inventory_calendar'),
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:16
+
+import the_rink.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_gear', '0007_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gear',
+            name='image',
+            field=the_rink.fields.HashedImageField(blank=True, null=True, upload_to='gear_images/'),
+        ),
+    ]
@@ -1,8 +1,13 @@
+import datetime
+
 from django.db import models
 
 # Create your models here.
 from django.db import models
 from django.contrib.auth.models import User 
+from django.utils import timezone
+
+from the_rink.fields import HashedImageField
 
 class Gear(models.Model):
     CATEGORY_CHOICES = [
@@ -17,26 +22,93 @@ class Gear(models.Model):
     name = models.CharField(max_length=100)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     price_per_day = models.DecimalField(max_digits=8, decimal_places=2)
-    image = models.ImageField(upload_to='gear_images/', blank=True, null=True)
+    image = HashedImageField(upload_to='gear_images/', blank=True, null=True)
     image_url = models.URLField(blank=True, null=True)
     description = models.TextField(blank=True)
+    # Jumlah unit yang dimiliki; berapa yang lagi dipakai per hari ada di GearDayUsage
     stock = models.PositiveIntegerField(default=1)
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='gears')
     is_featured = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['category'], name='gear_category_idx'),
+            # Partial index: gear featured biasanya cuma segelintir
+            models.Index(fields=['category'], condition=models.Q(is_featured=True), name='gear_featured_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class CatalogVersion(models.Model):
+    # Satu baris; naik tiap ada Gear yang berubah. Dipakai buat ETag/Last-Modified API katalog.
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"catalog v{self.version} ({self.updated_at:%Y-%m-%d %H:%M})"
+
+
+class ImportCheckpoint(models.Model):
+    # Progress `manage.py import_gear`: baris CSV yang sudah masuk per file. Ditulis di
+    # transaksi yang sama dengan batch gear-nya, jadi resume gak pernah mengimpor ulang satu batch.
+    name = models.CharField(max_length=100)
+    source = models.CharField(max_length=500)
+    rows_done = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('name', 'source')
+
+    def __str__(self):
+        return f"{self.name}: {self.source} ({self.rows_done} rows)"
+
+
 class CartItem(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     gear = models.ForeignKey(Gear, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     days = models.PositiveIntegerField(default=1)
+    start_date = models.DateField(null=True, blank=True)  # kosong = mulai hari checkout
+
+    class Meta:
+        indexes = [
+            # Cart per user + get_or_create(user, gear)
+            models.Index(fields=['user', 'gear'], name='cartitem_user_gear_idx'),
+        ]
 
     def get_total_price(self):
         return self.gear.price_per_day * self.quantity * self.days
 
+    def rental_window(self, today=None):
+        # (hari pertama, hari terakhir) inklusif; tanggal yang sudah lewat digeser ke hari ini
+        today = today or timezone.localdate()
+        start = max(self.start_date or today, today)
+        return start, start + datetime.timedelta(days=self.days - 1)
+
+
+class GearReservation(models.Model):
+    # Unit yang lagi "ditahan" buat cart user selama checkout, untuk rentang tanggal item-nya.
+    # GearDayUsage sudah ditambah waktu reservasi dibuat; kalau expired,
+    # rental_gear.services.release_expired balikin lagi.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='gear_reservations')
+    gear = models.ForeignKey(Gear, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    start_date = models.DateField()
+    end_date = models.DateField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'gear')
+        indexes = [
+            models.Index(fields=['expires_at'], name='reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} holds {self.quantity}x {self.gear.name} until {self.expires_at:%H:%M}"
+
 
 class Rental(models.Model):
     customer_name = models.CharField(max_length=100)
@@ -47,9 +119,27 @@ class Rental(models.Model):
 
 class RentalItem(models.Model): #Buat simpan detail gear yang di rental
     rental = models.ForeignKey(Rental, related_name='items', on_delete=models.CASCADE) 
+    gear = models.ForeignKey(Gear, on_delete=models.SET_NULL, null=True, blank=True, related_name='rental_items')
     gear_name = models.CharField(max_length=100) 
     quantity = models.PositiveIntegerField(default=1)
     price_per_day_at_checkout = models.DecimalField(max_digits=8, decimal_places=2)
+    # Unit dipakai dari start_date sampai end_date (inklusif). Kosong = rental lama sebelum ada kalender.
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
 
     def get_subtotal(self):
         return self.price_per_day_at_checkout * self.quantity
+
+
+class GearDayUsage(models.Model):
+    # Berapa unit gear yang lagi dipakai (rental + hold) di satu hari.
+    # Dijaga oleh rental_gear.inventory; `manage.py rebuild_gear_usage` kalau drift.
+    gear = models.ForeignKey(Gear, on_delete=models.CASCADE, related_name='usage')
+    date = models.DateField()
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('gear', 'date')
+
+    def __str__(self):
+        return f"{self.gear} on {self.date}: {self.units} in use"
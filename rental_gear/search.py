@@ -0,0 +1,282 @@
+"""Full-text search over the gear catalog.
+
+Every Gear has a search document made of its name, category, the seller's
+business name and its description (weighted in that order). On PostgreSQL
+the documents live in a tsvector table with a GIN index; in development
+(SQLite) they live in an FTS5 virtual table. Both tables are created by
+migration 0006, kept in sync by the signals in rental_gear/signals.py and
+can be rebuilt with `manage.py rebuild_gear_search`.
+
+search_gears() returns one page of hits ranked by relevance together with
+per-category facet counts, all from a single SQL statement. Every term is
+matched as a prefix ("hock" finds "hockey"); when nothing matches, terms
+are corrected against the index vocabulary once before giving up.
+"""
+import difflib
+import math
+import re
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+
+from .models import Gear
+
+PAGE_SIZE = 24
+MAX_TERMS = 8
+# Vocabulary di-cache sudah dikelompokkan per (huruf depan, panjang)
+VOCABULARY_CACHE_KEY = 'rental_gear:search_vocabulary_buckets'
+VOCABULARY_TTL = 10 * 60
+# Koreksi typo: paling banyak sekian kata per query, sekian kandidat per kata,
+# dan panjang kandidat paling jauh beda sekian huruf
+MAX_CORRECTED_WORDS = 3
+MAX_CANDIDATES = 200
+LENGTH_SLACK = 2
+
+SQLITE_TABLE = 'rental_gear_gear_fts'
+POSTGRES_TABLE = 'rental_gear_gear_search'
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def terms(query):
+    return _WORD.findall((query or '').lower())[:MAX_TERMS]
+
+
+class SearchPage:
+    def __init__(self, gears, total, facets, page, per_page, query='', corrected=None):
+        self.gears = gears
+        self.total = total
+        self.facets = facets
+        self.page = page
+        self.num_pages = max(1, math.ceil(total / per_page))
+        self.has_next = page < self.num_pages
+        self.query = query
+        self.corrected = corrected  # query setelah koreksi typo, None kalau gak dikoreksi
+
+
+class SqliteBackend:
+    create_sql = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5("
+        "name, category, seller, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE}_vocab USING fts5vocab({SQLITE_TABLE}, row)",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {SQLITE_TABLE}_vocab", f"DROP TABLE IF EXISTS {SQLITE_TABLE}"]
+
+    def remove(self, cursor, gear_ids):
+        cursor.execute(
+            f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(gear_ids))})", gear_ids
+        )
+
+    def index(self, cursor, documents):
+        self.remove(cursor, [doc[0] for doc in documents])
+        cursor.executemany(
+            f"INSERT INTO {SQLITE_TABLE} (rowid, name, category, seller, description) VALUES (%s, %s, %s, %s, %s)",
+            documents,
+        )
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {SQLITE_TABLE}")
+
+    def hits_sql(self, words):
+        # bm25: makin kecil makin relevan, dibalik supaya sama dengan ts_rank (makin besar makin relevan)
+        sql = (
+            f"SELECT g.id AS id, g.category AS category, -bm25({SQLITE_TABLE}, 10.0, 4.0, 2.0, 1.0) AS score "
+            f"FROM {SQLITE_TABLE} JOIN rental_gear_gear g ON g.id = {SQLITE_TABLE}.rowid "
+            f"WHERE {SQLITE_TABLE} MATCH %s"
+        )
+        return sql, [' '.join(f'"{word}"*' for word in words)]
+
+    def vocabulary(self, cursor):
+        cursor.execute(f"SELECT term FROM {SQLITE_TABLE}_vocab")
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresBackend:
+    create_sql = [
+        f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ("
+        "gear_id bigint PRIMARY KEY REFERENCES rental_gear_gear(id) ON DELETE CASCADE, "
+        "document tsvector NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_document_idx ON {POSTGRES_TABLE} USING GIN (document)",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {POSTGRES_TABLE}"]
+
+    def remove(self, cursor, gear_ids):
+        cursor.execute(f"DELETE FROM {POSTGRES_TABLE} WHERE gear_id = ANY(%s)", [list(gear_ids)])
+
+    def index(self, cursor, documents):
+        # Config 'simple': isi katalog campur Indonesia/Inggris, jadi tanpa stemming bahasa tertentu
+        cursor.executemany(
+            f"INSERT INTO {POSTGRES_TABLE} (gear_id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') || "
+            "setweight(to_tsvector('simple', %s), 'C') || setweight(to_tsvector('simple', %s), 'D')) "
+            "ON CONFLICT (gear_id) DO UPDATE SET document = EXCLUDED.document",
+            documents,
+        )
+
+    def clear(self, cursor):
+        cursor.execute(f"TRUNCATE {POSTGRES_TABLE}")
+
+    def hits_sql(self, words):
+        sql = (
+            "SELECT g.id AS id, g.category AS category, ts_rank(s.document, q) AS score "
+            f"FROM {POSTGRES_TABLE} s JOIN rental_gear_gear g ON g.id = s.gear_id, "
+            "to_tsquery('simple', %s) q WHERE s.document @@ q"
+        )
+        return sql, [' & '.join(f'{word}:*' for word in words)]
+
+    def vocabulary(self, cursor):
+        cursor.execute(f"SELECT word FROM ts_stat('SELECT document FROM {POSTGRES_TABLE}')")
+        return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {'sqlite': SqliteBackend, 'postgresql': PostgresBackend}
+
+
+def get_backend(conn=None):
+    backend = BACKENDS.get((conn or connection).vendor)
+    return backend() if backend else None
+
+
+def _documents(gear_ids):
+    labels = dict(Gear.CATEGORY_CHOICES)
+    rows = Gear.objects.filter(pk__in=gear_ids).values_list(
+        'id', 'name', 'category', 'seller__username', 'seller__sellerprofile__business_name', 'description'
+    )
+    return [
+        (pk, name, labels.get(category, category), business_name or username, description or '')
+        for pk, name, category, username, business_name, description in rows
+    ]
+
+
+def index_gears(gear_ids):
+    gear_ids = list(gear_ids)
+    backend = get_backend()
+    if backend is None or not gear_ids:
+        return
+    with connection.cursor() as cursor:
+        backend.index(cursor, _documents(gear_ids))
+
+
+def remove_gears(gear_ids):
+    gear_ids = list(gear_ids)
+    backend = get_backend()
+    if backend is None or not gear_ids:
+        return
+    with connection.cursor() as cursor:
+        backend.remove(cursor, gear_ids)
+
+
+def rebuild_index(chunk_size=1000):
+    """Re-index every gear. Returns the number of documents written."""
+    backend = get_backend()
+    if backend is None:
+        return 0
+    with connection.cursor() as cursor:
+        backend.clear(cursor)
+    ids = list(Gear.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), chunk_size):
+        index_gears(ids[start:start + chunk_size])
+    cache.delete(VOCABULARY_CACHE_KEY)
+    return len(ids)
+
+
+def _vocabulary(backend):
+    """Index terms bucketed by ``(first letter, length)``, cached."""
+    buckets = cache.get(VOCABULARY_CACHE_KEY)
+    if buckets is None:
+        with connection.cursor() as cursor:
+            vocabulary = backend.vocabulary(cursor)
+        buckets = defaultdict(set)
+        for term in vocabulary:
+            buckets[term[:1], len(term)].add(term)
+        buckets = {key: sorted(terms) for key, terms in buckets.items()}
+        cache.set(VOCABULARY_CACHE_KEY, buckets, VOCABULARY_TTL)
+    return buckets
+
+
+def _candidates(word, buckets):
+    # Kandidat cuma yang huruf depannya sama (typo di huruf pertama jarang) dan panjangnya mirip,
+    # yang panjangnya paling dekat duluan
+    lengths = sorted(range(len(word) - LENGTH_SLACK, len(word) + LENGTH_SLACK + 1), key=lambda n: abs(n - len(word)))
+    candidates = []
+    for length in lengths:
+        candidates += buckets.get((word[:1], length), ())
+        if len(candidates) >= MAX_CANDIDATES:
+            break
+    return candidates[:MAX_CANDIDATES]
+
+
+def correct(words, backend):
+    """Replace words that are not in the index with their closest indexed term."""
+    buckets = _vocabulary(backend)
+    corrected = []
+    remaining = MAX_CORRECTED_WORDS
+    for word in words:
+        if not remaining or word in buckets.get((word[:1], len(word)), ()):
+            corrected.append(word)
+            continue
+        remaining -= 1
+        match = difflib.get_close_matches(word, _candidates(word, buckets), n=1, cutoff=0.75)
+        corrected.append(match[0] if match else word)
+    return corrected
+
+
+def _run(backend, words, category, page, per_page):
+    hits_sql, params = backend.hits_sql(words)
+    # Facet dihitung dari semua hit (tanpa filter kategori), halaman hit difilter kategori
+    sql = (
+        f"WITH hits AS ({hits_sql}) "
+        "SELECT NULL, category, CAST(COUNT(*) AS REAL) FROM hits GROUP BY category "
+        "UNION ALL "
+        "SELECT * FROM (SELECT id, category, CAST(score AS REAL) FROM hits "
+        "WHERE %s = '' OR category = %s ORDER BY score DESC, id LIMIT %s OFFSET %s) page"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [category, category, per_page, (page - 1) * per_page])
+        rows = cursor.fetchall()
+    facets = {cat: int(n) for pk, cat, n in rows if pk is None}
+    ids = [pk for pk, _, _ in rows if pk is not None]
+    return facets, ids
+
+
+def _browse(category, page, per_page):
+    facets = dict(Gear.objects.order_by().values_list('category').annotate(n=Count('id')))
+    gears = Gear.objects.select_related('seller').order_by('id')
+    if category:
+        gears = gears.filter(category=category)
+    return facets, list(gears[(page - 1) * per_page:page * per_page])
+
+
+def search_gears(query='', category='', page=1, per_page=PAGE_SIZE):
+    """Return a SearchPage of gears matching ``query`` (all gears when empty)."""
+    page = max(1, int(page))
+    category = category or ''
+    words = terms(query)
+    backend = get_backend()
+    corrected = None
+
+    if not words:
+        facets, gears = _browse(category, page, per_page)
+    elif backend is None:
+        # Database lain: tanpa ranking, cukup cocokkan nama
+        qs = Gear.objects.all()
+        for word in words:
+            qs = qs.filter(name__icontains=word)
+        facets = dict(qs.order_by().values_list('category').annotate(n=Count('id')))
+        if category:
+            qs = qs.filter(category=category)
+        gears = list(qs.select_related('seller').order_by('id')[(page - 1) * per_page:page * per_page])
+    else:
+        facets, ids = _run(backend, words, category, page, per_page)
+        if not facets:
+            fixed = correct(words, backend)
+            if fixed != words:
+                facets, ids = _run(backend, fixed, category, page, per_page)
+                corrected = ' '.join(fixed)
+        found = Gear.objects.select_related('seller').in_bulk(ids)
+        gears = [found[pk] for pk in ids if pk in found]
+
+    total = facets.get(category, 0) if category else sum(facets.values())
+    return SearchPage(gears, total, facets, page, per_page, query=query, corrected=corrected)
@@ -0,0 +1,183 @@
+"""Checkout engine shared by checkout, checkout_ajax and checkout_flutter.
+
+Every cart item rents ``quantity`` units for its date window (see
+CartItem.rental_window). Units only move through rental_gear.inventory,
+whose conditional UPDATEs make sure two checkouts racing for the last units
+of the same days cannot both win. A checkout can hold units for a few
+minutes (GearReservation); the hold already took them, so checkout swaps
+it for the real rental inside the same transaction. Holds that expire are
+handed back by release_expired(), which every entry point calls first and
+`manage.py release_reservations` runs on a schedule.
+"""
+import datetime
+import time
+
+from django.db import OperationalError, transaction
+from django.utils import timezone
+
+from .inventory import return_units, take_units
+from .models import CartItem, GearReservation, Rental, RentalItem
+
+RESERVATION_TTL = datetime.timedelta(minutes=10)
+
+# Sama seperti booking: SQLite cuma satu writer, coba lagi sebentar kalau lagi di-lock
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05
+
+
+class CheckoutError(Exception):
+    status = 400
+
+
+class EmptyCart(CheckoutError):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    status = 409
+
+    def __init__(self, gear_names):
+        super().__init__(f"Insufficient stock for {', '.join(gear_names)}")
+        self.gear_names = gear_names
+
+
+def _retrying(func):
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return func()
+        except OperationalError:
+            if attempt == LOCK_RETRIES - 1:
+                raise CheckoutError("Checkout is busy, please try again.")
+            time.sleep(LOCK_BACKOFF * (attempt + 1))
+
+
+def _cart(user):
+    # Urut gear_id supaya dua checkout selalu nge-lock baris usage dengan urutan yang sama
+    return list(CartItem.objects.filter(user=user).select_related('gear').order_by('gear_id'))
+
+
+def release_expired(now=None):
+    """Give the units of every expired hold back. Returns how many holds were released."""
+    now = now or timezone.now()
+    released = 0
+    expired = GearReservation.objects.filter(expires_at__lte=now).values_list(
+        'id', 'gear_id', 'start_date', 'end_date', 'quantity'
+    )
+    for pk, gear_id, start, end, quantity in expired:
+        with transaction.atomic():
+            # Delete bersyarat: kalau checkout sudah memakai hold ini duluan, jangan balikin unit
+            if GearReservation.objects.filter(pk=pk, expires_at__lte=now).delete()[0]:
+                return_units(gear_id, start, end, quantity)
+                released += 1
+    return released
+
+
+def release_reservation(user, gear_id):
+    with transaction.atomic():
+        hold = GearReservation.objects.filter(user=user, gear_id=gear_id).first()
+        if hold and GearReservation.objects.filter(pk=hold.pk).delete()[0]:
+            return_units(gear_id, hold.start_date, hold.end_date, hold.quantity)
+
+
+def reserve_cart(user, now=None):
+    """Hold units for every cart item's window for RESERVATION_TTL.
+
+    Returns ``(expires_at, short)`` where ``short`` lists the gear names that
+    could not be (fully) held. Existing holds are resized and extended; a
+    hold for a window the item no longer has is given back first.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    expires_at = now + RESERVATION_TTL
+    release_expired(now)
+
+    def hold_all():
+        short = []
+        for item in _cart(user):
+            start, end = item.rental_window(today)
+            with transaction.atomic():
+                hold = GearReservation.objects.select_for_update().filter(user=user, gear=item.gear_id).first()
+                held = 0
+                if hold and (hold.start_date, hold.end_date) == (start, end):
+                    held = hold.quantity
+                elif hold:
+                    return_units(item.gear_id, hold.start_date, hold.end_date, hold.quantity)
+                delta = item.quantity - held
+                if delta > 0 and not take_units(item.gear_id, start, end, delta):
+                    short.append(item.gear.name)
+                    delta = 0
+                elif delta < 0:
+                    return_units(item.gear_id, start, end, -delta)
+                if not held + delta:
+                    if hold:
+                        hold.delete()
+                    continue
+                GearReservation.objects.update_or_create(
+                    user=user, gear_id=item.gear_id,
+                    defaults={'quantity': held + delta, 'start_date': start, 'end_date': end,
+                              'expires_at': expires_at},
+                )
+        return short
+
+    return expires_at, _retrying(hold_all)
+
+
+def checkout_cart(user, now=None):
+    """Turn ``user``'s cart into a Rental, all or nothing.
+
+    Raises EmptyCart for an empty cart and OutOfStock (nothing is
+    changed) when any item's window cannot be covered by its hold plus
+    free units.
+    Returns ``(rental, cart_items, rental_items)``; the cart items are
+    already deleted but keep their gear/days for building responses.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    release_expired(now)
+
+    def run():
+        with transaction.atomic():
+            items = _cart(user)
+            if not items:
+                raise EmptyCart("Cart is empty")
+
+            holds = {
+                hold.gear_id: hold
+                for hold in GearReservation.objects.filter(user=user, expires_at__gt=now)
+            }
+            windows = {item.pk: item.rental_window(today) for item in items}
+            short = []
+            for item in items:
+                hold = holds.get(item.gear_id)
+                if hold and GearReservation.objects.filter(pk=hold.pk, expires_at__gt=now).delete()[0]:
+                    # Hold dibalikin lalu diambil lagi untuk window item; masih satu transaksi,
+                    # jadi gak ada checkout lain yang bisa nyelip di antaranya
+                    return_units(item.gear_id, hold.start_date, hold.end_date, hold.quantity)
+                if not take_units(item.gear_id, *windows[item.pk], item.quantity):
+                    short.append(item.gear.name)
+            if short:
+                # Raise di dalam atomic = semua UPDATE usage di atas ikut di-rollback
+                raise OutOfStock(short)
+
+            rental = Rental.objects.create(
+                customer_name=user.username,
+                user=user,
+                return_date=max(end for _, end in windows.values()) + datetime.timedelta(days=1),
+                total_cost=sum(item.get_total_price() for item in items),
+            )
+            rental_items = RentalItem.objects.bulk_create([
+                RentalItem(
+                    rental=rental,
+                    gear=item.gear,
+                    gear_name=item.gear.name,
+                    quantity=item.quantity,
+                    price_per_day_at_checkout=item.gear.price_per_day,
+                    start_date=windows[item.pk][0],
+                    end_date=windows[item.pk][1],
+                )
+                for item in items
+            ])
+            CartItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+            return rental, items, rental_items
+
+    return _retrying(run)
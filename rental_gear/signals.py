@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentication.models import SellerProfile
+
+from . import api, search
+from .models import Gear
+
+
+# Signal (bukan override save/delete) supaya cascade dari hapus User juga ikut ke-handle
+
+@receiver(post_save, sender=Gear)
+def index_gear(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_gears([instance.pk])
+        api.bump_catalog_version()
+
+
+@receiver(post_delete, sender=Gear)
+def unindex_gear(sender, instance, **kwargs):
+    search.remove_gears([instance.pk])
+    api.bump_catalog_version()
+
+
+@receiver(post_save, sender=SellerProfile)
+def reindex_seller_gears(sender, instance, raw=False, **kwargs):
+    # Nama bisnis seller ikut masuk dokumen search
+    if not raw:
+        search.index_gears(Gear.objects.filter(seller_id=instance.user_id).values_list('id', flat=True))
+
+
+@contextmanager
+def gear_delete_signals_muted():
+    """Skip the per-gear search DELETE and catalog bump (``import_gear --replace``).
+
+    The caller clears the search index and bumps the catalog once itself.
+    Global: only for management commands, not inside a request.
+    """
+    post_delete.disconnect(unindex_gear, sender=Gear)
+    try:
+        yield
+    finally:
+        post_delete.connect(unindex_gear, sender=Gear)
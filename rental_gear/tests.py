@@ -1,11 +1,25 @@
-from django.test import TestCase, Client
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.core.management import call_command
+from django.db import connection
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils import timezone
-from .models import Gear, CartItem, Rental, RentalItem
+from django.core.cache import cache
+from django.contrib.messages import get_messages
+from .models import Gear, CartItem, GearDayUsage, GearReservation, ImportCheckpoint, Rental, RentalItem
+from . import importer, search
+from .inventory import available_units, available_units_bulk, rebuild_usage, take_units
+from .services import CheckoutError, OutOfStock, checkout_cart, release_expired, reserve_cart
 from .forms import GearForm, AddToCartForm, CheckoutForm
-from authentication.models import UserType
+from authentication.models import SellerProfile, UserType
 import json
 
 class GearModelTest(TestCase):
@@ -281,6 +295,28 @@ class ViewsTest(TestCase):
         self.assertTemplateUsed(response, 'checkout_success.html')
         self.assertFalse(CartItem.objects.filter(user=self.user).exists())
 
+    def test_checkout_page_does_not_hold_stock(self):
+        self.client.login(username='user', password='pass')
+        CartItem.objects.create(user=self.user, gear=self.gear, quantity=1, days=1)
+        self.client.get(reverse('rental_gear:checkout'))
+        self.assertFalse(GearReservation.objects.exists())
+        response = self.client.post(reverse('rental_gear:reserve_checkout'))
+        self.assertRedirects(response, reverse('rental_gear:checkout'))
+        self.assertTrue(GearReservation.objects.filter(user=self.user).exists())
+
+    def test_checkout_busy_is_not_reported_as_empty_cart(self):
+        self.client.login(username='user', password='pass')
+        CartItem.objects.create(user=self.user, gear=self.gear, quantity=1, days=1)
+        busy = CheckoutError("Checkout is busy, please try again.")
+        with mock.patch('rental_gear.views.reserve_cart', side_effect=busy):
+            response = self.client.post(reverse('rental_gear:reserve_checkout'))
+        self.assertRedirects(response, reverse('rental_gear:view_cart'), fetch_redirect_response=False)
+        self.assertEqual([str(m) for m in get_messages(response.wsgi_request)], [str(busy)])
+        with mock.patch('rental_gear.views.checkout_cart', side_effect=busy):
+            response = self.client.post(reverse('rental_gear:checkout_ajax'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], str(busy))
+
     def test_checkout_view_empty_cart(self):
         self.client.login(username='user', password='pass')
         response = self.client.get(reverse('rental_gear:checkout'))
@@ -354,3 +390,407 @@ class ViewsTest(TestCase):
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.content)
         self.assertEqual(data['name'], 'Test Gear')
+
+
+class GearSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', password='pass')
+        self.profile = SellerProfile.objects.create(user=self.seller, business_name='Frosty Rentals')
+        self.stick = Gear.objects.create(name='Hockey Stick Pro', category='hockey', price_per_day=10, seller=self.seller)
+        self.helmet = Gear.objects.create(name='Helmet', category='protective_gear', price_per_day=10,
+                                          description='Hockey helmet with cage', seller=self.seller)
+        self.skates = Gear.objects.create(name='Figure Skates', category='ice_skating', price_per_day=10,
+                                          description='White leather', seller=self.seller)
+
+    def test_prefix_match_ranks_name_first_with_facets(self):
+        with self.assertNumQueries(2):
+            result = search.search_gears('hock')
+        self.assertEqual(result.gears, [self.stick, self.helmet])
+        self.assertEqual(result.facets, {'hockey': 1, 'protective_gear': 1})
+        self.assertEqual(result.total, 2)
+
+    def test_category_filter_keeps_all_facets(self):
+        result = search.search_gears('hockey', category='protective_gear')
+        self.assertEqual(result.gears, [self.helmet])
+        self.assertEqual(result.total, 1)
+        self.assertEqual(result.facets, {'hockey': 1, 'protective_gear': 1})
+
+    def test_typo_is_corrected(self):
+        result = search.search_gears('skatse')
+        self.assertEqual(result.gears, [self.skates])
+        self.assertEqual(result.corrected, 'skates')
+
+    def test_correction_is_capped(self):
+        backend = search.get_backend()
+        with mock.patch.object(search, 'MAX_CORRECTED_WORDS', 2):
+            # Kata yang sudah ada di index gak dihitung; sisanya cuma dua yang pertama dikoreksi
+            self.assertEqual(search.correct(['hockey', 'hcokey', 'skatse', 'helmte'], backend),
+                             ['hockey', 'hockey', 'skates', 'helmte'])
+        with mock.patch.object(search, 'MAX_CANDIDATES', 0):
+            self.assertEqual(search.correct(['skatse'], backend), ['skatse'])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertEqual(search.search_gears('frosty').total, 3)
+        self.profile.business_name = 'Glacier Supply'
+        self.profile.save()
+        self.assertEqual(search.search_gears('glacier').total, 3)
+
+        self.skates.name = 'Speed Skates'
+        self.skates.save()
+        self.assertEqual(search.search_gears('speed').gears, [self.skates])
+        self.skates.delete()
+        self.assertEqual(search.search_gears('speed').total, 0)
+
+    def test_pagination(self):
+        first = search.search_gears('', per_page=2)
+        second = search.search_gears('', page=2, per_page=2)
+        self.assertEqual(first.gears, [self.stick, self.helmet])
+        self.assertTrue(first.has_next)
+        self.assertEqual(second.gears, [self.skates])
+        self.assertFalse(second.has_next)
+
+    def test_rebuild_index(self):
+        Gear.objects.bulk_create([Gear(name='Curling Stone', category='curling', price_per_day=5, seller=self.seller)])
+        self.assertEqual(search.search_gears('curling').total, 0)
+        self.assertEqual(search.rebuild_index(), 4)
+        self.assertEqual(search.search_gears('curling').total, 1)
+
+    def test_views(self):
+        response = self.client.get(reverse('rental_gear:filter_gear'), {'search': 'hock', 'category': 'hockey'})
+        self.assertEqual(list(response.context['gears']), [self.stick])
+
+        data = self.client.get(reverse('rental_gear:flutter_gears_json'), {'q': 'hock', 'page': 1}).json()
+        self.assertEqual([row['id'] for row in data['results']], [self.stick.pk, self.helmet.pk])
+        self.assertEqual(data['facets'], {'hockey': 1, 'protective_gear': 1})
+        # Tanpa parameter tetap list lama buat client Flutter yang belum update
+        self.assertEqual(len(self.client.get(reverse('rental_gear:flutter_gears_json')).json()), 3)
+
+
+class GearApiTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass')
+        self.gears = [
+            Gear.objects.create(name=f'Gear {i}', category='hockey' if i % 2 else 'curling',
+                                price_per_day=10, seller=self.seller)
+            for i in range(5)
+        ]
+        self.url = reverse('rental_gear:flutter_gears_json')
+
+    def test_full_list_is_one_query_plus_version(self):
+        with self.assertNumQueries(2):
+            data = self.client.get(self.url).json()
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data[0]['seller_username'], 'seller')
+        self.assertEqual(data[0]['price_per_day'], 10.0)
+
+    def test_fields_projection(self):
+        data = self.client.get(self.url, {'fields': 'id,name', 'limit': 2}).json()
+        self.assertEqual(data['results'], [{'id': g.pk, 'name': g.name} for g in self.gears[:2]])
+        self.assertEqual((data['count'], data['next_offset']), (5, 2))
+        self.assertEqual(self.client.get(self.url, {'fields': 'id,password'}).status_code, 400)
+
+    def test_offset_pages(self):
+        data = self.client.get(self.url, {'limit': 2, 'offset': 4}).json()
+        self.assertEqual([row['id'] for row in data['results']], [self.gears[4].pk])
+        self.assertIsNone(data['next_offset'])
+
+    def test_cursor_pages(self):
+        seen, cursor = [], ''
+        while cursor is not None:
+            data = self.client.get(self.url, {'cursor': cursor, 'limit': 2, 'fields': 'name'}).json()
+            seen += [row['name'] for row in data['results']]
+            cursor = data['next_cursor']
+        self.assertEqual(seen, [g.name for g in self.gears])
+        self.assertEqual(self.client.get(self.url, {'cursor': 'nope'}).status_code, 400)
+
+    def test_category_filter_with_limit(self):
+        data = self.client.get(self.url, {'category': 'hockey', 'limit': 10}).json()
+        self.assertEqual(data['count'], 2)
+
+    def test_unchanged_catalog_returns_304(self):
+        response = self.client.get(self.url, {'limit': 2})
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url, {'limit': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        # ETag beda untuk parameter beda
+        self.assertEqual(self.client.get(self.url, {'limit': 3}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(
+            self.url, {'limit': 2}, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        self.gears[0].price_per_day = 20
+        self.gears[0].save()
+        changed = self.client.get(self.url, {'limit': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+
+class CheckoutServiceTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass')
+        self.user = User.objects.create_user(username='buyer', password='pass')
+        self.other = User.objects.create_user(username='buyer2', password='pass')
+        self.skates = Gear.objects.create(name='Skates', category='ice_skating', price_per_day=10, stock=3, seller=self.seller)
+        self.stick = Gear.objects.create(name='Stick', category='hockey', price_per_day=5, stock=1, seller=self.seller)
+
+    def free_today(self, gear, days=1):
+        today = timezone.localdate()
+        return available_units(gear.pk, today, today + datetime.timedelta(days=days - 1))
+
+    def test_checkout_occupies_units_and_creates_items(self):
+        CartItem.objects.create(user=self.user, gear=self.skates, quantity=2, days=3)
+        CartItem.objects.create(user=self.user, gear=self.stick, quantity=1, days=1)
+        rental, _, rental_items = checkout_cart(self.user)
+        self.assertEqual(rental.total_cost, 65)
+        self.assertEqual(len(rental_items), 2)
+        today = timezone.localdate()
+        self.assertEqual(rental.return_date, today + datetime.timedelta(days=3))
+        skates_item = RentalItem.objects.get(gear=self.skates)
+        self.assertEqual((skates_item.start_date, skates_item.end_date), (today, today + datetime.timedelta(days=2)))
+        # Stock = jumlah unit, gak dikurangi; yang berkurang unit bebas di window-nya
+        self.skates.refresh_from_db()
+        self.assertEqual(self.skates.stock, 3)
+        self.assertEqual((self.free_today(self.skates, 3), self.free_today(self.stick)), (1, 0))
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+
+    def test_units_come_back_after_the_window(self):
+        CartItem.objects.create(user=self.user, gear=self.stick, quantity=1, days=2)
+        checkout_cart(self.user)
+        today = timezone.localdate()
+        self.assertEqual(available_units(self.stick.pk, today, today + datetime.timedelta(days=5)), 0)
+        later = today + datetime.timedelta(days=2)
+        self.assertEqual(available_units(self.stick.pk, later, later + datetime.timedelta(days=3)), 1)
+
+        # Rental ke depan yang gak overlap tetap bisa
+        CartItem.objects.create(user=self.other, gear=self.stick, quantity=1, days=1, start_date=later)
+        rental, _, _ = checkout_cart(self.other)
+        self.assertEqual(rental.return_date, later + datetime.timedelta(days=1))
+
+    def test_out_of_stock_changes_nothing(self):
+        CartItem.objects.create(user=self.user, gear=self.skates, quantity=1, days=1)
+        CartItem.objects.create(user=self.user, gear=self.stick, quantity=2, days=1)
+        with self.assertRaises(OutOfStock) as ctx:
+            checkout_cart(self.user)
+        self.assertEqual(ctx.exception.gear_names, ['Stick'])
+        self.assertEqual(self.free_today(self.skates), 3)
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(Rental.objects.exists())
+
+    def test_partial_window_overlap_is_rejected(self):
+        today = timezone.localdate()
+        self.assertTrue(take_units(self.stick.pk, today + datetime.timedelta(days=2), today + datetime.timedelta(days=2), 1))
+        self.assertFalse(take_units(self.stick.pk, today, today + datetime.timedelta(days=4), 1))
+        # Hari-hari yang masih kosong gak ikut ketambah waktu gagal
+        self.assertEqual(GearDayUsage.objects.filter(gear=self.stick, units__gt=0).count(), 1)
+
+    def test_empty_cart(self):
+        with self.assertRaises(CheckoutError):
+            checkout_cart(self.user)
+
+    def test_reservation_holds_units_until_it_expires(self):
+        CartItem.objects.create(user=self.user, gear=self.stick, quantity=1, days=1)
+        CartItem.objects.create(user=self.other, gear=self.stick, quantity=1, days=1)
+        _, short = reserve_cart(self.user)
+        self.assertEqual(short, [])
+        self.assertEqual(self.free_today(self.stick), 0)
+
+        # Orang lain gak bisa ambil unit yang lagi ditahan
+        with self.assertRaises(OutOfStock):
+            checkout_cart(self.other)
+
+        # Setelah expired, unit balik dan bisa dipakai orang lain
+        later = timezone.now() + datetime.timedelta(minutes=11)
+        rental, _, _ = checkout_cart(self.other, now=later)
+        self.assertEqual(rental.user, self.other)
+        self.assertFalse(GearReservation.objects.exists())
+        with self.assertRaises(OutOfStock):
+            checkout_cart(self.user, now=later)
+
+    def test_checkout_consumes_own_reservation(self):
+        CartItem.objects.create(user=self.user, gear=self.skates, quantity=2, days=1)
+        reserve_cart(self.user)
+        checkout_cart(self.user)
+        self.assertEqual(self.free_today(self.skates), 1)
+        self.assertFalse(GearReservation.objects.exists())
+        self.assertEqual(release_expired(timezone.now() + datetime.timedelta(hours=1)), 0)
+        self.assertEqual(self.free_today(self.skates), 1)
+
+    def test_reservation_follows_changed_window(self):
+        item = CartItem.objects.create(user=self.user, gear=self.stick, quantity=1, days=1)
+        reserve_cart(self.user)
+        item.start_date = timezone.localdate() + datetime.timedelta(days=3)
+        item.save()
+        reserve_cart(self.user)
+        hold = GearReservation.objects.get(user=self.user)
+        self.assertEqual(hold.start_date, item.start_date)
+        self.assertEqual(self.free_today(self.stick), 1)
+
+    def test_bulk_availability_and_rebuild(self):
+        CartItem.objects.create(user=self.user, gear=self.skates, quantity=2, days=2)
+        checkout_cart(self.user)
+        today = timezone.localdate()
+        window = (today, today + datetime.timedelta(days=6))
+        with self.assertNumQueries(1):
+            available = available_units_bulk([self.skates.pk, self.stick.pk], *window)
+        self.assertEqual(available, {self.skates.pk: 1, self.stick.pk: 1})
+
+        GearDayUsage.objects.all().delete()
+        rebuild_usage()
+        self.assertEqual(available_units_bulk([self.skates.pk], *window), {self.skates.pk: 1})
+
+    def test_availability_endpoint(self):
+        take_units(self.skates.pk, timezone.localdate(), timezone.localdate(), 2)
+        response = Client().get(reverse('rental_gear:flutter_gears_availability'), {
+            'ids': f'{self.skates.pk},{self.stick.pk}',
+        })
+        self.assertEqual(response.json()['available'], {str(self.skates.pk): 1, str(self.stick.pk): 1})
+        self.assertEqual(Client().get(reverse('rental_gear:flutter_gears_availability')).status_code, 400)
+
+    def test_flutter_add_to_cart_checks_window(self):
+        take_units(self.stick.pk, timezone.localdate(), timezone.localdate(), 1)
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('rental_gear:flutter_add_to_cart')
+        response = client.post(url, json.dumps({'gear_id': self.stick.pk, 'quantity': 1}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CartItem.objects.exists())
+
+        tomorrow = timezone.localdate() + datetime.timedelta(days=1)
+        response = client.post(url, json.dumps({
+            'gear_id': self.stick.pk, 'quantity': 1, 'start_date': tomorrow.isoformat(),
+        }), content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(CartItem.objects.get().start_date, tomorrow)
+
+    def test_flutter_checkout_conflict(self):
+        CartItem.objects.create(user=self.user, gear=self.stick, quantity=5, days=1)
+        client = Client()
+        client.force_login(self.user)
+        response = client.post(reverse('rental_gear:flutter_checkout'))
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()['success'])
+
+
+class CheckoutStressTest(TransactionTestCase):
+    THREADS = 10
+
+    def test_units_are_never_overbooked(self):
+        seller = User.objects.create_user(username='seller', password='pass')
+        gear = Gear.objects.create(name='Last Skates', category='ice_skating', price_per_day=10, stock=3, seller=seller)
+        buyers = [User.objects.create(username=f'rush{i}') for i in range(self.THREADS)]
+        for buyer in buyers:
+            CartItem.objects.create(user=buyer, gear=gear, quantity=1, days=1)
+
+        barrier = threading.Barrier(self.THREADS)
+        outcomes = []
+
+        def rush(buyer):
+            try:
+                barrier.wait()
+                checkout_cart(buyer)
+                outcomes.append('ok')
+            except CheckoutError:
+                outcomes.append('rejected')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=rush, args=(b,)) for b in buyers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(outcomes.count('ok'), 3)
+        self.assertEqual(GearDayUsage.objects.get(gear=gear).units, 3)
+        self.assertEqual(RentalItem.objects.count(), 3)
+
+
+class GearImporterTests(TestCase):
+    PNG = b'\x89PNG\r\n\x1a\n' + b'0' * 32
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        media = os.path.join(self.tmp, 'media')
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        os.makedirs(os.path.join(self.tmp, 'Dataset', 'hockey'))
+        os.makedirs(os.path.join(self.tmp, 'Dataset', 'figure'))
+        os.makedirs(os.path.join(self.tmp, 'mirror'))
+        with open(os.path.join(self.tmp, 'Dataset', 'hockey', 'sticks.csv'), 'w') as f:
+            f.write('Brand,Name,Price,Image_URL\n'
+                    'Bauer,Vapor Stick,$300.00,https://cdn.example.com/a/stick.png\n'
+                    'CCM,Jetspeed Stick,"$1,200.00",https://cdn.example.com/b/same.png\n'
+                    'Warrior,Alpha Stick,$90,https://cdn.example.com/missing.png\n')
+        with open(os.path.join(self.tmp, 'Dataset', 'figure', 'items.csv'), 'w') as f:
+            f.write('Name,Price,Image\nJackson Skate Boot,$150,\nSoft Guard,$20,\n')
+        # Dua URL berbeda dengan isi gambar yang sama
+        for name in ('stick.png', 'same.png'):
+            with open(os.path.join(self.tmp, 'mirror', name), 'wb') as f:
+                f.write(self.PNG)
+
+    def run_import(self, *args):
+        out = io.StringIO()
+        call_command(
+            'import_gear', os.path.join(self.tmp, 'Dataset'),
+            '--images-from', os.path.join(self.tmp, 'mirror'),
+            '--checkpoint', 'test-import',
+            '--batch-size', '2', *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_imports_all_csvs_with_deduplicated_images(self):
+        output = self.run_import()
+        self.assertIn('5 gear created', output)
+        self.assertIn('2 fetched, 1 stored, 1 deduplicated, 1 failed', output)
+        vapor = Gear.objects.get(name='Bauer Vapor Stick')
+        jetspeed = Gear.objects.get(name='CCM Jetspeed Stick')
+        self.assertEqual(vapor.image.name, jetspeed.image.name)
+        self.assertTrue(vapor.image.name.endswith('.png'))
+        self.assertEqual(jetspeed.price_per_day, 620000)  # 1200 USD * 15500 / 30
+        self.assertEqual(Gear.objects.get(name='Jackson Skate Boot').category, 'ice_skating')
+        self.assertEqual(Gear.objects.get(name='Soft Guard').category, 'protective_gear')
+        self.assertEqual(search.search_gears('jetspeed').total, 1)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_batch_rows_index_and_checkpoint_commit_together(self):
+        calls = []
+
+        def crash_on_second_batch(gear_ids):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('crash')
+            return index_gears(gear_ids)
+
+        index_gears = importer.index_gears
+        with mock.patch.object(importer, 'index_gears', side_effect=crash_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        # Batch kedua gak ada yang masuk, checkpoint masih di batch pertama
+        self.assertEqual(Gear.objects.count(), 2)
+        self.assertEqual(list(ImportCheckpoint.objects.values_list('rows_done', flat=True)), [2])
+
+        self.run_import()
+        names = list(Gear.objects.values_list('name', flat=True))
+        self.assertEqual(len(names), 5)
+        self.assertEqual(len(set(names)), 5)
+
+    def test_replace_clears_search_once(self):
+        self.run_import()
+        with mock.patch.object(search, 'remove_gears') as remove:
+            output = self.run_import('--replace')
+        remove.assert_not_called()
+        self.assertIn('5 gear created', output)
+        self.assertEqual(Gear.objects.count(), 5)
+        self.assertEqual(search.search_gears('jetspeed').total, 1)
+
+    def test_resumes_from_checkpoint(self):
+        sticks = os.path.join(self.tmp, 'Dataset', 'hockey', 'sticks.csv')
+        checkpoint = importer.Checkpoint('test-import')
+        checkpoint.save(str(sticks), 2)
+        self.run_import()
+        self.assertEqual(
+            sorted(Gear.objects.filter(category='hockey').values_list('name', flat=True)), ['Warrior Alpha Stick']
+        )
+
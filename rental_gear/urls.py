@@ -3,11 +3,11 @@ from forum import views
 from rental_gear.views import (
     catalog, filter_gear, view_cart, add_to_cart, remove_from_cart,
     add_to_cart_ajax, remove_from_cart_ajax, checkout_ajax, gear_detail,
-    checkout, create_gear, update_gear, delete_gear, gear_json,
+    checkout, reserve_checkout, create_gear, update_gear, delete_gear, gear_json,
     admin_gear_list, admin_gear_create, admin_gear_update, admin_gear_delete,
     # Flutter endpoints
-    get_gears_json, get_gear_detail_json, get_cart_json, add_to_cart_flutter,
-    update_cart_item_flutter, remove_from_cart_flutter, checkout_flutter,
+    get_gears_json, get_gear_detail_json, get_gears_availability_json, get_cart_json, add_to_cart_flutter,
+    update_cart_item_flutter, remove_from_cart_flutter, checkout_flutter, reserve_cart_flutter,
     get_rentals_json, create_gear_flutter, update_gear_flutter, delete_gear_flutter,
     get_seller_gears_json, admin_gears_flutter, update_gear_admin_flutter, delete_gear_flutter
 )
@@ -18,11 +18,13 @@ urlpatterns = [
     # Flutter JSON API endpoints
     path('api/flutter/gears/', get_gears_json, name='flutter_gears_json'),
     path('api/flutter/gears/<int:id>/', get_gear_detail_json, name='flutter_gear_detail_json'),
+    path('api/flutter/gears/availability/', get_gears_availability_json, name='flutter_gears_availability'),
     path('api/flutter/cart/', get_cart_json, name='flutter_cart_json'),
     path('api/flutter/cart/add/', add_to_cart_flutter, name='flutter_add_to_cart'),
     path('api/flutter/cart/update/<int:item_id>/', update_cart_item_flutter, name='flutter_update_cart'),
     path('api/flutter/cart/remove/<int:item_id>/', remove_from_cart_flutter, name='flutter_remove_from_cart'),
     path('api/flutter/checkout/', checkout_flutter, name='flutter_checkout'),
+    path('api/flutter/checkout/reserve/', reserve_cart_flutter, name='flutter_reserve_cart'),
     path('api/flutter/rentals/', get_rentals_json, name='flutter_rentals_json'),
     path('api/flutter/seller/gears/', get_seller_gears_json, name='flutter_seller_gears'),
     path('api/flutter/seller/gears/create/', create_gear_flutter, name='flutter_create_gear'),
@@ -54,4 +56,5 @@ urlpatterns = [
     path('checkout-ajax/', checkout_ajax, name='checkout_ajax'),
     path('gear/<int:id>/', gear_detail, name='gear_detail'),
     path('checkout/', checkout, name='checkout'),
+    path('checkout/reserve/', reserve_checkout, name='reserve_checkout'),
 ]
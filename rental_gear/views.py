@@ -1,46 +1,137 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_POST
+from django.views.decorators.cache import cache_control
 from django.contrib import messages
 from django.db import transaction
 from django.utils import timezone
-from .models import Gear, CartItem, Rental, RentalItem
+from .models import Gear, CartItem, GearReservation, Rental, RentalItem
 from .forms import GearForm, AddToCartForm, CheckoutForm
+from .services import CheckoutError, EmptyCart, OutOfStock, checkout_cart, release_reservation, reserve_cart
+from .inventory import available_units, available_units_bulk
+from .search import search_gears
+from . import api
+from authentication.user_context import is_seller
+from the_rink.cache import cached
+from the_rink.thumbnails import thumbnail_url
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
 from django.template.loader import render_to_string
 from django.core import serializers
+import datetime
 
 
 # ============ Flutter JSON Endpoints ============
 
+def _parse_start_date(value):
+    # ISO date (YYYY-MM-DD); kosong = mulai hari checkout
+    if not value:
+        return None
+    start = datetime.date.fromisoformat(value)
+    if start < timezone.localdate():
+        raise ValueError('Start date cannot be in the past')
+    return start
+
+
+def _free_for_item(item):
+    # Unit bebas untuk window item, ditambah yang lagi ditahan user ini sendiri buat window yang sama
+    start, end = item.rental_window()
+    free = available_units(item.gear_id, start, end)
+    hold = GearReservation.objects.filter(user_id=item.user_id, gear_id=item.gear_id, start_date=start, end_date=end).first()
+    return free + (hold.quantity if hold else 0)
+
+
+def _gear_json(gear):
+    return {
+        'id': gear.id,
+        'name': gear.name,
+        'category': gear.category,
+        'price_per_day': float(gear.price_per_day),  # Decimal to float
+        'stock': gear.stock,  # int
+        'description': gear.description or '',  # Ensure string, not null
+        'image_url': gear.image_url or '',  # Ensure string, not null
+        'thumbnail_url': thumbnail_url(gear.image, 'list'),
+        'seller_id': gear.seller.id,  # int
+        'seller_username': gear.seller.username,  # string
+        'is_featured': gear.is_featured,  # bool
+    }
+
+
+def _page_param(request):
+    try:
+        return max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        return 1
+
+
 @csrf_exempt
+@cache_control(no_cache=True)
+@condition(etag_func=api.catalog_etag, last_modified_func=api.catalog_last_modified)
 def get_gears_json(request):
-    """Get all gears for Flutter - JSON format with proper data types"""
-    gears = Gear.objects.all()
-    data = []
-    for gear in gears:
-        data.append({
-            'id': gear.id,
-            'name': gear.name,
-            'category': gear.category,
-            'price_per_day': float(gear.price_per_day),  # Decimal to float
-            'stock': gear.stock,  # int
-            'description': gear.description or '',  # Ensure string, not null
-            'image_url': gear.image_url or '',  # Ensure string, not null
-            'seller_id': gear.seller.id,  # int
-            'seller_username': gear.seller.username,  # string
-            'is_featured': gear.is_featured,  # bool
-        })
-    return JsonResponse(data, safe=False)
+    """Get gears for Flutter - JSON format with proper data types
+
+    - no parameters: the full list (old clients)
+    - ?cursor= (empty for the first page) & ?limit=: keyset pages by id
+    - ?limit= & ?offset=: offset pages with a total count
+    - ?q=, ?category=, ?page=: ranked search page with facets
+    - ?fields=id,name,...: only those keys per gear
+    Unchanged catalog + If-None-Match/If-Modified-Since = 304.
+    """
+    try:
+        fields = api.parse_fields(request.GET.get('fields'))
+        limit = api.parse_int(request, 'limit', api.DEFAULT_LIMIT, minimum=1, maximum=api.MAX_LIMIT)
+        gears = Gear.objects.order_by('id')
+        if request.GET.get('category') and not {'q', 'page'} & set(request.GET):
+            gears = gears.filter(category=request.GET['category'])
+
+        if 'cursor' in request.GET:
+            after = api.decode_cursor(request.GET['cursor'])
+            if after is not None:
+                gears = gears.filter(id__gt=after)
+            # Ambil satu baris lebih buat tahu masih ada halaman berikutnya; id selalu ikut buat cursor
+            rows = api.gear_rows(gears[:limit + 1], fields if 'id' in fields else ['id'] + fields)
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            next_cursor = api.encode_cursor(rows[-1]['id']) if has_more else None
+            if 'id' not in fields:
+                rows = [api.project(row, fields) for row in rows]
+            return JsonResponse({'results': rows, 'next_cursor': next_cursor})
+
+        if 'limit' in request.GET or 'offset' in request.GET:
+            offset = api.parse_int(request, 'offset', 0)
+            total = gears.count()
+            rows = api.gear_rows(gears[offset:offset + limit], fields)
+            return JsonResponse({
+                'results': rows,
+                'count': total,
+                'limit': limit,
+                'offset': offset,
+                'next_offset': offset + limit if offset + limit < total else None,
+            })
+    except api.InvalidParameter as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if not {'q', 'category', 'page'} & set(request.GET):
+        return JsonResponse(api.gear_rows(gears, fields), safe=False)
+
+    result = search_gears(request.GET.get('q', ''), request.GET.get('category', ''), _page_param(request))
+    return JsonResponse({
+        'results': [api.project(_gear_json(gear), fields) for gear in result.gears],
+        'count': result.total,
+        'page': result.page,
+        'num_pages': result.num_pages,
+        'has_next': result.has_next,
+        'facets': result.facets,
+        'corrected_query': result.corrected,
+    })
 
 
 @csrf_exempt
 def get_gear_detail_json(request, id):
     """Get single gear detail for Flutter - JSON format"""
     try:
-        gear = get_object_or_404(Gear, id=id)
+        gear = get_object_or_404(Gear.objects.select_related('seller'), id=id)
         data = {
             'id': gear.id,
             'name': gear.name,
@@ -49,6 +140,7 @@ def get_gear_detail_json(request, id):
             'stock': gear.stock,
             'description': gear.description or '',
             'image_url': gear.image_url or '',
+            'thumbnail_url': thumbnail_url(gear.image, 'detail'),
             'seller_id': gear.seller.id,
             'seller_username': gear.seller.username,
             'is_featured': gear.is_featured,
@@ -58,17 +150,47 @@ def get_gear_detail_json(request, id):
         return JsonResponse({'error': 'Gear not found'}, status=404)
 
 
+def get_gears_availability_json(request):
+    """Free units per gear for a date range, e.g. ?start=2025-01-10&end=2025-01-12&ids=1,2,3"""
+    try:
+        start = datetime.date.fromisoformat(request.GET.get('start') or str(timezone.localdate()))
+        end = datetime.date.fromisoformat(request.GET.get('end') or str(start))
+        gear_ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk]
+    except ValueError:
+        return JsonResponse({'error': 'Invalid start, end or ids'}, status=400)
+    if end < start or (end - start).days >= 90:
+        return JsonResponse({'error': 'Range must be 1-90 days'}, status=400)
+    if not gear_ids or len(gear_ids) > 100:
+        return JsonResponse({'error': 'Pass 1-100 gear ids'}, status=400)
+
+    available = available_units_bulk(gear_ids, start, end)
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'available': {str(gear_id): free for gear_id, free in available.items()},
+    })
+
+
 @csrf_exempt
 @login_required
 def get_cart_json(request):
     """Get user's cart items for Flutter"""
-    cart_items = CartItem.objects.filter(user=request.user).select_related('gear')
+    cart_items = list(CartItem.objects.filter(user=request.user).select_related('gear'))
+    today = timezone.localdate()
+    windows = {item.pk: item.rental_window(today) for item in cart_items}
+    # Satu query availability per rentang tanggal (biasanya semua item mulai hari ini)
+    available = {}
+    for window in set(windows.values()):
+        gear_ids = [item.gear_id for item in cart_items if windows[item.pk] == window]
+        for gear_id, free in available_units_bulk(gear_ids, *window).items():
+            available[(gear_id, window)] = free
     data = []
     total_price = 0
     
     for item in cart_items:
         item_total = float(item.get_total_price())
         total_price += item_total
+        start, end = windows[item.pk]
         data.append({
             'id': item.id,
             'gear_id': item.gear.id,
@@ -78,7 +200,9 @@ def get_cart_json(request):
             'quantity': item.quantity,
             'days': item.days,
             'subtotal': item_total,
-            'stock_available': item.gear.stock,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'stock_available': available.get((item.gear_id, windows[item.pk]), 0),
         })
     
     return JsonResponse({
@@ -100,6 +224,7 @@ def add_to_cart_flutter(request):
         gear_id = int(data.get('gear_id'))
         quantity = int(data.get('quantity', 1))
         days = int(data.get('days', 1))
+        start_date = _parse_start_date(data.get('start_date'))
         
         if quantity < 1:
             return JsonResponse({'success': False, 'message': 'Quantity must be at least 1'}, status=400)
@@ -109,21 +234,22 @@ def add_to_cart_flutter(request):
         
         gear = get_object_or_404(Gear, id=gear_id)
         
-        if quantity > gear.stock:
-            return JsonResponse({
-                'success': False, 
-                'message': f'Stock not available. Only {gear.stock} items left'
-            }, status=400)
-        
         item, created = CartItem.objects.get_or_create(
             user=request.user, 
             gear=gear,
-            defaults={'quantity': quantity, 'days': days}
+            defaults={'quantity': quantity, 'days': days, 'start_date': start_date}
         )
+        item.quantity, item.days, item.start_date = quantity, days, start_date
+        free = _free_for_item(item)
+        if quantity > free:
+            if created:
+                item.delete()
+            return JsonResponse({
+                'success': False, 
+                'message': f'Stock not available. Only {free} items left for those dates'
+            }, status=400)
         
         if not created:
-            item.quantity = quantity
-            item.days = days
             item.save()
         
         return JsonResponse({
@@ -134,6 +260,8 @@ def add_to_cart_flutter(request):
         
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'message': 'Invalid JSON'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)}, status=500)
 
@@ -153,11 +281,6 @@ def update_cart_item_flutter(request, item_id):
             quantity = int(data['quantity'])
             if quantity < 1:
                 return JsonResponse({'success': False, 'message': 'Quantity must be at least 1'}, status=400)
-            if quantity > item.gear.stock:
-                return JsonResponse({
-                    'success': False,
-                    'message': f'Stock not available. Only {item.gear.stock} items left'
-                }, status=400)
             item.quantity = quantity
         
         if 'days' in data:
@@ -165,6 +288,16 @@ def update_cart_item_flutter(request, item_id):
             if days < 1 or days > 30:
                 return JsonResponse({'success': False, 'message': 'Days must be between 1-30'}, status=400)
             item.days = days
+
+        if 'start_date' in data:
+            item.start_date = _parse_start_date(data['start_date'])
+
+        free = _free_for_item(item)
+        if item.quantity > free:
+            return JsonResponse({
+                'success': False,
+                'message': f'Stock not available. Only {free} items left for those dates'
+            }, status=400)
         
         item.save()
         
@@ -176,6 +309,8 @@ def update_cart_item_flutter(request, item_id):
         
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'message': 'Invalid JSON'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)}, status=500)
 
@@ -191,6 +326,7 @@ def remove_from_cart_flutter(request, item_id):
         item = get_object_or_404(CartItem, id=item_id, user=request.user)
         gear_name = item.gear.name
         item.delete()
+        release_reservation(request.user, item.gear_id)
         
         return JsonResponse({
             'success': True,
@@ -202,82 +338,54 @@ def remove_from_cart_flutter(request, item_id):
 
 @csrf_exempt
 @login_required
-@transaction.atomic
 def checkout_flutter(request):
     """Checkout cart items for Flutter"""
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Method not allowed'}, status=405)
-    
+
     try:
-        cart_items = CartItem.objects.filter(user=request.user).select_related('gear')
-        
-        if not cart_items.exists():
-            return JsonResponse({
-                'success': False,
-                'message': 'Cart is empty'
-            }, status=400)
-        
-        # Calculate total and max days
-        total = 0
-        max_days = 0
-        rental_items_data = []
-        
-        for item in cart_items:
-            if item.quantity > item.gear.stock:
-                return JsonResponse({
-                    'success': False,
-                    'message': f'Insufficient stock for {item.gear.name}'
-                }, status=400)
-            
-            subtotal = float(item.get_total_price())
-            total += subtotal
-            max_days = max(max_days, item.days)
-            
-            rental_items_data.append({
-                'gear_name': item.gear.name,
-                'quantity': item.quantity,
-                'days': item.days,
-                'price_per_day': float(item.gear.price_per_day),
-                'subtotal': subtotal
-            })
-        
-        # Create rental
-        from datetime import timedelta
-        rental = Rental.objects.create(
-            customer_name=request.user.username,
-            user=request.user,
-            return_date=timezone.now().date() + timedelta(days=max_days),
-            total_cost=total
-        )
-        
-        # Create rental items
-        for item in cart_items:
-            RentalItem.objects.create(
-                rental=rental,
-                gear_name=item.gear.name,
-                quantity=item.quantity,
-                price_per_day_at_checkout=item.gear.price_per_day
-            )
-            
-            # Reduce stock
-            item.gear.stock -= item.quantity
-            item.gear.save()
-        
-        # Clear cart
-        cart_items.delete()
-        
-        return JsonResponse({
-            'success': True,
-            'message': 'Checkout successful',
-            'rental_id': rental.id,
-            'total_cost': total,
-            'return_date': rental.return_date.isoformat(),
-            'items': rental_items_data
-        })
-        
+        rental, cart_items, _ = checkout_cart(request.user)
+    except CheckoutError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=e.status)
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)}, status=500)
 
+    rental_items_data = [{
+        'gear_name': item.gear.name,
+        'quantity': item.quantity,
+        'days': item.days,
+        'price_per_day': float(item.gear.price_per_day),
+        'subtotal': float(item.get_total_price()),
+    } for item in cart_items]
+
+    return JsonResponse({
+        'success': True,
+        'message': 'Checkout successful',
+        'rental_id': rental.id,
+        'total_cost': float(rental.total_cost),
+        'return_date': rental.return_date.isoformat(),
+        'items': rental_items_data
+    })
+
+
+@csrf_exempt
+@login_required
+def reserve_cart_flutter(request):
+    """Hold stock for the whole cart while the user is on the checkout screen"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Method not allowed'}, status=405)
+
+    try:
+        expires_at, short = reserve_cart(request.user)
+    except CheckoutError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=e.status)
+
+    return JsonResponse({
+        'success': not short,
+        'expires_at': expires_at.isoformat(),
+        'insufficient_stock': short,
+    })
+
 
 @csrf_exempt
 @login_required
@@ -291,6 +399,8 @@ def get_rentals_json(request):
         for item in rental.items.all():
             items.append({
                 'gear_name': item.gear_name,
+                'start_date': item.start_date.isoformat() if item.start_date else None,
+                'end_date': item.end_date.isoformat() if item.end_date else None,
                 'quantity': item.quantity,
                 'price_per_day': float(item.price_per_day_at_checkout),
                 'subtotal': float(item.get_subtotal())
@@ -310,7 +420,7 @@ def get_rentals_json(request):
 
 @csrf_exempt
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'usertype') and u.usertype.user_type == 'seller')
+@user_passes_test(is_seller)
 def create_gear_flutter(request):
     """Create gear from Flutter (seller only)"""
     if request.method != 'POST':
@@ -361,7 +471,7 @@ def create_gear_flutter(request):
 
 @csrf_exempt
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'usertype') and u.usertype.user_type == 'seller')
+@user_passes_test(is_seller)
 def update_gear_flutter(request, id):
     """Update gear from Flutter (seller only)"""
     if request.method != 'POST':
@@ -408,7 +518,7 @@ def update_gear_flutter(request, id):
 
 @csrf_exempt
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'usertype') and u.usertype.user_type == 'seller')
+@user_passes_test(is_seller)
 def delete_gear_flutter(request, id):
     """Delete gear from Flutter (seller only)"""
     if request.method != 'POST':
@@ -429,7 +539,7 @@ def delete_gear_flutter(request, id):
 
 @csrf_exempt
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'usertype') and u.usertype.user_type == 'seller')
+@user_passes_test(is_seller)
 def get_seller_gears_json(request):
     """Get seller's own gears for Flutter"""
     try:
@@ -469,7 +579,7 @@ def gear_json(request, id):
 
 # Create
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'usertype') and u.usertype.user_type == 'seller')
+@user_passes_test(is_seller)
 def create_gear(request):
     if request.method == 'POST':
         form = GearForm(request.POST, request.FILES)
@@ -485,15 +595,17 @@ def create_gear(request):
 
 
 def catalog(request):
-    gears = Gear.objects.all()
+    page = _page_param(request)
+    result = cached('catalog', 'gear', parts=(page,), build=lambda: search_gears(page=page))
     return render(request, 'catalog.html', {
-        'gears': gears
+        'gears': result.gears,
+        'result': result,
     })
 
 
 # Update
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'usertype') and u.usertype.user_type == 'seller')
+@user_passes_test(is_seller)
 def update_gear(request, id):
     gear = get_object_or_404(Gear, id=id, seller=request.user)
     if request.method == 'POST':
@@ -516,7 +628,7 @@ def update_gear(request, id):
 
 # Delete
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'usertype') and u.usertype.user_type == 'seller')
+@user_passes_test(is_seller)
 def delete_gear(request, id):
     gear = get_object_or_404(Gear, id=id, seller=request.user)
     if request.method == 'POST':
@@ -529,17 +641,8 @@ def delete_gear(request, id):
     return render(request, 'rental_gear/seller_gear_confirm_delete.html', {'gear': gear})
 
 def filter_gear(request):
-    category = request.GET.get('category')
-    print("DEBUG CATEGORY:", category) 
-    search = request.GET.get('search')
-    gears = Gear.objects.all()
-
-    if category:
-        gears = gears.filter(category=category)
-    if search:
-        gears = gears.filter(name__icontains=search)
-
-    return render(request, 'partials/gear_items.html', {'gears': gears})
+    result = search_gears(request.GET.get('search', ''), request.GET.get('category', ''), _page_param(request))
+    return render(request, 'partials/gear_items.html', {'gears': result.gears, 'result': result})
 
 
 def gear_detail(request, id):
@@ -636,6 +739,7 @@ def add_to_cart(request, gear_id):
 def remove_from_cart(request, item_id):
     item = get_object_or_404(CartItem, id=item_id, user=request.user)
     item.delete()
+    release_reservation(request.user, item.gear_id)
 
     cart_items = CartItem.objects.filter(user=request.user)
     total_price = sum(item.get_total_price() for item in cart_items)
@@ -645,29 +749,49 @@ def remove_from_cart(request, item_id):
     })
 
 @login_required
-@transaction.atomic
 def checkout(request):
-    cart_items = CartItem.objects.filter(user=request.user)
+    if request.method == "POST":
+        try:
+            rental, _, _ = checkout_cart(request.user)
+        except OutOfStock as e:
+            messages.error(request, f"Stok tidak cukup untuk {', '.join(e.gear_names)}.")
+            return redirect('rental_gear:view_cart')
+        except EmptyCart:
+            messages.warning(request, "Keranjang kamu masih kosong!")
+            return redirect('rental_gear:view_cart')
+        except CheckoutError as e:
+            messages.error(request, str(e))
+            return redirect('rental_gear:view_cart')
+
+        total = rental.total_cost
+        messages.success(request, f"Checkout berhasil! Total pembayaran: Rp{total}")
+        return render(request, 'checkout_success.html', {'total': total})
 
+    cart_items = CartItem.objects.filter(user=request.user).select_related('gear')
     if not cart_items.exists():
         messages.warning(request, "Keranjang kamu masih kosong!")
         return redirect('rental_gear:view_cart')
 
     total = sum(item.get_total_price() for item in cart_items)
-
-    if request.method == "POST":
-
-        for item in cart_items:
-            item.delete()
-
-        messages.success(request, f"Checkout berhasil! Total pembayaran: Rp{total}")
-        return render(request, 'checkout_success.html', {'total': total})
-
     return render(request, 'checkout.html', {
         'cart_items': cart_items,
         'total': total
     })
 
+@login_required
+@require_POST
+def reserve_checkout(request):
+    # Stok ditahan lewat tombol "Proceed to Checkout" (POST), bukan waktu halaman checkout
+    # dibuka: prefetch/crawler gak ikut menahan stok
+    try:
+        _, short = reserve_cart(request.user)
+    except CheckoutError as e:
+        messages.error(request, str(e))
+        return redirect('rental_gear:view_cart')
+    if short:
+        messages.warning(request, f"Stok tidak cukup untuk {', '.join(short)}.")
+    return redirect('rental_gear:checkout')
+
 @require_POST
 def add_to_cart_ajax(request, gear_id):
     if not request.user.is_authenticated:
@@ -722,13 +846,13 @@ def remove_from_cart_ajax(request, item_id):
     try:
         item = CartItem.objects.get(id=item_id, user=request.user)
         item.delete()
+        release_reservation(request.user, item.gear_id)
         return JsonResponse({'success': True})
     except CartItem.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Item not found'})
 
 
 @require_POST
-@transaction.atomic
 def checkout_ajax(request):
     if not request.user.is_authenticated:
         return JsonResponse({
@@ -737,36 +861,19 @@ def checkout_ajax(request):
             'message': 'Silakan login terlebih dahulu untuk checkout.'
         }, status=401)
 
-    cart_items = CartItem.objects.filter(user=request.user)
-
-    if not cart_items.exists():
+    try:
+        rental, _, _ = checkout_cart(request.user)
+    except OutOfStock as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=e.status)
+    except EmptyCart:
         return JsonResponse({
             'success': False,
             'message': "Keranjang kamu masih kosong!"
         })
+    except CheckoutError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=e.status)
 
-    total = sum(item.get_total_price() for item in cart_items)
-
-    # Buat rental baru
-    from django.utils import timezone
-    rental = Rental.objects.create(
-        customer_name=request.user.username,
-        user=request.user,
-        return_date=timezone.now().date() + timezone.timedelta(days=max(item.days for item in cart_items)),
-        total_cost=total
-    )
-
-    # Convert cart items ke rental items
-    for item in cart_items:
-        RentalItem.objects.create(
-            rental=rental,
-            gear_name=item.gear.name,
-            quantity=item.quantity,
-            price_per_day_at_checkout=item.gear.price_per_day
-        )
-
-        item.delete()
-
+    total = rental.total_cost
     return JsonResponse({
         'success': True,
         'message': f"Checkout berhasil! Total pembayaran: Rp{total}",
@@ -0,0 +1,322 @@
+"""Admin listings (Flutter admin API, web admin pages) and their exports.
+
+Every listing is an AdminList: a base queryset that already joins and
+annotates whatever the rows show (no query per row), the sort orders an
+admin can pick, the filters, and a row serializer. page() returns one
+keyset-paginated page on (sort column, pk), so a deep page costs the same
+as the first; the sort columns all have an index (see the Meta indexes of
+the models). Query parameters::
+
+    ?sort=-booked_at          a key of ``sorts``, '-' for descending
+    ?cursor=...               next_cursor of the previous page
+    ?page_size=50             1..200
+    ?status=Booked&arena=...  the listing's ``filters``
+
+export() streams the same rows (all of them, same filters and sort) as CSV
+or JSON lines. The rows come from ``.iterator(chunk_size=EXPORT_CHUNK_SIZE)``
+and are sent EXPORT_CHUNK_SIZE at a time, so memory stays flat however
+large the table is.
+"""
+import base64
+import binascii
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from authentication.admin_users import InvalidParameter, parse_page_size, related
+from booking_arena.models import Booking
+from events.models import Event
+from forum.models import Post, Reply
+from rental_gear.models import Gear
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class AdminList:
+
+    def __init__(self, name, queryset, row, columns, sorts, default_sort, filters=None):
+        self.name = name
+        self.base_queryset = queryset
+        self.row = row
+        self.columns = columns
+        # nama di URL -> field model (harus NOT NULL dan ber-index)
+        self.sorts = sorts
+        self.default_sort = default_sort
+        # nama di URL -> lookup ORM
+        self.filters = filters or {}
+        self.model = queryset.model
+
+    # --- Parameter ------------------------------------------------------------
+
+    def _sort(self, params):
+        sort = params.get('sort') or self.default_sort
+        name = sort.lstrip('-')
+        if name not in self.sorts:
+            raise InvalidParameter(f'sort must be one of {", ".join(sorted(self.sorts))} (prefix - for descending)')
+        return sort, self.model._meta.get_field(self.sorts[name]), sort.startswith('-')
+
+    def _filter_value(self, lookup, raw):
+        field = self.model._meta.get_field(lookup.split('__')[0])
+        try:
+            value = field.to_python(raw)
+        except ValidationError:
+            raise InvalidParameter(f'Invalid value for {lookup}: {raw!r}')
+        if field.choices and value not in dict(field.flatchoices):
+            raise InvalidParameter(f'{lookup} must be one of {", ".join(str(v) for v, _ in field.flatchoices)}')
+        return value
+
+    def queryset(self, params):
+        """Filtered and ordered queryset for ``params``. Raises InvalidParameter."""
+        conditions = {}
+        for name, lookup in self.filters.items():
+            raw = (params.get(name) or '').strip()
+            if raw:
+                conditions[lookup] = self._filter_value(lookup, raw)
+        _, field, descending = self._sort(params)
+        prefix = '-' if descending else ''
+        ordering = [f'{prefix}pk'] if field.primary_key else [f'{prefix}{field.name}', f'{prefix}pk']
+        return self.base_queryset.filter(**conditions).order_by(*ordering)
+
+    # --- Cursor ---------------------------------------------------------------
+
+    def encode_cursor(self, sort, field, obj):
+        pk_field = self.model._meta.pk
+        raw = json.dumps([sort, field.value_to_string(obj), pk_field.value_to_string(obj)])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def _after(self, sort, field, descending, cursor):
+        try:
+            cursor_sort, value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            value, pk = field.to_python(value), self.model._meta.pk.to_python(pk)
+        except (ValueError, TypeError, UnicodeError, binascii.Error, ValidationError):
+            raise InvalidParameter('Invalid cursor')
+        if cursor_sort != sort:
+            raise InvalidParameter('Cursor belongs to a different sort order')
+        op = 'lt' if descending else 'gt'
+        if field.primary_key:
+            return Q(**{f'pk__{op}': pk})
+        return Q(**{f'{field.name}__{op}': value}) | Q(**{field.name: value, f'pk__{op}': pk})
+
+    def page(self, params, page_size=None):
+        """Return ``(rows, next_cursor)``: one page of serialized rows. Raises InvalidParameter."""
+        page_size = page_size or parse_page_size(params.get('page_size'))
+        objects = self.page_objects(params, page_size)
+        rows = [self.row(obj) for obj in objects[:page_size]]
+        return rows, self.next_cursor(params, objects, page_size)
+
+    def page_objects(self, params, page_size):
+        """The model instances of one page plus one extra (if there is a next page)."""
+        queryset = self.queryset(params)
+        cursor = params.get('cursor')
+        if cursor:
+            queryset = queryset.filter(self._after(*self._sort(params), cursor))
+        return list(queryset[:page_size + 1])
+
+    def next_cursor(self, params, objects, page_size):
+        if len(objects) <= page_size:
+            return None
+        sort, field, _ = self._sort(params)
+        return self.encode_cursor(sort, field, objects[page_size - 1])
+
+    # --- Export ---------------------------------------------------------------
+
+    def _csv_lines(self, rows):
+        buffer = _Echo()
+        writer = csv.DictWriter(buffer, fieldnames=self.columns)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+
+    def _jsonl_lines(self, rows):
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+    def _chunks(self, lines):
+        # Kirim per EXPORT_CHUNK_SIZE baris, bukan per baris (write kecil-kecil itu mahal)
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= EXPORT_CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+    def export(self, params, fmt='csv'):
+        """StreamingHttpResponse with every row for ``params`` as CSV or JSON lines. Raises InvalidParameter."""
+        if fmt not in EXPORT_FORMATS:
+            raise InvalidParameter(f'format must be one of {", ".join(EXPORT_FORMATS)}')
+        # Query dibangun (dan parameternya divalidasi) sebelum streaming mulai
+        queryset = self.queryset(params)
+        rows = (self.row(obj) for obj in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        lines = self._csv_lines(rows) if fmt == 'csv' else self._jsonl_lines(rows)
+        response = StreamingHttpResponse(self._chunks(lines), content_type=EXPORT_FORMATS[fmt])
+        filename = f'{self.name}-{timezone.localdate():%Y%m%d}.{fmt}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class _Echo:
+    # "File" untuk csv.writer: writerow() langsung mengembalikan barisnya
+    def write(self, value):
+        return value
+
+
+def _shorten(text, limit=200):
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+# --- Listing ------------------------------------------------------------------
+
+def _booking_row(booking):
+    profile = related(booking.user, 'userprofile')
+    return {
+        "id": str(booking.id),
+        "arena_name": booking.arena.name,
+        "user_username": booking.user.username,
+        "user_full_name": profile.full_name if profile and profile.full_name else booking.user.username,
+        "date": str(booking.date),
+        "start_hour": booking.start_hour,
+        "status": booking.status,
+        "activity": booking.activity,
+        "booked_at": booking.booked_at.isoformat(),
+    }
+
+
+def _event_row(event):
+    return {
+        "id": event.id,
+        "name": event.name,
+        "category": event.category,
+        "level": event.level,
+        "description": event.description,
+        "date": str(event.date),
+        "start_time": str(event.start_time),
+        "end_time": str(event.end_time),
+        "location": event.location,
+        "price": str(event.price),
+        "max_participants": event.max_participants,
+        "current_participants": event.current_participants,
+        "organizer": event.organizer,
+        "instructor": event.instructor,
+        "is_active": event.is_active,
+        "created_at": event.created_at.isoformat(),
+    }
+
+
+def _post_row(post):
+    return {
+        "id": post.id,
+        "author_username": post.author.username if post.author else "Anonymous",
+        "title": post.title,
+        "content": _shorten(post.content),
+        "thumbnail_url": post.thumbnail_url,
+        "total_upvotes": post.total_upvotes(),
+        "total_downvotes": post.total_downvotes(),
+        "replies_count": post.reply_count,
+        "created_at": post.created_at.isoformat(),
+    }
+
+
+def _reply_row(reply):
+    return {
+        "id": reply.id,
+        "post_title": reply.post.title,
+        "author_username": reply.author.username,
+        "content": _shorten(reply.content),
+        "total_upvotes": reply.total_upvotes(),
+        "total_downvotes": reply.total_downvotes(),
+        "created_at": reply.created_at.isoformat(),
+    }
+
+
+def _gear_row(gear):
+    return {
+        "id": gear.id,
+        "name": gear.name,
+        "category": gear.category,
+        "price_per_day": str(gear.price_per_day),
+        "image_url": gear.image_url,
+        "description": gear.description,
+        "stock": gear.stock,
+        "seller_username": gear.seller.username,
+        "is_featured": gear.is_featured,
+    }
+
+
+def _reply_count():
+    # Subquery per baris (pakai reply_post_created_idx), bukan GROUP BY satu tabel penuh:
+    # export tetap bisa mulai streaming dari baris pertama
+    replies = Reply.objects.filter(post=OuterRef('pk')).order_by().values('post')
+    return Coalesce(Subquery(replies.annotate(n=Count('id')).values('n')), 0)
+
+
+BOOKINGS = AdminList(
+    'bookings',
+    Booking.objects.select_related('arena', 'user', 'user__userprofile'),
+    _booking_row,
+    columns=['id', 'arena_name', 'user_username', 'user_full_name', 'date', 'start_hour',
+             'status', 'activity', 'booked_at'],
+    sorts={'booked_at': 'booked_at', 'date': 'date'},
+    default_sort='-booked_at',
+    filters={'status': 'status', 'activity': 'activity', 'arena': 'arena_id', 'user': 'user_id',
+             'date_from': 'date__gte', 'date_to': 'date__lte'},
+)
+
+EVENTS = AdminList(
+    'events',
+    Event.objects.with_participation(),
+    _event_row,
+    columns=['id', 'name', 'category', 'level', 'description', 'date', 'start_time', 'end_time',
+             'location', 'price', 'max_participants', 'current_participants', 'organizer',
+             'instructor', 'is_active', 'created_at'],
+    sorts={'created_at': 'created_at', 'date': 'date'},
+    default_sort='-created_at',
+    filters={'category': 'category', 'level': 'level', 'is_active': 'is_active',
+             'date_from': 'date__gte', 'date_to': 'date__lte'},
+)
+
+POSTS = AdminList(
+    'posts',
+    Post.objects.select_related('author').annotate(reply_count=_reply_count()),
+    _post_row,
+    columns=['id', 'author_username', 'title', 'content', 'thumbnail_url', 'total_upvotes',
+             'total_downvotes', 'replies_count', 'created_at'],
+    sorts={'created_at': 'created_at'},
+    default_sort='-created_at',
+    filters={'author': 'author_id'},
+)
+
+REPLIES = AdminList(
+    'replies',
+    Reply.objects.select_related('author', 'post'),
+    _reply_row,
+    columns=['id', 'post_title', 'author_username', 'content', 'total_upvotes', 'total_downvotes',
+             'created_at'],
+    sorts={'created_at': 'created_at'},
+    default_sort='-created_at',
+    filters={'post': 'post_id', 'author': 'author_id'},
+)
+
+GEARS = AdminList(
+    'gears',
+    Gear.objects.select_related('seller'),
+    _gear_row,
+    columns=['id', 'name', 'category', 'price_per_day', 'image_url', 'description', 'stock',
+             'seller_username', 'is_featured'],
+    sorts={'id': 'id'},
+    default_sort='-id',
+    filters={'category': 'category', 'is_featured': 'is_featured', 'seller': 'seller_id'},
+)
+
+LISTS = {listing.name: listing for listing in (BOOKINGS, EVENTS, POSTS, REPLIES, GEARS)}
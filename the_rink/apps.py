@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class TheRinkConfig(AppConfig):
+    name = 'the_rink'
+
+    def ready(self):
+        from . import cache, thumbnails
+        cache.connect_signals()
+        thumbnails.connect_signals()
@@ -0,0 +1,176 @@
+"""Versioned cache for the public pages (catalog, arenas, events, forum).
+
+Every cached entry belongs to one or more namespaces (``gear``, ``arena``,
+``event``, ``forum``). Each namespace has a version number stored in the
+cache itself and the current versions are part of every key, so bumping a
+namespace makes all of its entries unreachable at once. The post_save /
+post_delete signals of the models in NAMESPACE_MODELS do the bumping (see
+the_rink.apps); bulk writes that skip signals must call bump() themselves.
+
+Entries carry a soft expiry. Once it passes, the first request to notice
+takes a short lock (``cache.add``) and rebuilds the value while everybody
+else keeps getting the stale copy, so an expired page is recomputed by one
+worker instead of all of them at once.
+
+Set ``CACHE_VIEWS = False`` to bypass all of it (the default under
+`manage.py test`).
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+
+NAMESPACE_MODELS = {
+    'gear': ['rental_gear.Gear', 'authentication.SellerProfile'],
+    'arena': ['booking_arena.Arena', 'booking_arena.ArenaOpeningHours'],
+    'event': ['events.Event', 'events.EventRegistration'],
+    'forum': ['forum.Post', 'forum.Reply', 'forum.UpVote'],
+}
+NAMESPACES = tuple(NAMESPACE_MODELS)
+
+DEFAULT_TIMEOUT = 5 * 60
+# Entry basi masih disimpan selama ini supaya bisa dipakai sambil satu worker rebuild
+STALE_GRACE = 60
+LOCK_TIMEOUT = 30
+# Waktu cache masih kosong sama sekali: tunggu hasil worker lain sebentar dulu
+COLD_WAIT = 2.0
+COLD_POLL = 0.05
+
+
+def enabled():
+    return getattr(settings, 'CACHE_VIEWS', True)
+
+
+def _timeout(timeout):
+    return timeout if timeout is not None else getattr(settings, 'CACHE_VIEW_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _version_key(namespace):
+    return f'ns:{namespace}'
+
+
+def namespace_version(namespace):
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Mulai dari waktu sekarang, bukan 1, supaya versi lama yang ke-evict gak kepakai lagi
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump(*namespaces):
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            cache.set(_version_key(namespace), time.time_ns(), None)
+
+
+def make_key(name, namespaces, *parts):
+    versions = '.'.join(f'{ns}{namespace_version(ns)}' for ns in namespaces)
+    raw = '|'.join(str(part) for part in parts)
+    return f'view:{name}:{versions}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def get_or_build(key, build, timeout=None):
+    """Return the cached value of ``key``, rebuilding it with ``build()`` at most once at a time."""
+    timeout = _timeout(timeout)
+    entry = cache.get(key)
+    lock = f'{key}:lock'
+
+    if entry is not None:
+        expires_at, value = entry
+        if time.time() < expires_at or not cache.add(lock, 1, LOCK_TIMEOUT):
+            # Masih segar, atau worker lain lagi rebuild: pakai yang ada
+            return value
+    elif not cache.add(lock, 1, LOCK_TIMEOUT):
+        deadline = time.monotonic() + COLD_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(COLD_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[1]
+        # Worker yang pegang lock kelamaan; hitung sendiri tanpa nyimpan
+        return build()
+
+    try:
+        value = build()
+        cache.set(key, (time.time() + timeout, value), timeout + STALE_GRACE)
+        return value
+    finally:
+        cache.delete(lock)
+
+
+def cached(name, *namespaces, parts=(), build, timeout=None):
+    """Cache the result of ``build()`` under ``name`` + ``parts`` in ``namespaces``."""
+    if not enabled():
+        return build()
+    return get_or_build(make_key(name, namespaces, *parts), build, timeout)
+
+
+class _Uncacheable(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def _cacheable(request, response):
+    # Jangan simpan respons yang personal: pakai token CSRF, set cookie, atau bukan 200
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def cache_view(*namespaces, timeout=None):
+    """Cache whole GET responses for anonymous visitors, keyed on path and query params."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                not enabled()
+                or request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+
+            params = sorted(request.GET.lists())
+            key = make_key(view.__module__ + '.' + view.__name__, namespaces, request.path, params)
+
+            def build():
+                response = view(request, *args, **kwargs)
+                if not _cacheable(request, response):
+                    raise _Uncacheable(response)
+                return response.content, response['Content-Type']
+
+            try:
+                content, content_type = get_or_build(key, build, timeout)
+            except _Uncacheable as e:
+                return e.response
+            return HttpResponse(content, content_type=content_type)
+
+        return wrapper
+
+    return decorator
+
+
+def _bump_on_change(namespace, sender, raw=False, **kwargs):
+    # Setelah commit, supaya request lain gak keburu nge-cache data sebelum commit di versi baru
+    if not raw:
+        transaction.on_commit(lambda: bump(namespace))
+
+
+def connect_signals():
+    for namespace, models in NAMESPACE_MODELS.items():
+        handler = functools.partial(_bump_on_change, namespace)
+        for model in models:
+            for signal in (post_save, post_delete):
+                signal.connect(handler, sender=model, weak=False, dispatch_uid=f'cache:{namespace}:{model}:{id(signal)}')
@@ -0,0 +1,45 @@
+import hashlib
+import os
+import re
+
+from django.db import models
+
+HASHED_NAME = re.compile(r'^[0-9a-f]{64}$')
+
+
+def content_digest(file):
+    sha = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(64 * 1024), b''):
+        sha.update(chunk)
+    file.seek(0)
+    return sha.hexdigest()
+
+
+def name_digest(name):
+    """The SHA-256 in a hashed file name (``gear_images/<sha>.jpg``), or None for other names."""
+    stem = os.path.basename(name or '').split('.', 1)[0]
+    return stem if HASHED_NAME.match(stem) else None
+
+
+class HashedImageField(models.ImageField):
+    """ImageField that saves uploads as ``<upload_to>/<sha256 of the content>.<ext>``.
+
+    The name changes whenever the content does, so the file (and the
+    thumbnails named after it, see the_rink.thumbnails) can be served with
+    an immutable cache header. Uploading a picture that is already stored
+    reuses the existing file.
+    """
+
+    def pre_save(self, model_instance, add):
+        file = getattr(model_instance, self.attname)
+        if file and not file._committed:
+            extension = os.path.splitext(file.name)[1].lower() or '.jpg'
+            filename = content_digest(file) + extension
+            name = self.generate_filename(model_instance, filename)
+            if file.storage.exists(name):
+                file.name = name
+                file._committed = True
+            else:
+                file.save(filename, file.file, save=False)
+        return super().pre_save(model_instance, add)
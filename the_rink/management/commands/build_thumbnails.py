@@ -0,0 +1,81 @@
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import FileField
+
+from rental_gear.api import bump_catalog_version
+from the_rink import cache as view_cache
+from the_rink import thumbnails
+from the_rink.fields import content_digest, name_digest
+
+NAMESPACES = {'rental_gear.Gear': 'gear', 'events.Event': 'event', 'booking_arena.Arena': 'arena'}
+
+
+class Command(BaseCommand):
+    help = 'Buat thumbnail yang belum ada untuk semua gambar (upload dan URL remote)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--rename', action='store_true',
+                            help='Ganti nama upload lama jadi <sha256>.<ext> (nama yang bisa di-cache immutable)')
+        parser.add_argument('--no-remote', action='store_true', help='Lewati gambar dari URL remote')
+
+    def handle(self, *args, **options):
+        jobs, renamed = {}, 0
+        for label, fields in thumbnails.SOURCES.items():
+            model = apps.get_model(label)
+            for field_name, sizes in fields:
+                field = model._meta.get_field(field_name)
+                names = set(
+                    model.objects.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+                    .values_list(field_name, flat=True)
+                )
+                for name in names:
+                    if isinstance(field, FileField) and options['rename'] and not name_digest(name):
+                        new = self.rehash(model, field, name)
+                        if new:
+                            renamed += 1
+                            name = new
+                    if thumbnails.is_remote(name) and options['no_remote']:
+                        continue
+                    jobs.setdefault(name, set()).update(sizes)
+        if renamed:
+            # update() gak lewat signal; ETag katalog juga harus berubah karena nama filenya ganti
+            view_cache.bump(*NAMESPACES.values())
+            bump_catalog_version()
+
+        failed = written = 0
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as pool:
+            for result in pool.map(self.build, jobs, [sorted(sizes) for sizes in jobs.values()]):
+                if result is None:
+                    failed += 1
+                else:
+                    written += len(result)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(jobs)} image(s): {written} thumbnail(s) written, {failed} failed, {renamed} renamed'
+        ))
+
+    def build(self, source, sizes):
+        try:
+            return thumbnails.generate(source, sizes)
+        except Exception as e:
+            self.stderr.write(f'  {source}: {e}')
+            return None
+
+    def rehash(self, model, field, name):
+        try:
+            with default_storage.open(name, 'rb') as f:
+                digest = content_digest(f)
+                new = posixpath.join(posixpath.dirname(name), digest + posixpath.splitext(name)[1].lower())
+                if not default_storage.exists(new):
+                    f.seek(0)
+                    new = default_storage.save(new, f)
+        except OSError as e:
+            self.stderr.write(f'  {name}: {e}')
+            return None
+        model.objects.filter(**{field.name: name}).update(**{field.name: new})
+        default_storage.delete(name)
+        return new
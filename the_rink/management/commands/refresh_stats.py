@@ -0,0 +1,22 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from the_rink import stats
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang tabel rollup statistik dashboard admin (jalankan dari cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=stats.REFRESH_WINDOW,
+                            help='Hitung ulang bucket sejak sekian hari lalu (default %(default)s)')
+        parser.add_argument('--full', action='store_true', help='Hitung ulang semuanya')
+
+    def handle(self, *args, **options):
+        since = None if options['full'] else timezone.localdate() - datetime.timedelta(days=options['days'])
+        written = stats.refresh_rollups(since)
+        self.stdout.write(self.style.SUCCESS(
+            f'{written} rollup row(s) written' + (f' since {since}' if since else '')
+        ))
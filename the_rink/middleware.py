@@ -0,0 +1,97 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('the_rink.queries')
+
+# "IN (%s, %s, %s)" dengan panjang beda tetap dihitung query yang sama
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class QueryStats:
+    """Collects every SQL statement run while it is installed as an execute_wrapper."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return {sql: n for sql, n in self.fingerprints.items() if n > 1}
+
+
+class QueryCountMiddleware:
+    """Report SQL count, DB time and repeated queries for every request.
+
+    Adds ``X-DB-Query-Count``, ``X-DB-Time-Ms`` and ``X-DB-Duplicate-Queries``
+    headers and logs one JSON record on the ``the_rink.queries`` logger.
+    Only active when ``settings.QUERY_INSPECT`` is on (dev/staging, off in
+    production). For streaming responses the headers only cover the work
+    done before the first chunk; the log record is written once the stream
+    is exhausted and covers everything.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSPECT', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        with self.recording(stats):
+            response = self.get_response(request)
+
+        duplicates = stats.duplicates()
+        response['X-DB-Query-Count'] = str(stats.count)
+        response['X-DB-Time-Ms'] = f'{stats.duration * 1000:.1f}'
+        response['X-DB-Duplicate-Queries'] = str(sum(duplicates.values()) - len(duplicates))
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.stream(response.streaming_content, stats, request, response)
+        else:
+            self.log(stats, request, response)
+        return response
+
+    def recording(self, stats):
+        stack = ExitStack()
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(stats))
+        return stack
+
+    def stream(self, content, stats, request, response):
+        with self.recording(stats):
+            yield from content
+        self.log(stats, request, response)
+
+    def log(self, stats, request, response):
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'url_name': match.view_name if match else None,
+            'status': response.status_code,
+            'query_count': stats.count,
+            'db_time_ms': round(stats.duration * 1000, 1),
+            'duplicate_queries': stats.duplicates(),
+        }
+        logger.info(json.dumps(record), extra=record)
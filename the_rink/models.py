@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class StatRollup(models.Model):
+    # Satu baris per (metric, bucket, key), diisi ulang oleh the_rink.stats.refresh_rollups
+    metric = models.CharField(max_length=40)
+    bucket = models.DateField()
+    key = models.CharField(max_length=64, blank=True, default='')
+    label = models.CharField(max_length=200, blank=True, default='')
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'bucket', 'key'], name='stat_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.metric} {self.bucket} {self.key}: {self.count}'
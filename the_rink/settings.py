@@ -55,9 +55,13 @@ INSTALLED_APPS = [
     'forum',
     'corsheaders',
     'auth_mob',
+    # Signal invalidasi cache (the_rink.cache)
+    'the_rink',
 ]
 
 MIDDLEWARE = [
+    # Paling luar supaya query session/auth ikut terhitung
+    'the_rink.middleware.QueryCountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -67,10 +71,86 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # request.user_context: tipe user, profil & isi cart, dimuat sekali per request
+    'authentication.user_context.UserContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Backend pertama memuat user sesi sekalian dengan tipe, profil & jumlah cart (authentication.user_context);
+# ModelBackend tetap ada supaya sesi lama yang dibuat olehnya tetap valid
+AUTHENTICATION_BACKENDS = [
+    'authentication.user_context.UserContextBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Header X-DB-* & log query per request (the_rink.middleware). Default nyala kecuali production,
+# bisa dipaksa lewat env QUERY_INSPECT=true/false (mis. di staging)
+QUERY_INSPECT = os.getenv('QUERY_INSPECT', str(not PRODUCTION)).lower() == 'true'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'the_rink.queries': {
+            'handlers': ['console'],
+            'level': os.getenv('QUERY_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Cache: locmem default. CACHE_BACKEND=file (CACHE_LOCATION = folder) atau redis (CACHE_LOCATION = URL,
+# juga jalan untuk server yang kompatibel Redis seperti Valkey/KeyDB)
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'the-rink',
+        }
+    }
+CACHES['default']['KEY_PREFIX'] = 'rink'
+
+# Cache halaman publik (the_rink.cache)
+CACHE_VIEWS = os.getenv('CACHE_VIEWS', 'True').lower() == 'true'
+CACHE_VIEW_TIMEOUT = int(os.getenv('CACHE_VIEW_TIMEOUT', 300))
+
+# Setting yang beda waktu `manage.py test` ada di the_rink/test_runner.py
+TEST_RUNNER = 'the_rink.test_runner.TestRunner'
+
+# Statistik dashboard admin (the_rink.stats), 0 = gak di-cache
+STATS_CACHE_TIMEOUT = int(os.getenv('STATS_CACHE_TIMEOUT', 60))
+
+# Thumbnail gambar (the_rink.thumbnails): dibuat di background waktu upload/import.
+# 0 worker = langsung dikerjakan
+THUMBNAILS_AUTO = os.getenv('THUMBNAILS_AUTO', 'True').lower() == 'true'
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+
+# Proxy gambar thumbnail forum (forum.image_proxy): cache di disk, dibatasi ukurannya
+IMAGE_PROXY_DIR = os.getenv('IMAGE_PROXY_DIR', str(BASE_DIR / '.image_proxy'))
+IMAGE_PROXY_CACHE_BYTES = int(os.getenv('IMAGE_PROXY_CACHE_BYTES', 512 * 1024 * 1024))
+IMAGE_PROXY_MAX_BYTES = int(os.getenv('IMAGE_PROXY_MAX_BYTES', 10 * 1024 * 1024))
+# Alamat private/loopback ditolak (biar proxy-nya gak bisa dipakai buat ngintip jaringan internal)
+IMAGE_PROXY_ALLOW_PRIVATE = os.getenv('IMAGE_PROXY_ALLOW_PRIVATE', 'False').lower() == 'true'
+
 ROOT_URLCONF = 'the_rink.urls'
 
 TEMPLATES = [
@@ -0,0 +1,232 @@
+"""Admin dashboard statistics (dashadmin and the Flutter admin stats API).
+
+counters() returns every headline count in one round trip: the per-table
+``COUNT(*)`` queries become scalar subqueries of a single SELECT. On
+PostgreSQL an unfiltered count of a table that the planner estimates at
+ESTIMATE_ABOVE rows or more uses that estimate (``pg_class.reltuples``)
+instead of scanning the table.
+
+The rollups (bookings per day per arena, rental revenue per week,
+registrations per event category) are GROUP BY queries materialized into
+StatRollup. refresh_rollups() rebuilds the buckets from a given day on;
+`manage.py refresh_stats` runs it from cron (``--full`` once a night) and
+rollups() itself refreshes the recent window when the last refresh is
+older than ROLLUP_MAX_AGE. It never builds the table from scratch inside a
+request: until the first `refresh_stats` the rollups are simply empty.
+
+Both are cached for STATS_CACHE_TIMEOUT seconds (0 = no caching, the
+default under `manage.py test`).
+"""
+import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from booking_arena.models import Arena, Booking
+from events.models import Event, EventRegistration
+from forum.models import Post
+from rental_gear.models import Gear, Rental
+
+from .models import StatRollup
+
+BOOKINGS_PER_DAY = 'bookings_per_day'
+REVENUE_PER_WEEK = 'rental_revenue_per_week'
+REGISTRATIONS_PER_CATEGORY = 'registrations_per_category'
+
+ESTIMATE_ABOVE = 100_000
+ROLLUP_MAX_AGE = 15 * 60
+# Refresh otomatis cuma menghitung ulang bucket sejak sekian hari lalu; sisanya `refresh_stats --full`
+REFRESH_WINDOW = 35
+BOOKING_DAYS = (30, 14)  # hari ke belakang, hari ke depan
+REVENUE_WEEKS = 12
+REFRESH_LOCK_TIMEOUT = 120
+
+
+def _timeout():
+    return getattr(settings, 'STATS_CACHE_TIMEOUT', 60)
+
+
+def _cached(key, build):
+    timeout = _timeout()
+    if not timeout:
+        return build()
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
+
+
+# --- Counter ------------------------------------------------------------------
+
+def counter_querysets(today):
+    return {
+        'gear_count': Gear.objects.all(),
+        'event_count': Event.objects.filter(date__gte=today),
+        'post_count': Post.objects.all(),
+        'user_count': User.objects.all(),
+        'arena_count': Arena.objects.all(),
+        'booking_count': Booking.objects.all(),
+    }
+
+
+def _count_sql(queryset):
+    queryset = queryset.order_by().values('pk')
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    count = f'(SELECT COUNT(*) FROM ({sql}) counted)'
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return count, list(params)
+    # reltuples = perkiraan planner (-1 kalau tabelnya belum pernah di-ANALYZE)
+    return (
+        f'(SELECT CASE WHEN c.reltuples >= %s THEN c.reltuples::bigint ELSE {count} END '
+        f'FROM pg_class c WHERE c.oid = %s::regclass)',
+        [ESTIMATE_ABOVE, *params, connection.ops.quote_name(queryset.model._meta.db_table)],
+    )
+
+
+def count_all(querysets):
+    """``{name: row count}`` for every queryset in ``querysets``, in one query."""
+    columns, params = [], []
+    for queryset in querysets.values():
+        sql, values = _count_sql(queryset)
+        columns.append(sql)
+        params.extend(values)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(columns), params)
+        return dict(zip(querysets, cursor.fetchone()))
+
+
+def counters(today=None):
+    today = today or timezone.localdate()
+    return _cached(f'stats:counters:{today}', lambda: count_all(counter_querysets(today)))
+
+
+# --- Rollup -------------------------------------------------------------------
+
+def _bookings_per_day(since):
+    bookings = Booking.objects.exclude(status='Cancelled')
+    if since:
+        bookings = bookings.filter(date__gte=since)
+    return [
+        StatRollup(metric=BOOKINGS_PER_DAY, bucket=row['date'], key=str(row['arena_id']),
+                   label=row['arena__name'], count=row['n'])
+        for row in bookings.values('date', 'arena_id', 'arena__name').annotate(n=Count('id')).order_by()
+    ]
+
+
+def _revenue_per_week(since):
+    rentals = Rental.objects.all()
+    if since:
+        rentals = rentals.filter(rental_date__date__gte=since)
+    rows = (
+        rentals.annotate(week=TruncWeek('rental_date', output_field=DateField()))
+        .values('week').annotate(n=Count('id'), revenue=Sum('total_cost')).order_by()
+    )
+    return [
+        StatRollup(metric=REVENUE_PER_WEEK, bucket=row['week'], count=row['n'], total=row['revenue'] or 0)
+        for row in rows
+    ]
+
+
+def _registrations_per_category(since):
+    registrations = EventRegistration.objects.all()
+    if since:
+        registrations = registrations.filter(registered_at__date__gte=since)
+    labels = dict(Event.CATEGORY_CHOICES)
+    rows = (
+        registrations.annotate(day=TruncDate('registered_at'))
+        .values('day', 'event__category').annotate(n=Count('id')).order_by()
+    )
+    return [
+        StatRollup(metric=REGISTRATIONS_PER_CATEGORY, bucket=row['day'], key=row['event__category'],
+                   label=labels.get(row['event__category'], row['event__category']), count=row['n'])
+        for row in rows
+    ]
+
+
+ROLLUPS = {
+    BOOKINGS_PER_DAY: _bookings_per_day,
+    REVENUE_PER_WEEK: _revenue_per_week,
+    REGISTRATIONS_PER_CATEGORY: _registrations_per_category,
+}
+
+
+def refresh_rollups(since=None):
+    """Recompute the rollup buckets from ``since`` on (everything when None). Returns the rows written."""
+    if since is not None and not isinstance(since, datetime.date):
+        raise TypeError('since must be a date')
+    if since is not None:
+        # Bucket mingguan dihitung penuh: mulai dari Senin-nya
+        since -= datetime.timedelta(days=since.weekday())
+    written = 0
+    with transaction.atomic():
+        for metric, build in ROLLUPS.items():
+            rows = build(since)
+            stale = StatRollup.objects.filter(metric=metric)
+            if since is not None:
+                stale = stale.filter(bucket__gte=since)
+            stale.delete()
+            StatRollup.objects.bulk_create(rows)
+            written += len(rows)
+    # Dicatat juga kalau STATS_CACHE_TIMEOUT = 0, kalau tidak tiap request refresh ulang
+    cache.set('stats:rollups:refreshed', timezone.now(), ROLLUP_MAX_AGE)
+    cache.delete(f'stats:rollups:{timezone.localdate()}')
+    return written
+
+
+def _ensure_fresh(today):
+    if cache.get('stats:rollups:refreshed'):
+        return
+    # Tabel kosong: full refresh itu urusan `refresh_stats`, bukan request dashboard
+    if not StatRollup.objects.exists():
+        return
+    # Satu request saja yang refresh; yang lain pakai isi tabel yang ada
+    if not cache.add('stats:rollups:lock', 1, REFRESH_LOCK_TIMEOUT):
+        return
+    try:
+        refresh_rollups(today - datetime.timedelta(days=REFRESH_WINDOW))
+    finally:
+        cache.delete('stats:rollups:lock')
+
+
+def _read_rollups(today):
+    back, ahead = BOOKING_DAYS
+    first_week = today - datetime.timedelta(days=today.weekday(), weeks=REVENUE_WEEKS - 1)
+    rows = StatRollup.objects.filter(
+        Q(metric=BOOKINGS_PER_DAY, bucket__range=(today - datetime.timedelta(days=back),
+                                                  today + datetime.timedelta(days=ahead)))
+        | Q(metric=REVENUE_PER_WEEK, bucket__gte=first_week)
+        | Q(metric=REGISTRATIONS_PER_CATEGORY)
+    ).order_by('metric', 'bucket', 'key')
+
+    result = {BOOKINGS_PER_DAY: [], REVENUE_PER_WEEK: [], REGISTRATIONS_PER_CATEGORY: []}
+    categories = {}
+    for row in rows:
+        if row.metric == BOOKINGS_PER_DAY:
+            result[BOOKINGS_PER_DAY].append({
+                'date': row.bucket.isoformat(), 'arena_id': row.key, 'arena': row.label, 'count': row.count,
+            })
+        elif row.metric == REVENUE_PER_WEEK:
+            result[REVENUE_PER_WEEK].append({
+                'week': row.bucket.isoformat(), 'rentals': row.count, 'revenue': float(row.total),
+            })
+        else:
+            entry = categories.setdefault(row.key, {'category': row.key, 'label': row.label, 'count': 0})
+            entry['count'] += row.count
+    result[REGISTRATIONS_PER_CATEGORY] = sorted(categories.values(), key=lambda e: -e['count'])
+    return result
+
+
+def rollups(today=None):
+    today = today or timezone.localdate()
+
+    def build():
+        _ensure_fresh(today)
+        return _read_rollups(today)
+
+    return _cached(f'stats:rollups:{today}', build)
@@ -0,0 +1 @@
+# Package for custom template tags
@@ -0,0 +1,17 @@
+from django import template
+
+from the_rink.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(value, size='list'):
+    """URL of a fixed-size thumbnail: ``{{ gear.image|thumbnail:'list' }}``.
+
+    ``size`` is a name from the_rink.thumbnails.SIZES, optionally with a
+    format (``'detail.jpg'``; WebP otherwise). Until the thumbnail exists
+    the original URL is returned.
+    """
+    size, _, fmt = str(size).partition('.')
+    return thumbnail_url(value, size, fmt or 'webp')
@@ -0,0 +1,47 @@
+"""Test runner for `manage.py test` (TEST_RUNNER in settings).
+
+Every setting that differs under test lives here, in TEST_SETTINGS, instead
+of being switched on ``sys.argv`` in settings.py. An environment variable
+of the same name still wins, as it does outside the tests. Tests that need
+the production behaviour turn it back on with ``override_settings``.
+"""
+import logging
+import os
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_SETTINGS = {
+    # Cache halaman publik mati supaya test gak saling ketemu cache
+    'CACHE_VIEWS': False,
+    # Statistik dashboard gak di-cache
+    'STATS_CACHE_TIMEOUT': 0,
+    # Gak ada thread/fetch gambar remote waktu model disimpan
+    'THUMBNAILS_AUTO': False,
+}
+# Logger -> level waktu test (gak usah spam satu baris per request)
+TEST_LOG_LEVELS = {
+    'the_rink.queries': ('QUERY_LOG_LEVEL', logging.WARNING),
+}
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_settings(**{
+            name: value for name, value in TEST_SETTINGS.items() if name not in os.environ
+        })
+        self._test_settings.enable()
+        self._log_levels = {}
+        for name, (variable, level) in TEST_LOG_LEVELS.items():
+            if variable not in os.environ:
+                logger = logging.getLogger(name)
+                self._log_levels[name] = logger.level
+                logger.setLevel(level)
+
+    def teardown_test_environment(self, **kwargs):
+        for name, level in self._log_levels.items():
+            logging.getLogger(name).setLevel(level)
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,310 @@
+"""Fixed-size thumbnails for uploaded and remote images.
+
+Every source image (an uploaded file or a remote ``http(s)`` URL) gets a
+small set of derivatives, one per size in SIZES and format in FORMATS,
+named after the SHA-256 of the source content:
+
+* a hashed upload ``gear_images/<sha>.jpg`` (see the_rink.fields) gets
+  ``gear_images/<sha>.list.webp``, ``gear_images/<sha>.detail.jpg`` ... next
+  to it;
+* a remote URL or an old, unhashed upload gets ``thumbs/ab/<sha>.list.webp``
+  ...; which content hash belongs to that URL is remembered in the cache.
+
+The content changes, the name changes, so the files can be served with
+``Cache-Control: immutable``.
+
+Derivatives are generated off the request path by a small thread pool
+(THUMBNAIL_WORKERS) when a model is saved (post_save -> on_commit, see
+SOURCES) or when the importers store images. thumbnail_url() never
+generates anything itself: a thumbnail that isn't there yet is queued and
+the original URL is returned in the meantime. Use it through the
+``thumbnail`` template filter or ThumbnailField in serializers.
+
+THUMBNAILS_AUTO = False turns the automatic generation off (the default
+under `manage.py test`); `manage.py build_thumbnails` fills in whatever is
+missing.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+from forum.image_proxy import MAX_REDIRECTS, ProxyError, check_url
+
+from .fields import name_digest
+
+logger = logging.getLogger(__name__)
+
+# nama -> (ukuran maksimal, crop supaya pas persis)
+SIZES = {
+    'list': ((480, 360), True),
+    'detail': ((1200, 900), False),
+    'avatar': ((256, 256), True),
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DEFAULT_FORMAT = 'webp'
+CONTENT_SIZES = ('list', 'detail')
+AVATAR_SIZES = ('avatar',)
+
+# Model -> [(field gambar, ukuran yang dibuat)]
+SOURCES = {
+    'rental_gear.Gear': [('image', CONTENT_SIZES), ('image_url', CONTENT_SIZES)],
+    'events.Event': [('image', CONTENT_SIZES)],
+    'booking_arena.Arena': [('img_url', CONTENT_SIZES)],
+    'authentication.UserProfile': [('profile_picture', AVATAR_SIZES)],
+}
+
+THUMB_DIR = 'thumbs'
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+FETCH_TIMEOUT = 15
+# Hasil cek "sudah ada?" disimpan; yang belum ada dicek ulang lebih cepat
+EXISTS_TIMEOUT = 24 * 60 * 60
+MISSING_TIMEOUT = 60
+DIGEST_TIMEOUT = 30 * 24 * 60 * 60
+# Sumber yang gagal (404, bukan gambar) gak dicoba lagi selama ini
+FAILED_TIMEOUT = 10 * 60
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class ThumbnailError(Exception):
+    pass
+
+
+def enabled():
+    return getattr(settings, 'THUMBNAILS_AUTO', True)
+
+
+def _key(text):
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def is_remote(source):
+    return source.startswith(('http://', 'https://'))
+
+
+def source_name(value):
+    """Storage name or URL of a FieldFile / string, '' when empty."""
+    return (getattr(value, 'name', value) or '').strip()
+
+
+def source_url(source):
+    return source if is_remote(source) else default_storage.url(source)
+
+
+def _remembered_digest(source):
+    return cache.get(f'thumb:digest:{_key(source)}')
+
+
+def derivative_name(source, digest, size, fmt):
+    if not is_remote(source) and name_digest(source) == digest:
+        return f"{source.rsplit('.', 1)[0]}.{size}.{fmt}"
+    return f'{THUMB_DIR}/{digest[:2]}/{digest}.{size}.{fmt}'
+
+
+def _exists(name):
+    key = f'thumb:exists:{_key(name)}'
+    found = cache.get(key)
+    if found is None:
+        found = default_storage.exists(name)
+        cache.set(key, found, EXISTS_TIMEOUT if found else MISSING_TIMEOUT)
+    return found
+
+
+def thumbnail_url(value, size, fmt=DEFAULT_FORMAT):
+    """URL of the ``size`` thumbnail of ``value`` (FieldFile, storage name or URL).
+
+    Falls back to the original URL (and queues the thumbnail) while it
+    doesn't exist yet; '' for an empty value.
+    """
+    if size not in SIZES or fmt not in FORMATS:
+        raise ThumbnailError(f'Unknown thumbnail {size}.{fmt}')
+    source = source_name(value)
+    if not source:
+        return ''
+    digest = (not is_remote(source) and name_digest(source)) or _remembered_digest(source)
+    if digest:
+        name = derivative_name(source, digest, size, fmt)
+        if _exists(name):
+            return default_storage.url(name)
+    if enabled():
+        schedule(source, [size])
+    return source_url(source)
+
+
+# --- Generate -----------------------------------------------------------------
+
+def _get(source):
+    # Host dicek sama seperti proxy gambar forum, redirect diikuti manual dan tiap hop dicek lagi
+    url = source
+    for _ in range(MAX_REDIRECTS + 1):
+        try:
+            check_url(url)
+        except ProxyError as e:
+            raise ThumbnailError(f'{url}: {e}')
+        response = requests.get(url, timeout=FETCH_TIMEOUT, stream=True, allow_redirects=False)
+        if not response.is_redirect:
+            return response
+        response.close()
+        url = urljoin(url, response.headers['Location'])
+    raise ThumbnailError(f'{source}: too many redirects')
+
+
+def _read(source):
+    if not is_remote(source):
+        with default_storage.open(source, 'rb') as f:
+            return f.read()
+    response = _get(source)
+    response.raise_for_status()
+    content = bytearray()
+    for chunk in response.iter_content(64 * 1024):
+        content += chunk
+        if len(content) > MAX_SOURCE_BYTES:
+            raise ThumbnailError(f'{source} is larger than {MAX_SOURCE_BYTES} bytes')
+    return bytes(content)
+
+
+def _resize(image, size):
+    dimensions, crop = SIZES[size]
+    if crop:
+        return ImageOps.fit(image, dimensions, Image.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail(dimensions, Image.LANCZOS)
+    return resized
+
+
+def _open(content):
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(content)))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Transparan -> latar putih (JPEG gak punya alpha)
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate(source, sizes=None, content=None):
+    """Create the missing derivatives of ``source``. Returns the names written."""
+    sizes = sizes or list(SIZES)
+    digest = (not is_remote(source) and name_digest(source)) or _remembered_digest(source)
+    if digest and all(
+        _exists(derivative_name(source, digest, size, fmt)) for size in sizes for fmt in FORMATS
+    ):
+        return []
+
+    content = content if content is not None else _read(source)
+    if not digest:
+        digest = hashlib.sha256(content).hexdigest()
+    try:
+        image = _open(content)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ThumbnailError(f'{source}: {e}')
+
+    written = []
+    for size in sizes:
+        resized = None
+        for fmt, (pil_format, options) in FORMATS.items():
+            name = derivative_name(source, digest, size, fmt)
+            if default_storage.exists(name):
+                cache.set(f'thumb:exists:{_key(name)}', True, EXISTS_TIMEOUT)
+                continue
+            if resized is None:
+                resized = _resize(image, size)
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+            cache.set(f'thumb:exists:{_key(name)}', True, EXISTS_TIMEOUT)
+            written.append(name)
+    if digest != name_digest(source):
+        cache.set(f'thumb:digest:{_key(source)}', digest, DIGEST_TIMEOUT)
+    return written
+
+
+def _run(source, sizes):
+    try:
+        return generate(source, sizes)
+    except (ThumbnailError, OSError, requests.RequestException) as e:
+        logger.warning('thumbnail for %s failed: %s', source, e)
+        cache.set(f'thumb:failed:{_key(source)}', True, FAILED_TIMEOUT)
+    except Exception:
+        logger.exception('thumbnail for %s failed', source)
+        cache.set(f'thumb:failed:{_key(source)}', True, FAILED_TIMEOUT)
+    finally:
+        with _lock:
+            _pending.discard((source, tuple(sizes)))
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2), thread_name_prefix='thumbnail',
+            )
+        return _executor
+
+
+def schedule(source, sizes=None):
+    """Queue thumbnail generation for ``source``; a job already queued for it is not repeated."""
+    source = source_name(source)
+    if not source:
+        return
+    job = (source, tuple(sizes or SIZES))
+    if cache.get(f'thumb:failed:{_key(source)}'):
+        return
+    with _lock:
+        if job in _pending:
+            return
+        _pending.add(job)
+    if getattr(settings, 'THUMBNAIL_WORKERS', 2) <= 0:
+        # Tanpa worker: langsung dikerjakan (dipakai di test)
+        _run(*job)
+    else:
+        _pool().submit(_run, *job)
+
+
+# --- Signals ------------------------------------------------------------------
+
+def _on_save(sender, instance, **kwargs):
+    if not enabled() or kwargs.get('raw'):
+        return
+    for field, sizes in SOURCES[sender._meta.label]:
+        source = source_name(getattr(instance, field))
+        if source:
+            transaction.on_commit(lambda source=source, sizes=sizes: schedule(source, sizes))
+
+
+def connect_signals():
+    for label in SOURCES:
+        post_save.connect(_on_save, sender=apps.get_model(label), dispatch_uid=f'thumbnails:{label}')
+
+
+class ThumbnailField(serializers.Field):
+    """Read-only serializer field: the ``size`` thumbnail URL of an image field or URL."""
+
+    def __init__(self, size, fmt=DEFAULT_FORMAT, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.size, self.fmt = size, fmt
+
+    def to_representation(self, value):
+        return thumbnail_url(value, self.size, self.fmt)
@@ -1,6 +1,7 @@
 from django.shortcuts import render
 from rental_gear.models import Gear
+from the_rink.cache import cached
 
 def main_page(request):
-    gears = Gear.objects.filter(is_featured=True)
+    gears = cached('main_featured', 'gear', build=lambda: list(Gear.objects.filter(is_featured=True)))
     return render(request, 'main.html', {'gears': gears})